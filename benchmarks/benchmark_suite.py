@@ -0,0 +1,372 @@
+"""
+Reproducible benchmark suite of the parser, the evaluation engines, the operator functions and the batch CLI.
+Every workload is generated from a fixed seed. For every benchmark the suite reports the operations per second, the cost
+of a single token and the peak memory of one run. Run from the repository root with:
+    python -m benchmarks.benchmark_suite --save baseline.json
+    python -m benchmarks.benchmark_suite --compare baseline.json --threshold 0.1
+The comparison exits with status 1 if any metric regresses by more than the threshold
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from calculator_core.array_evaluation import evaluate_with_arrays
+from calculator_core.calculator import evaluate_expression
+from calculator_core.evaluation_result import try_evaluate
+from calculator_core.lexer import WHITESPACE, tokenize
+from calculator_core.result_formatting import format_expression
+
+from main import handle_stream
+from operators.operators_math_functions import factorial, power, sum_of_digits
+
+DEFAULT_SEED = 1234
+DEFAULT_SIZE = 2000
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.1
+MIN_MEASURE_SECONDS = 0.05
+
+# True if a higher value of the metric is better
+METRICS = {"ops_per_second": True, "ns_per_token": False, "peak_memory_bytes": False}
+BINARY_OPERATORS = "+-*/%@$&"
+
+
+def generate_short_arithmetic(rng: random.Random, size: int) -> list[str]:
+    """
+    Generates short expressions of a few numbers and binary operators
+    :param rng: The random generator
+    :param size: The number of expressions
+    :return: The expressions
+    """
+    expressions = []
+    for _ in range(size):
+        parts = [str(rng.randint(1, 99))]
+        for _ in range(rng.randint(1, 3)):
+            parts += [rng.choice(BINARY_OPERATORS), str(rng.randint(1, 99))]
+        expressions.append(' '.join(parts))
+    return expressions
+
+
+def generate_nested_parentheses(rng: random.Random, size: int, depth: int = 40) -> list[str]:
+    """
+    Generates deeply nested expressions like (1+(2*(3-...)))
+    :param rng: The random generator
+    :param size: The number of expressions
+    :param depth: The nesting depth of every expression
+    :return: The expressions
+    """
+    expressions = []
+    for _ in range(size):
+        expression = str(rng.randint(1, 9))
+        for _ in range(depth):
+            expression = f"({rng.randint(1, 9)}{rng.choice('+-*@$&')}{expression})"
+        expressions.append(expression)
+    return expressions
+
+
+def generate_flat_chains(rng: random.Random, size: int, length: int = 100) -> list[str]:
+    """
+    Generates long expressions of numbers and binary operators without parentheses
+    :param rng: The random generator
+    :param size: The number of expressions
+    :param length: The number of operators of every expression
+    :return: The expressions
+    """
+    expressions = []
+    for _ in range(size):
+        parts = [str(rng.randint(1, 99))]
+        for _ in range(length):
+            parts += [rng.choice('+-*@$&'), str(rng.randint(1, 99))]
+        expressions.append(''.join(parts))
+    return expressions
+
+
+def generate_heavy_operators(rng: random.Random, size: int) -> list[str]:
+    """
+    Generates expressions dominated by factorials, sums of digits and powers
+    :param rng: The random generator
+    :param size: The number of expressions
+    :return: The expressions
+    """
+    templates = ["{a}!#", "{a}!+{b}!", "{b}^{c}#", "({a}!)^2#", "{b}^{c}^2", "{a}!#!", "{b}.5^{c}"]
+    return [rng.choice(templates).format(a=rng.randint(5, 60), b=rng.randint(2, 30), c=rng.randint(2, 12))
+            for _ in range(size)]
+
+
+def generate_error_heavy(rng: random.Random, size: int) -> list[str]:
+    """
+    Generates expressions that raise every kind of calculator error
+    :param rng: The random generator
+    :param size: The number of expressions
+    :return: The expressions
+    """
+    templates = ["{a}/0", "{a}+", "({a}*{b}", "{a}{c}{b}", "{a}..{b}", "{a} {b}", "~{a}!", "{a}.5!", "{a}^999999",
+                 "{a}*)", "!{a}", "{a}+{b}) "]
+    return [rng.choice(templates).format(a=rng.randint(1, 99), b=rng.randint(1, 99), c=rng.choice("xa?="))
+            for _ in range(size)]
+
+
+WORKLOADS = {"short": generate_short_arithmetic, "nested": generate_nested_parentheses, "flat": generate_flat_chains,
+             "heavy": generate_heavy_operators, "errors": generate_error_heavy}
+
+
+def generate_workloads(seed: int = DEFAULT_SEED, size: int = DEFAULT_SIZE) -> dict[str, list[str]]:
+    """
+    Generates every workload from the same seed
+    :param seed: The seed of the random generator
+    :param size: The number of expressions of every workload
+    :return: A dictionary of workload names and their expressions
+    """
+    return {name: generate(random.Random(f"{seed}:{name}"), size) for name, generate in WORKLOADS.items()}
+
+
+def count_tokens(expression: str) -> int:
+    """
+    Counts the tokens of an expression up to its first unknown character
+    :param expression: The expression
+    :return: The number of tokens that are not whitespace
+    """
+    count = 0
+    try:
+        for token in tokenize(expression):
+            count += token.kind != WHITESPACE
+    except Exception:
+        pass
+    return count
+
+
+def tokenize_all(expressions: list[str]):
+    """
+    Tokenizes every expression
+    :param expressions: The expressions
+    """
+    for expression in expressions:
+        try:
+            for _ in tokenize(expression):
+                pass
+        except Exception:
+            pass
+
+
+def evaluate_all(expressions: list[str]):
+    """
+    Evaluates and formats every expression
+    :param expressions: The expressions
+    """
+    for expression in expressions:
+        format_expression(expression)
+
+
+def evaluate_all_with(evaluate, expressions: list[str]):
+    """
+    Evaluates every expression with an evaluation engine, without formatting the results
+    :param evaluate: The evaluation function of the engine
+    :param expressions: The expressions
+    """
+    for expression in expressions:
+        try:
+            evaluate(expression)
+        except Exception:
+            pass
+
+
+def run_cli(expressions: list[str]):
+    """
+    Runs the batch CLI on the expressions, with in-memory input and output
+    :param expressions: The expressions
+    """
+    handle_stream(io.StringIO('\n'.join(expressions) + '\n'), io.StringIO())
+
+
+def call_all(function, arguments: list[tuple]):
+    """
+    Calls an operator function with every tuple of arguments
+    :param function: The operator function
+    :param arguments: The arguments of every call
+    """
+    for args in arguments:
+        try:
+            function(*args)
+        except (ValueError, OverflowError, ZeroDivisionError):
+            pass
+
+
+def build_benchmarks(workloads: dict[str, list[str]], seed: int = DEFAULT_SEED) -> dict[str, tuple]:
+    """
+    Builds the benchmarks of the suite
+    :param workloads: The generated workloads
+    :param seed: The seed of the random generator of the operator arguments
+    :return: A dictionary of benchmark names and (function, argument, number of operations, number of tokens) tuples
+    """
+    benchmarks = {}
+    for name, expressions in workloads.items():
+        tokens = sum(map(count_tokens, expressions))
+        benchmarks[f"parse:{name}"] = (tokenize_all, expressions, len(expressions), tokens)
+        benchmarks[f"evaluate:{name}"] = (evaluate_all, expressions, len(expressions), tokens)
+        benchmarks[f"cli:{name}"] = (run_cli, expressions, len(expressions), tokens)
+        # The engines without the formatting, the list-based evaluator against the array-backed one
+        benchmarks[f"engine:lists:{name}"] = ((lambda items: evaluate_all_with(evaluate_expression, items)),
+                                              expressions, len(expressions), tokens)
+        benchmarks[f"engine:arrays:{name}"] = ((lambda items: evaluate_all_with(evaluate_with_arrays, items)),
+                                               expressions, len(expressions), tokens)
+        # The non-raising API, whose errors should cost about as much as its successes
+        benchmarks[f"engine:results:{name}"] = ((lambda items: evaluate_all_with(try_evaluate, items)),
+                                                expressions, len(expressions), tokens)
+
+    rng = random.Random(f"{seed}:operators")
+    size = len(next(iter(workloads.values())))
+    operator_arguments = {"factorial": (factorial, [(rng.randint(0, 300),) for _ in range(size)]),
+                          "sum_of_digits": (sum_of_digits, [(rng.randint(1, 10 ** 60),) for _ in range(size)]),
+                          "power": (power, [(rng.randint(2, 99), rng.randint(0, 200)) for _ in range(size)])}
+    for name, (function, arguments) in operator_arguments.items():
+        benchmarks[f"operator:{name}"] = ((lambda args, function=function: call_all(function, args)), arguments,
+                                          len(arguments), len(arguments))
+    return benchmarks
+
+
+def measure(function, argument, operations: int, tokens: int, repeat: int = DEFAULT_REPEAT) -> dict[str, float]:
+    """
+    Measures one benchmark. Timings are the best of the repeats, and the peak memory is traced in a separate run since
+    tracing slows the code down
+    :param function: The function that runs the benchmark once
+    :param argument: The argument of the function
+    :param operations: The number of operations of one run
+    :param tokens: The number of tokens of one run
+    :param repeat: The number of timed runs
+    :return: A dictionary of the metrics
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function(argument)
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_MEASURE_SECONDS:
+            break
+        loops *= 2
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function(argument)
+        best = min(best, time.perf_counter() - start)
+    best /= loops
+
+    tracemalloc.start()
+    try:
+        function(argument)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {"ops_per_second": operations / best, "ns_per_token": best / max(tokens, 1) * 1e9,
+            "peak_memory_bytes": peak}
+
+
+def run_suite(seed: int = DEFAULT_SEED, size: int = DEFAULT_SIZE, repeat: int = DEFAULT_REPEAT,
+              selected: str | None = None) -> dict:
+    """
+    Runs the benchmarks of the suite
+    :param seed: The seed of the workloads
+    :param size: The number of expressions of every workload
+    :param repeat: The number of timed runs of every benchmark
+    :param selected: Only the benchmarks whose name contains this text are run (all of them by default)
+    :return: The report, with the parameters of the run and the metrics of every benchmark
+    """
+    benchmarks = build_benchmarks(generate_workloads(seed, size), seed)
+    results = {name: measure(*benchmark, repeat=repeat) for name, benchmark in benchmarks.items()
+               if selected is None or selected in name}
+    return {"python": platform.python_version(), "platform": platform.platform(), "seed": seed, "size": size,
+            "results": results}
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """
+    Compares the metrics of two reports
+    :param baseline: The baseline report
+    :param current: The current report
+    :param threshold: The relative change past which a metric is a regression (0.1 is 10%)
+    :return: A description of every regression
+    """
+    regressions = []
+    for name, metrics in current["results"].items():
+        baseline_metrics = baseline["results"].get(name)
+        if baseline_metrics is None:
+            continue
+        for metric, is_higher_better in METRICS.items():
+            old, new = baseline_metrics[metric], metrics[metric]
+            if old <= 0:
+                continue
+            change = (new - old) / old
+            if (is_higher_better and change < -threshold) or (not is_higher_better and change > threshold):
+                regressions.append(f"{name} {metric}: {old:.6g} -> {new:.6g} ({change:+.1%})")
+    return regressions
+
+
+def print_report(report: dict, baseline: dict | None = None):
+    """
+    Prints the metrics of a report as a table
+    :param report: The report to print
+    :param baseline: A baseline report to print the relative change of the operations per second against
+    """
+    print(f"{'benchmark':<24}{'ops/sec':>14}{'ns/token':>12}{'peak KiB':>12}{'change':>10}")
+    for name, metrics in report["results"].items():
+        change = ''
+        if baseline is not None and name in baseline["results"]:
+            change = f"{metrics['ops_per_second'] / baseline['results'][name]['ops_per_second'] - 1:+.1%}"
+        print(f"{name:<24}{metrics['ops_per_second']:>14,.0f}{metrics['ns_per_token']:>12,.1f}"
+              f"{metrics['peak_memory_bytes'] / 1024:>12,.1f}{change:>10}")
+
+
+def parse_arguments(arguments: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments
+    :param arguments: The arguments to parse (sys.argv by default)
+    :return: The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Calculator benchmark suite")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="the seed of the generated workloads")
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE, help="the number of expressions of every workload")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="the number of timed runs per benchmark")
+    parser.add_argument('--filter', dest='selected', help="only run the benchmarks whose name contains this text")
+    parser.add_argument('--save', metavar='FILE', help="save the report as a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare against a JSON baseline and fail on regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="the relative change past which a metric is a regression")
+    return parser.parse_args(arguments)
+
+
+def main(arguments: list[str] | None = None) -> int:
+    """
+    Runs the suite, then saves and compares its report as requested
+    :param arguments: The command line arguments (sys.argv by default)
+    :return: The exit status, 1 if a metric regressed past the threshold
+    """
+    args = parse_arguments(arguments)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        args.seed, args.size = baseline["seed"], baseline["size"]
+
+    report = run_suite(args.seed, args.size, args.repeat, args.selected)
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+
+    if baseline is not None:
+        regressions = compare_results(baseline, report, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
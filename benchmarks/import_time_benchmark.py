@@ -0,0 +1,141 @@
+"""
+Cold start benchmark driven by python -X importtime.
+Imports a module in fresh interpreters, reports the cumulative import time of the slowest modules and checks that the
+optional subsystems are not imported at startup. Run from the repository root with:
+    python -m benchmarks.import_time_benchmark --save import_baseline.json
+    python -m benchmarks.import_time_benchmark --compare import_baseline.json --threshold 0.2
+The check exits with status 1 if a lazily loaded module is imported at startup or if the import time regresses by more
+than the threshold
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+DEFAULT_MODULE = "main"
+DEFAULT_RUNS = 7
+DEFAULT_THRESHOLD = 0.2
+REPORTED_MODULES = 12
+
+# Modules that are loaded on first use only, and must not slow down the start of the CLI
+LAZY_MODULES = ("argparse", "typing", "decimal", "fractions", "numpy", "asyncio", "concurrent.futures", "sqlite3",
+                "operators.operators_math_functions", "operators.operators_exact_functions",
+                "operators.operators_vectorized_functions", "calculator_core.numeric_backends",
+                "calculator_core.compiled_expression", "calculator_core.file_evaluation",
+                "calculator_core.array_evaluation", "calculator_core.magnitude_estimation",
+                "calculator_core.evaluation_result", "calculator_core.expression_bundle",
+                "calculator_core.resource_limits", "calculator_core.evaluator",
+                "calculator_core.persistent_cache",
+                "calculator_service.evaluation_server")
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_importtime(module: str) -> dict[str, int]:
+    """
+    Imports a module in a fresh interpreter with -X importtime
+    :param module: The name of the module to import
+    :return: A dictionary of the names of all the imported modules and their cumulative import time in microseconds
+    :raises RuntimeError: If the module cannot be imported
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=REPOSITORY_ROOT,
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr}")
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure_import_time(module: str = DEFAULT_MODULE, runs: int = DEFAULT_RUNS) -> dict:
+    """
+    Measures the import time of a module, keeping the fastest of several runs of every imported module
+    :param module: The name of the module to import
+    :param runs: The number of fresh interpreters to import the module in
+    :return: The report, with the total import time of the module in microseconds, the slowest imported modules and
+    the lazily loaded modules that were imported
+    """
+    best = {}
+    for _ in range(runs):
+        for name, cumulative in run_importtime(module).items():
+            best[name] = min(cumulative, best.get(name, cumulative))
+
+    slowest = sorted(best.items(), key=lambda item: item[1], reverse=True)[:REPORTED_MODULES]
+    return {"python": sys.version.split()[0], "module": module, "runs": runs, "total_us": best[module],
+            "slowest_modules": dict(slowest), "lazy_modules_imported": find_lazy_modules(best)}
+
+
+def find_lazy_modules(imported_modules) -> list[str]:
+    """
+    Finds the lazily loaded modules among imported modules
+    :param imported_modules: The names of the imported modules
+    :return: The sorted names of the lazily loaded modules (or of their submodules) that were imported
+    """
+    return sorted(name for name in imported_modules
+                  if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES))
+
+
+def compare_import_times(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """
+    Compares two import time reports
+    :param baseline: The baseline report
+    :param current: The current report
+    :param threshold: The relative increase of the total import time past which it is a regression (0.2 is 20%)
+    :return: A description of every regression
+    """
+    regressions = [f"{name} is imported at startup" for name in current["lazy_modules_imported"]]
+    change = (current["total_us"] - baseline["total_us"]) / baseline["total_us"]
+    if change > threshold:
+        regressions.append(f"import {current['module']}: {baseline['total_us']} us -> {current['total_us']} us "
+                           f"({change:+.1%})")
+    return regressions
+
+
+def parse_arguments(arguments: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments
+    :param arguments: The arguments to parse (sys.argv by default)
+    :return: The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Calculator import time benchmark")
+    parser.add_argument('--module', default=DEFAULT_MODULE, help="the module to import")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help="the number of fresh interpreters")
+    parser.add_argument('--save', metavar='FILE', help="save the report as a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare against a JSON baseline and fail on regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="the relative increase of the import time past which it is a regression")
+    return parser.parse_args(arguments)
+
+
+def main(arguments: list[str] | None = None) -> int:
+    """
+    Measures the import time, then saves and compares the report as requested
+    :param arguments: The command line arguments (sys.argv by default)
+    :return: The exit status, 1 if a lazily loaded module is imported at startup or the import time regressed
+    """
+    args = parse_arguments(arguments)
+    report = measure_import_time(args.module, args.runs)
+    print(f"import {report['module']}: {report['total_us'] / 1000:.1f} ms (best of {report['runs']})")
+    for name, cumulative in report["slowest_modules"].items():
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+
+    regressions = [f"{name} is imported at startup" for name in report["lazy_modules_imported"]]
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            regressions = compare_import_times(json.load(baseline_file), report, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
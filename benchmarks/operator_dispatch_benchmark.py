@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of the per-token operator dispatch.
+Compares the isinstance chains over OPERATORS used before the operator records existed with the single lookup in
+OPERATOR_RECORDS. Run from the repository root with: python -m benchmarks.operator_dispatch_benchmark
+"""
+import timeit
+
+from operators.operator_implementations.unary_operators.left_unary_operator import LeftUnaryOperator
+from operators.operator_implementations.unary_operators.right_unary_operator import RightUnaryOperator
+from operators.operator_types.binary_operator import BinaryOperator
+from operators.operator_types.operator_record import POSTFIX, PREFIX
+from operators.operators_dict import OPERATOR_RECORDS, OPERATORS
+
+# (operator, previous) pairs as handle_operator sees them
+TOKENS = [("+", 3), ("*", 2.5), ("!", 4), ("~", "+"), ("-", "*"), ("^", "!"), ("#", 12), ("@", 7)] * 1000
+
+
+def dispatch_with_isinstance(operator, previous) -> tuple:
+    """
+    Classifies a token the way the evaluator did with isinstance checks
+    :param operator: The current operator
+    :param previous: The previous operator or number
+    :return: The classification of the token
+    """
+    is_previous_left_unary = previous in OPERATORS and isinstance(OPERATORS[previous], LeftUnaryOperator)
+    is_previous_right_unary = previous in OPERATORS and isinstance(OPERATORS[previous], RightUnaryOperator)
+    is_right_unary = operator in OPERATORS and isinstance(OPERATORS[operator], RightUnaryOperator)
+    is_left_unary = operator in OPERATORS and isinstance(OPERATORS[operator], LeftUnaryOperator)
+    is_binary = operator in OPERATORS and isinstance(OPERATORS[operator], BinaryOperator)
+    return (is_previous_left_unary, is_previous_right_unary, is_right_unary, is_left_unary, is_binary,
+            OPERATORS[operator].get_precedence(), OPERATORS[operator].get_function())
+
+
+def dispatch_with_records(operator, previous) -> tuple:
+    """
+    Classifies a token with one lookup per item in the precomputed operator records
+    :param operator: The current operator
+    :param previous: The previous operator or number
+    :return: The classification of the token
+    """
+    previous_record = OPERATOR_RECORDS.get(previous)
+    previous_fixity = previous_record.fixity if previous_record is not None else None
+    record = OPERATOR_RECORDS[operator]
+    return (previous_fixity == PREFIX, previous_fixity == POSTFIX, record.fixity == POSTFIX, record.fixity == PREFIX,
+            record.arity == 2, record.precedence, record.function)
+
+
+def measure(dispatch, repeat: int = 5) -> float:
+    """
+    Measures the cost of dispatching a single token
+    :param dispatch: The dispatch function to measure
+    :param repeat: The number of measurements (the best one is reported)
+    :return: The cost of a single dispatch in nanoseconds
+    """
+    def run():
+        for operator, previous in TOKENS:
+            dispatch(operator, previous)
+
+    best = min(timeit.repeat(run, number=10, repeat=repeat))
+    return best / (10 * len(TOKENS)) * 1e9
+
+
+def main():
+    """
+    Prints the per-token dispatch cost before and after the operator records
+    """
+    before = measure(dispatch_with_isinstance)
+    after = measure(dispatch_with_records)
+    print(f"isinstance dispatch:    {before:8.1f} ns/token")
+    print(f"record dispatch:        {after:8.1f} ns/token")
+    print(f"speedup:                {before / after:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
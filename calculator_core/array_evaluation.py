@@ -0,0 +1,271 @@
+"""
+An evaluation engine with compact stacks.
+Operators are pushed as small integer opcodes into an array('H') and operands are stored as doubles in an array('d')
+with an array('b') of kind flags, so the stacks hold no Python objects. Integers that a double cannot represent exactly
+are kept in a separate object stack. The results and the raised errors are the same as those of evaluate_expression
+"""
+from array import array
+from typing import NamedTuple
+
+from calculator_core.calculator import apply_binary_operator, apply_unary_operator, get_expression_limits, \
+    tokenize_expression
+from calculator_core.errors import (BINARY_OPERANDS_TEMPLATE, BINARY_OPERATORS_TEMPLATE, DEPTH_TEMPLATE,
+                                    EMPTY_PARENTHESES_TEMPLATE, INSUFFICIENT_OPERANDS_TEMPLATE, INVALID_USE_TEMPLATE,
+                                    MISMATCHED_PARENTHESES_TEMPLATE, POSTFIX_POSITION_TEMPLATE,
+                                    PREFIX_NEIGHBOR_TEMPLATE, PREFIX_POSITION_TEMPLATE, ExpressionTooComplexError,
+                                    InsufficientOperandsError, InsufficientOperatorsError, InvalidUseOfOperatorError)
+from calculator_core.lexer import LEFT_PARENTHESIS, NUMBER, OPERATOR, RIGHT_PARENTHESIS, parse_number
+
+from operators.operator_registry import get_registry_version
+from operators.operator_types.operator_record import POSTFIX, PREFIX
+from operators.operators_dict import OPERATOR_RECORDS
+
+LEFT_PARENTHESIS_OPCODE = 0
+
+# The kinds of the operands on the operand stack
+FLOAT_OPERAND = 0
+INT_OPERAND = 1
+OBJECT_OPERAND = 2
+
+# The previous item of process_tokens, encoded as an opcode or one of these values
+PREVIOUS_NONE = -2
+PREVIOUS_OPERAND = -1
+
+MAX_EXACT_INTEGER = 2 ** 53
+
+
+class OpcodeTable(NamedTuple):
+    """
+    The operators of the registry numbered by opcode, with their records split into lists indexed by opcode
+    """
+    version: int
+    opcodes: dict
+    records: list
+    symbols: list
+    arities: list
+    fixities: list
+    precedences: list
+
+
+OPCODE_TABLE = None
+
+
+def get_opcode_table() -> OpcodeTable:
+    """
+    Returns the opcodes of the registered operators, numbered again after the registered operators change
+    :return: The opcode table, where the opcode 0 is the left parenthesis
+    """
+    global OPCODE_TABLE
+    if OPCODE_TABLE is None or OPCODE_TABLE.version != get_registry_version():
+        records = [None, *OPERATOR_RECORDS.values()]
+        OPCODE_TABLE = OpcodeTable(get_registry_version(),
+                                   {record.symbol: opcode for opcode, record in enumerate(records) if opcode},
+                                   records, ['(', *(record.symbol for record in records[1:])],
+                                   [0, *(record.arity for record in records[1:])],
+                                   [None, *(record.fixity for record in records[1:])],
+                                   [0, *(record.precedence for record in records[1:])])
+    return OPCODE_TABLE
+
+
+class OperandStack(object):
+    """
+    A stack of numbers stored as doubles, with kind flags that restore integers, and an object stack for the integers
+    that a double cannot represent exactly
+    """
+    __slots__ = ('__values', '__kinds', '__objects')
+
+    def __init__(self):
+        """
+        Initializes a new, empty OperandStack instance
+        """
+        self.__values = array('d')
+        self.__kinds = array('b')
+        self.__objects = []
+
+    def __len__(self) -> int:
+        return len(self.__kinds)
+
+    def push(self, number: int | float):
+        """
+        Pushes a number
+        :param number: The number
+        """
+        if isinstance(number, float):
+            self.__values.append(number)
+            self.__kinds.append(FLOAT_OPERAND)
+        elif -MAX_EXACT_INTEGER <= number <= MAX_EXACT_INTEGER:
+            self.__values.append(number)
+            self.__kinds.append(INT_OPERAND)
+        else:
+            self.__values.append(0.0)
+            self.__kinds.append(OBJECT_OPERAND)
+            self.__objects.append(number)
+
+    def pop(self) -> int | float:
+        """
+        Pops the number at the top of the stack
+        :return: The number, with the type it was pushed with
+        """
+        kind = self.__kinds.pop()
+        value = self.__values.pop()
+        if kind == INT_OPERAND:
+            return int(value)
+        if kind == OBJECT_OPERAND:
+            return self.__objects.pop()
+        return value
+
+
+def execute_opcode(operand_stack: OperandStack, operator_stack: array, table: OpcodeTable):
+    """
+    Executes the operator at the top of the operator_stack like calculator.execute_operation
+    :param operand_stack: The operand stack
+    :param operator_stack: The array of the opcodes of the operators
+    :param table: The opcode table
+    :raises InsufficientOperandsError: If there are insufficient operands to perform a binary operation
+    :raises InsufficientOperatorsError: If there are mismatched parentheses
+    :raises InvalidUseOfOperatorError: If a right unary operator has no operand
+    :raises InvalidValueForOperatorError: If an operator is given invalid value
+    """
+    opcode = operator_stack.pop()
+    if opcode == LEFT_PARENTHESIS_OPCODE:
+        raise InsufficientOperatorsError(MISMATCHED_PARENTHESES_TEMPLATE)
+    record = table.records[opcode]
+    if record.arity == 2:
+        if len(operand_stack) < 2:
+            raise InsufficientOperandsError(BINARY_OPERANDS_TEMPLATE.format(record.symbol))
+        operand2 = operand_stack.pop()
+        operand_stack.push(apply_binary_operator(record, operand_stack.pop(), operand2))
+    elif len(operand_stack):
+        operand_stack.push(apply_unary_operator(record, operand_stack.pop()))
+    elif record.fixity == POSTFIX:
+        raise InvalidUseOfOperatorError(INVALID_USE_TEMPLATE.format(record.symbol))
+    # A left unary operator without operand is dropped
+
+
+def handle_operator_opcode(operand_stack: OperandStack, operator_stack: array, table: OpcodeTable, operator: str,
+                           previous: int, is_previous_left_parenthesis: bool):
+    """
+    Handles the current operator in the expression like calculator.handle_operator, with opcodes
+    :param operand_stack: The operand stack
+    :param operator_stack: The array of the opcodes of the operators
+    :param table: The opcode table
+    :param operator: The symbol of the operator token
+    :param previous: The opcode of the previous operator, PREVIOUS_NONE or PREVIOUS_OPERAND
+    :param is_previous_left_parenthesis: A boolean indicating if the previous character is a left parenthesis
+    :return: The opcode pushed on the operator_stack
+    :raises InvalidUseOfOperatorError: If an operator is used incorrectly
+    :raises InvalidValueForOperatorError: If the execute_opcode function raises this exception
+    :raises InsufficientOperandsError: If the execute_opcode function raises this exception
+    :raises InsufficientOperatorsError: If the execute_opcode function raises this exception
+    """
+    if previous >= 0:
+        previous_fixity = table.fixities[previous]
+        is_previous_operand = previous_fixity == POSTFIX
+    else:
+        previous_fixity = None
+        is_previous_operand = previous == PREVIOUS_OPERAND
+
+    if previous_fixity == PREFIX and operator != '-' and not is_previous_left_parenthesis:
+        raise InvalidUseOfOperatorError(PREFIX_NEIGHBOR_TEMPLATE.format(table.symbols[previous]))
+
+    if operator == '-':
+        if previous == PREVIOUS_NONE or is_previous_left_parenthesis:
+            operator = "unaryMinus"
+        elif not is_previous_operand:
+            if table.symbols[previous] == "unaryMinus":
+                operator = "unaryMinus"
+            else:
+                operator = "numberMinus"
+
+    opcode = table.opcodes[operator]
+    fixity = table.fixities[opcode]
+    if fixity == POSTFIX:
+        if is_previous_left_parenthesis or not is_previous_operand:
+            raise InvalidUseOfOperatorError(POSTFIX_POSITION_TEMPLATE.format(operator))
+
+    elif fixity == PREFIX:
+        if is_previous_operand:
+            if is_previous_left_parenthesis:
+                raise InsufficientOperatorsError(BINARY_OPERATORS_TEMPLATE)
+            else:
+                raise InvalidUseOfOperatorError(PREFIX_POSITION_TEMPLATE.format(operator))
+
+        operator_stack.append(opcode)
+        return opcode
+
+    elif is_previous_left_parenthesis:
+        raise InsufficientOperandsError(BINARY_OPERANDS_TEMPLATE.format(operator))
+
+    precedence = table.precedences[opcode]
+    precedences = table.precedences
+    while operator_stack and operator_stack[-1] != LEFT_PARENTHESIS_OPCODE and \
+            precedences[operator_stack[-1]] >= precedence:
+        execute_opcode(operand_stack, operator_stack, table)
+
+    operator_stack.append(opcode)
+    return opcode
+
+
+def evaluate_with_arrays(expression: str) -> int | float:
+    """
+    Evaluates the given expression with the shunting-yard algorithm of process_tokens over compact stacks
+    :param expression: The expression to evaluate
+    :return: The result of the expression
+    :raises ExpressionTooComplexError: If the expression is longer or nested deeper than the configured limits
+    :raises InvalidNumberFormatError: If the expression contains an invalid number
+    :raises UnknownCharacterError: If an invalid character is encountered in the expression
+    :raises InsufficientOperandsError: If there are not enough operands in the expression
+    :raises InsufficientOperatorsError: If there are not enough operators or mismatched parentheses
+    :raises InvalidUseOfOperatorError: If an operator is used incorrectly
+    :raises InvalidValueForOperatorError: If an operator is given invalid value
+    """
+    tokens = tokenize_expression(expression)
+    table = get_opcode_table()
+    fixities = table.fixities
+    operand_stack = OperandStack()
+    operator_stack = array('H')
+    previous = PREVIOUS_NONE
+    is_previous_left_parenthesis = False
+    depth = 0
+    max_depth = get_expression_limits()[1]
+    for kind, value, _ in tokens:
+        if kind == NUMBER:
+            if previous == PREVIOUS_OPERAND or (previous >= 0 and fixities[previous] == POSTFIX):
+                raise InsufficientOperatorsError(BINARY_OPERATORS_TEMPLATE)
+            operand_stack.push(parse_number(value))
+            previous = PREVIOUS_OPERAND
+            is_previous_left_parenthesis = False
+
+        elif kind == OPERATOR:
+            previous = handle_operator_opcode(operand_stack, operator_stack, table, value, previous,
+                                              is_previous_left_parenthesis)
+            is_previous_left_parenthesis = False
+
+        elif kind == LEFT_PARENTHESIS:
+            depth += 1
+            if depth > max_depth:
+                raise ExpressionTooComplexError(DEPTH_TEMPLATE.format(max_depth))
+            operator_stack.append(LEFT_PARENTHESIS_OPCODE)
+            is_previous_left_parenthesis = True
+
+        elif kind == RIGHT_PARENTHESIS:
+            if is_previous_left_parenthesis:
+                raise InvalidUseOfOperatorError(EMPTY_PARENTHESES_TEMPLATE)
+            while operator_stack and operator_stack[-1] != LEFT_PARENTHESIS_OPCODE:
+                execute_opcode(operand_stack, operator_stack, table)
+            if not operator_stack:
+                raise InsufficientOperatorsError(MISMATCHED_PARENTHESES_TEMPLATE)
+            operator_stack.pop()
+            depth -= 1
+            is_previous_left_parenthesis = False
+
+        else:
+            is_previous_left_parenthesis = False
+
+    while operator_stack:
+        execute_opcode(operand_stack, operator_stack, table)
+
+    if not len(operand_stack):
+        raise InsufficientOperandsError(INSUFFICIENT_OPERANDS_TEMPLATE)
+
+    return operand_stack.pop()
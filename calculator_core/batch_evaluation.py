@@ -0,0 +1,41 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from calculator_core.result_formatting import format_expression
+
+MIN_PARALLEL_BATCH_SIZE = 2048
+
+
+def format_expressions(expressions: list[str]) -> list[str]:
+    """
+    Evaluates and formats a chunk of expressions in the current process
+    :param expressions: The expressions to evaluate
+    :return: The formatted result or error of every expression
+    """
+    return [format_expression(expression) for expression in expressions]
+
+
+def evaluate_many(expressions, workers: int | None = None, chunksize: int | None = None) -> list[str]:
+    """
+    Evaluates many expressions, spreading large batches across a pool of processes
+    :param expressions: An iterable of expressions to evaluate
+    :param workers: The number of worker processes (the number of CPUs by default)
+    :param chunksize: The number of expressions sent to a worker at once (chosen from the batch size by default)
+    :return: The formatted result or error of every expression, in input order, exactly as main.handle_expression
+    prints them
+    """
+    expressions = list(expressions)
+    if workers == 1 or len(expressions) < MIN_PARALLEL_BATCH_SIZE:
+        return format_expressions(expressions)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(expressions) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = [expressions[index:index + chunksize] for index in range(0, len(expressions), chunksize)]
+        results = []
+        for chunk_results in executor.map(format_expressions, chunks):
+            results.extend(chunk_results)
+    return results
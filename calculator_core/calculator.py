@@ -1,18 +1,32 @@
-from calculator_core.calculator_errors.invalid_number_format_error import InvalidNumberFormatError
-from calculator_core.calculator_errors.insufficient_operators_error import InsufficientOperatorsError
-from calculator_core.calculator_errors.insufficient_operands_error import InsufficientOperandsError
-from calculator_core.calculator_errors.unknown_character_error import UnknownCharacterError
-
-from operators.operator_errors.invalid_use_of_operator_error import InvalidUseOfOperatorError
-from operators.operator_errors.invalid_value_for_operator_error import InvalidValueForOperatorError
-
-from operators.operator_implementations.unary_operators.left_unary_operator import LeftUnaryOperator
-from operators.operator_implementations.unary_operators.right_unary_operator import RightUnaryOperator
-
-from operators.operator_types.binary_operator import BinaryOperator
-from operators.operator_types.unary_operator import UnaryOperator
-
-from operators.operators_dict import OPERATORS
+from collections import namedtuple
+from functools import partial
+
+from calculator_core.errors import (BINARY_OPERANDS_TEMPLATE, BINARY_OPERATORS_TEMPLATE, DEPTH_TEMPLATE,
+                                    EMPTY_PARENTHESES_TEMPLATE, INSUFFICIENT_OPERANDS_TEMPLATE, INVALID_USE_TEMPLATE,
+                                    LENGTH_TEMPLATE, MISMATCHED_PARENTHESES_TEMPLATE, POSTFIX_POSITION_TEMPLATE,
+                                    PREFIX_NEIGHBOR_TEMPLATE, PREFIX_POSITION_TEMPLATE, ExpressionTooComplexError,
+                                    InsufficientOperandsError, InsufficientOperatorsError, InvalidNumberFormatError,
+                                    InvalidUseOfOperatorError, InvalidValueForOperatorError)
+from calculator_core.lexer import (LEFT_PARENTHESIS, NAME, NUMBER, OPERATOR, RIGHT_PARENTHESIS, Variable, parse_number,
+                                   tokenize)
+
+from operators.operator_types.operator_record import POSTFIX, PREFIX, OperatorRecord
+from operators.operators_dict import OPERATOR_RECORDS
+
+INSTRUMENTATION = None
+RESOURCE_LIMITS = None
+MAX_EXPRESSION_LENGTH = 10000000
+MAX_NESTING_DEPTH = 100000
+
+
+class ShuntingYardState(namedtuple("ShuntingYardState", ["operand_stack", "operator_stack", "previous",
+                                                         "is_previous_left_parenthesis", "depth"],
+                                   defaults=(None, False, 0))):
+    """
+    The state of the shunting-yard loop of process_tokens between two tokens: its operand and operator stacks, which the
+    loop updates in place, the previous item, whether it is a left parenthesis and the nesting depth of parentheses
+    """
+    __slots__ = ()
 
 
 def is_top_left_parenthesis(operator_stack: list[str]):
@@ -39,7 +53,7 @@ def is_operator(item: str | int | float) -> bool:
     :param item: The item to check
     :return: True if item is an operator, False otherwise
     """
-    return item in OPERATORS
+    return item in OPERATOR_RECORDS
 
 
 def is_unary_operator(item: str | int | float) -> bool:
@@ -48,7 +62,8 @@ def is_unary_operator(item: str | int | float) -> bool:
     :param item: The item to check
     :return: True if item is a unary operator, False otherwise
     """
-    return is_operator(item) and isinstance(OPERATORS[item], UnaryOperator)
+    record = OPERATOR_RECORDS.get(item)
+    return record is not None and record.arity == 1
 
 
 def is_right_unary_operator(item: str | int | float) -> bool:
@@ -57,7 +72,8 @@ def is_right_unary_operator(item: str | int | float) -> bool:
     :param item: The item to check
     :return: True if item is a right unary operator, False otherwise
     """
-    return is_operator(item) and isinstance(OPERATORS[item], RightUnaryOperator)
+    record = OPERATOR_RECORDS.get(item)
+    return record is not None and record.fixity == POSTFIX
 
 
 def is_left_unary_operator(item: str | int | float) -> bool:
@@ -66,7 +82,8 @@ def is_left_unary_operator(item: str | int | float) -> bool:
     :param item: The item to check
     :return: True if item is a left unary operator, False otherwise
     """
-    return is_operator(item) and isinstance(OPERATORS[item], LeftUnaryOperator)
+    record = OPERATOR_RECORDS.get(item)
+    return record is not None and record.fixity == PREFIX
 
 
 def is_binary_operator(item: str | int | float) -> bool:
@@ -75,84 +92,132 @@ def is_binary_operator(item: str | int | float) -> bool:
     :param item: The item to check
     :return: True if item is a binary operator, False otherwise
     """
-    return is_operator(item) and isinstance(OPERATORS[item], BinaryOperator)
+    record = OPERATOR_RECORDS.get(item)
+    return record is not None and record.arity == 2
 
 
 def handle_right_parenthesis(operator_stack: list[str], operand_stack: list[int | float],
-                             is_previous_left_parenthesis: bool):
+                             is_previous_left_parenthesis: bool, execute=None):
     """
     Handles the expression between the recent left parenthesis and the current right parenthesis
     :param operand_stack: list of operands
     :param operator_stack: list of operators
     :param is_previous_left_parenthesis: A boolean indicating if the previous character is a left parenthesis
+    :param execute: A function that executes the operator at the top of the operator_stack (execute_operation by
+    default)
     :raises InsufficientOperatorsError: If there are mismatched parentheses (can be raised from execute_operation)
     :raises InsufficientOperandsError: If the execute_operation function raises this exception
     :raises InvalidValueForOperatorError: If the execute_operation function raises this exception
     """
+    if execute is None:
+        execute = execute_operation
     if is_previous_left_parenthesis:
-        raise InvalidUseOfOperatorError("Empty parentheses")
+        raise InvalidUseOfOperatorError(EMPTY_PARENTHESES_TEMPLATE)
     while operator_stack and not is_top_left_parenthesis(operator_stack):
-        execute_operation(operand_stack, operator_stack)
+        execute(operand_stack, operator_stack)
     if not operator_stack:
-        raise InsufficientOperatorsError("Mismatched parentheses")
+        raise InsufficientOperatorsError(MISMATCHED_PARENTHESES_TEMPLATE)
     operator_stack.pop()
 
 
-def execute_operation(operand_stack: list[int | float], operator_stack: list[str]):
+def get_operator_record(operator: str, records: dict[str, OperatorRecord] | None = None) -> OperatorRecord:
     """
-    Executes one unary operation or one binary operation and insert the result into the operand_stack
+    Returns the metadata record of an operator popped from the operator_stack
+    :param operator: The operator
+    :param records: The dictionary of symbols and operator records (OPERATOR_RECORDS by default)
+    :return: The record of the operator
+    :raises InsufficientOperatorsError: If the operator is a left parenthesis (mismatched parentheses)
+    """
+    record = (OPERATOR_RECORDS if records is None else records).get(operator)
+    if record is None:
+        raise InsufficientOperatorsError(MISMATCHED_PARENTHESES_TEMPLATE)
+    return record
+
+
+def pop_operands(operand_stack: list[int | float], record: OperatorRecord) -> tuple:
+    """
+    Removes the operands of the given operator from the top of the operand_stack
     :param operand_stack: list of operands
-    :param operator_stack: list of operators
+    :param record: The record of the operator that is about to be executed
+    :return: A tuple of the operands in their original order, or an empty tuple if a left unary operator has no operand
     :raises InsufficientOperandsError: If there are insufficient operands to perform a binary operation
-    :raises InsufficientOperatorsError: If there are mismatched parentheses
-    :raises InvalidValueForOperatorError: If an operator is given invalid value
+    :raises InvalidUseOfOperatorError: If a right unary operator has no operand
     """
-    num = None
-    operator = operator_stack.pop()
-    if operator == '(':
-        raise InsufficientOperatorsError("Mismatched parentheses")
-
-    func = OPERATORS[operator].get_function()
-    if is_unary_operator(operator):
+    if record.arity == 1:
         if not operand_stack:
-            if is_right_unary_operator(operator):
-                raise InvalidUseOfOperatorError(f"Invalid use of '{operator}' operator")
-            if is_left_unary_operator(operator):
-                return
+            if record.fixity == POSTFIX:
+                raise InvalidUseOfOperatorError(INVALID_USE_TEMPLATE.format(record.symbol))
+            return ()
+        return operand_stack.pop(),
 
-        operand = operand_stack.pop()
+    if len(operand_stack) < 2:
+        raise InsufficientOperandsError(BINARY_OPERANDS_TEMPLATE.format(record.symbol))
 
-        try:
-            num = func(operand)
-        except (ValueError, TypeError) as e:
-            raise InvalidValueForOperatorError(e)
+    operand2 = operand_stack.pop()
+    operand1 = operand_stack.pop()
+    return operand1, operand2
 
-        if isinstance(num, float) and num.is_integer():
-            num = int(num)
 
-    else:
-        if len(operand_stack) < 2:
-            if operator == "(":
-                raise InsufficientOperatorsError("Mismatched parentheses")
-            else:
-                raise InsufficientOperandsError(f"Not enough operands for binary operation ('{operator}')")
+def apply_unary_operator(record: OperatorRecord, operand: int | float) -> int | float:
+    """
+    Applies a unary operator to its operand
+    :param record: The record of the unary operator to apply
+    :param operand: The operand of the operator
+    :return: The normalized result of the operation
+    :raises InvalidValueForOperatorError: If the operator is given invalid value
+    """
+    try:
+        num = record.function(operand)
+    except (ValueError, TypeError) as e:
+        raise InvalidValueForOperatorError(e)
 
-        operand2 = operand_stack.pop()
-        operand1 = operand_stack.pop()
+    if isinstance(num, float) and num.is_integer():
+        num = int(num)
+    return round(num, 10)
+
+
+def apply_binary_operator(record: OperatorRecord, operand1: int | float, operand2: int | float) -> int | float:
+    """
+    Applies a binary operator to its operands
+    :param record: The record of the binary operator to apply
+    :param operand1: The left operand of the operator
+    :param operand2: The right operand of the operator
+    :return: The normalized result of the operation
+    :raises InvalidValueForOperatorError: If the operator is given invalid value
+    """
+    try:
+        num = record.function(operand1, operand2)
+    except (ZeroDivisionError, ValueError) as e:
+        raise InvalidValueForOperatorError(e)
 
-        try:
-            num = func(operand1, operand2)
-        except (ZeroDivisionError, ValueError) as e:
-            raise InvalidValueForOperatorError(e)
+    if isinstance(num, float) and num.is_integer():
+        num = int(num)
+    return round(num, 10)
 
-        if isinstance(num, float) and num.is_integer():
-            num = int(num)
 
-    operand_stack.append(round(num, 10))
+def execute_operation(operand_stack: list[int | float], operator_stack: list[str]):
+    """
+    Executes one unary operation or one binary operation and insert the result into the operand_stack
+    :param operand_stack: list of operands
+    :param operator_stack: list of operators
+    :raises InsufficientOperandsError: If there are insufficient operands to perform a binary operation
+    :raises InsufficientOperatorsError: If there are mismatched parentheses
+    :raises InvalidValueForOperatorError: If an operator is given invalid value
+    """
+    record = get_operator_record(operator_stack.pop())
+    if record.arity == 2 and len(operand_stack) >= 2:
+        operand2 = operand_stack.pop()
+        operand_stack.append(apply_binary_operator(record, operand_stack.pop(), operand2))
+    elif record.arity == 1 and operand_stack:
+        operand_stack.append(apply_unary_operator(record, operand_stack.pop()))
+    else:
+        # Raises the matching error, or drops a left unary operator that has no operand
+        pop_operands(operand_stack, record)
 
 
 def handle_operator(operator_stack: list[str], operand_stack: list[int | float], operator: str,
-                    previous: str | int | float, is_previous_left_parenthesis: bool):
+                    previous: str | int | float, is_previous_left_parenthesis: bool, execute=None,
+                    records: dict[str, OperatorRecord] | None = None):
     """
     Handles the current operator in the expression and updates the operator_stack
     :param operand_stack: list of operands
@@ -160,166 +225,358 @@ def handle_operator(operator_stack: list[str], operand_stack: list[int | float],
     :param operator: The operator to process
     :param previous: The last character or number handled
     :param is_previous_left_parenthesis: A boolean indicating if the previous character is a left parenthesis
+    :param execute: A function that executes the operator at the top of the operator_stack (execute_operation by
+    default)
+    :param records: The dictionary of symbols and operator records (OPERATOR_RECORDS by default), which execute must
+    use as well
     :raises InvalidUseOfOperatorError: If an operator is used incorrectly
     :raises InvalidValueForOperatorError: If the execute_operation function raises this exception
     :raises InsufficientOperandsError: If the execute_operation function raises this exception
     :raises InsufficientOperatorsError: If the execute_operation function raises this exception
     """
-    if is_left_unary_operator(previous) and operator != '-' and not is_previous_left_parenthesis:
-        raise InvalidUseOfOperatorError(f"Operator '{previous}' needs to be next to a number or parentheses")
+    if execute is None:
+        execute = execute_operation
+    if records is None:
+        records = OPERATOR_RECORDS
+
+    # previous is None, a number or an operator symbol, so a single lookup tells them apart
+    previous_record = records.get(previous)
+    if previous_record is None:
+        previous_fixity = None
+        is_previous_operand = previous is not None
+    else:
+        previous_fixity = previous_record.fixity
+        is_previous_operand = previous_fixity == POSTFIX
+
+    if previous_fixity == PREFIX and operator != '-' and not is_previous_left_parenthesis:
+        raise InvalidUseOfOperatorError(PREFIX_NEIGHBOR_TEMPLATE.format(previous))
 
     if operator == '-':
         if previous is None or is_previous_left_parenthesis:
             operator = "unaryMinus"
-        elif not is_right_unary_operator(previous) and not is_number(previous):
+        elif not is_previous_operand:
             if previous == "unaryMinus":
                 operator = "unaryMinus"
             else:
                 operator = "numberMinus"
 
-    if is_right_unary_operator(operator):
-        if is_previous_left_parenthesis or not (is_number(previous) or is_right_unary_operator(previous)):
-            raise InvalidUseOfOperatorError(f"Operator '{operator}' should be to the right of a number")
+    record = records[operator]
+    fixity = record.fixity
+    if fixity == POSTFIX:
+        if is_previous_left_parenthesis or not is_previous_operand:
+            raise InvalidUseOfOperatorError(POSTFIX_POSITION_TEMPLATE.format(operator))
 
-    if is_left_unary_operator(operator):
-        if is_number(previous) or is_right_unary_operator(previous):
+    elif fixity == PREFIX:
+        if is_previous_operand:
             if is_previous_left_parenthesis:
-                raise InsufficientOperatorsError("Not enough operators for a binary operation")
+                raise InsufficientOperatorsError(BINARY_OPERATORS_TEMPLATE)
             else:
-                raise InvalidUseOfOperatorError(f"Operator '{operator}' should be to the left of a number")
+                raise InvalidUseOfOperatorError(PREFIX_POSITION_TEMPLATE.format(operator))
 
         operator_stack.append(operator)
         return
 
-    if is_binary_operator(operator):
-        if is_previous_left_parenthesis:
-            raise InsufficientOperandsError(f"Not enough operands for binary operation ('{operator}')")
+    elif is_previous_left_parenthesis:
+        raise InsufficientOperandsError(BINARY_OPERANDS_TEMPLATE.format(operator))
 
-    while operator_stack and not is_top_left_parenthesis(operator_stack) and OPERATORS[
-        operator_stack[-1]].get_precedence() >= OPERATORS[operator].get_precedence():
-        execute_operation(operand_stack, operator_stack)
+    precedence = record.precedence
+    while operator_stack and operator_stack[-1] != '(' and records[operator_stack[-1]].precedence >= precedence:
+        execute(operand_stack, operator_stack)
 
     operator_stack.append(operator)
 
 
-def get_number(expression: str, index: int) -> tuple[int, int]:
+def handle_number(operand_stack: list[int | float], text: str, previous: str | int | float, parse=None,
+                  records: dict[str, OperatorRecord] | None = None) -> int | float:
     """
-    Finds the number in the index place in the expression
-    :param expression: The expression to find the number in
-    :param index: The index where the number is starts
-    :return: A tuple containing the number and the index to proceed from
-    :raises InvalidNumberFormatError: If the number contains more than one decimal point or if a decimal point is not
-    followed or preceded by a digit
+    Converts the text of a number (or variable) token and insert the result into the operand_stack
+    :param operand_stack: list of operands
+    :param text: The text of the number token
+    :param previous: The last character or number handled
+    :param parse: A function that converts the text of a number token (parse_number by default)
+    :param records: The dictionary of symbols and operator records (OPERATOR_RECORDS by default)
+    :return: The number
+    :raises InvalidNumberFormatError: if the parse function raises this exception
+    :raises InsufficientOperatorsError: if there are not enough operators for a binary operation
     """
-    number_ended = False
-    dot_appeared = False
-    number = expression[index]
+    if previous is not None:
+        previous_record = (OPERATOR_RECORDS if records is None else records).get(previous)
+        if previous_record is None or previous_record.fixity == POSTFIX:
+            raise InsufficientOperatorsError(BINARY_OPERATORS_TEMPLATE)
+    number = parse(text) if parse is not None else parse_number(text)
+    operand_stack.append(number)
+    return number
 
-    if number == '.':
-        if index + 1 < len(expression) and expression[index + 1].isdigit():
-            number = '0.'
-            dot_appeared = True
-        else:
-            raise InvalidNumberFormatError("A decimal point must be followed or preceded by a digit")
-
-    index += 1
-    while index < len(expression) and not number_ended:
-        char = expression[index]
-        if char.isdigit():
-            number += char
-            index += 1
-        elif char == '.':
-            if dot_appeared:
-                raise InvalidNumberFormatError("A number cannot contain more than one decimal point")
-            number += '.'
-            dot_appeared = True
-            index += 1
-        else:
-            number_ended = True
 
-    if dot_appeared:
-        number = float(number)
-        if number.is_integer():
-            number = int(number)
-    else:
-        number = int(number)
+def set_expression_limits(max_length: int, max_depth: int):
+    """
+    Sets the limits above which expressions are rejected before they are evaluated
+    :param max_length: The maximal number of characters of an expression
+    :param max_depth: The maximal nesting depth of parentheses
+    """
+    global MAX_EXPRESSION_LENGTH, MAX_NESTING_DEPTH
+    MAX_EXPRESSION_LENGTH = max_length
+    MAX_NESTING_DEPTH = max_depth
+
 
-    return number, index - 1
+def get_expression_limits() -> tuple[int, int]:
+    """
+    Returns the limits above which expressions are rejected before they are evaluated
+    :return: The maximal number of characters of an expression and the maximal nesting depth of parentheses
+    """
+    return MAX_EXPRESSION_LENGTH, MAX_NESTING_DEPTH
 
 
-def handle_number(operand_stack: list[int | float], expression: str, index: int, previous: str | int | float) -> tuple[
-    int, int]:
+def tokenize_expression(expression: str, allow_names: bool = False, start: int = 0):
     """
-    Finds the number in the index place in the expression and insert the result into the operand_stack
-    :param operand_stack: list of operands
-    :param expression: The expression to find the number in
-    :param index: The index where the number starts
-    :param previous: The last character or number handled
-    :return: A tuple containing the number and the index to proceed from
-    :raises InvalidNumberFormatError: if the get_number function raises this exception
-    :raises InsufficientOperatorsError: if there are not enough operators for a binary operation
+    Checks the length of an expression and splits it into tokens
+    :param expression: The expression to tokenize
+    :param allow_names: True if the expression may contain variables
+    :param start: The offset the first token starts at, which must be the end of an earlier token
+    :return: A generator of the tokens of the expression
+    :raises ExpressionTooComplexError: If the expression is longer than the configured maximal length
     """
-    if is_number(previous) or is_right_unary_operator(previous):
-        raise InsufficientOperatorsError("Not enough operators for a binary operation")
-    number, index = get_number(expression, index)
-    operand_stack.append(number)
-    return number, index
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionTooComplexError(LENGTH_TEMPLATE.format(MAX_EXPRESSION_LENGTH))
+    return tokenize(expression, allow_names, start)
 
 
-def evaluate_expression(expression: str) -> int | float:
+def process_tokens(tokens, execute=None, parse=None, state: ShuntingYardState | None = None, checkpoint=None,
+                   records: dict[str, OperatorRecord] | None = None, max_depth: int | None = None):
     """
-    Evaluates the given expression
-    :param expression: The expression to evaluate
-    :return: The result of the expression
+    Runs the shunting-yard algorithm over the tokens of an expression.
+    Every token is pushed and popped at most once and nothing recurses, so the time is linear in the number of tokens
+    and the stacks never hold more items than there are tokens
+    :param tokens: An iterable of the tokens of the expression
+    :param execute: A function that executes the operator at the top of the operator_stack (execute_operation by
+    default). Replacing it allows building other representations of the expression with the same validation
+    :param parse: A function that converts the text of a number token (parse_number by default)
+    :param state: The state to resume from, whose stacks are updated in place (empty stacks by default). The tokens
+    must start where the tokens that led to the state ended
+    :param checkpoint: A function called after every token with the offset the token ends at, the previous item,
+    whether it is a left parenthesis and the nesting depth, while the stacks of the state hold the state after the
+    token (or None)
+    :param records: The dictionary of symbols and operator records (OPERATOR_RECORDS by default), which execute must
+    use as well
+    :param max_depth: The maximal nesting depth of parentheses (the configured limit by default)
+    :return: The single item left on the operand stack after all the operators were executed
+    :raises ExpressionTooComplexError: If the parentheses are nested deeper than the configured maximal depth
     :raises InvalidNumberFormatError: If the handle_number function raises this exception
-    :raises UnknownCharacterError: If an invalid character is encountered in the expression
+    :raises UnknownCharacterError: If the tokens raise this exception
     :raises InsufficientOperandsError: If there are not enough operands in the expression or if the handle_operator
     function raises this exception
     :raises InsufficientOperatorsError: If the handle_number function raises this exception or if the handle_operator
     function raises this exception
     :raises InvalidUseOfOperatorError: If the handle_operator function raises this exception
-    :raises InvalidValueForOperatorError: If the execute_operation function raises this exception or if the
-    handle_operator function raises this exception
+    :raises InvalidValueForOperatorError: If the execute function raises this exception
     """
-    operand_stack = []
-    operator_stack = []
-    index = 0
-    previous = None
-    is_previous_left_parenthesis = False
-    while index < len(expression):
-        char = expression[index]
-
-        if char == ' ' or char == '\t':
-            pass
-            is_previous_left_parenthesis = False
-
-        elif char.isdigit() or char == '.':
-            number, index = handle_number(operand_stack, expression, index, previous)
-            previous = number
+    if execute is None:
+        execute = execute_operation
+    if state is None:
+        operand_stack = []
+        operator_stack = []
+        previous = None
+        is_previous_left_parenthesis = False
+        depth = 0
+    else:
+        operand_stack, operator_stack, previous, is_previous_left_parenthesis, depth = state
+    if max_depth is None:
+        max_depth = MAX_NESTING_DEPTH
+    for kind, value, offset in tokens:
+        if kind == NUMBER:
+            previous = handle_number(operand_stack, value, previous, parse, records)
             is_previous_left_parenthesis = False
 
-        elif is_operator(char):
-            handle_operator(operator_stack, operand_stack, char, previous, is_previous_left_parenthesis)
+        elif kind == OPERATOR:
+            handle_operator(operator_stack, operand_stack, value, previous, is_previous_left_parenthesis, execute,
+                            records)
             previous = operator_stack[-1]
             is_previous_left_parenthesis = False
 
-        elif char == '(':
-            operator_stack.append(char)
+        elif kind == LEFT_PARENTHESIS:
+            depth += 1
+            if depth > max_depth:
+                raise ExpressionTooComplexError(DEPTH_TEMPLATE.format(max_depth))
+            operator_stack.append(value)
             is_previous_left_parenthesis = True
 
-        elif char == ')':
-            handle_right_parenthesis(operator_stack, operand_stack, is_previous_left_parenthesis)
+        elif kind == RIGHT_PARENTHESIS:
+            handle_right_parenthesis(operator_stack, operand_stack, is_previous_left_parenthesis, execute)
+            depth -= 1
+            is_previous_left_parenthesis = False
+
+        elif kind == NAME:
+            previous = handle_number(operand_stack, value, previous, Variable, records)
             is_previous_left_parenthesis = False
 
         else:
-            raise UnknownCharacterError(f"Invalid character encountered: {char}")
+            is_previous_left_parenthesis = False
 
-        index += 1
+        if checkpoint is not None:
+            checkpoint(offset + len(value), previous, is_previous_left_parenthesis, depth)
 
     while operator_stack:
-        execute_operation(operand_stack, operator_stack)
+        execute(operand_stack, operator_stack)
 
     if not operand_stack:
-        raise InsufficientOperandsError("Insufficient operands in the expression")
+        raise InsufficientOperandsError(INSUFFICIENT_OPERANDS_TEMPLATE)
 
     return operand_stack.pop()
+
+
+def process_expression(expression: str, execute=None, allow_names: bool = False):
+    """
+    Runs the shunting-yard algorithm over the given expression
+    :param expression: The expression to process
+    :param execute: A function that executes the operator at the top of the operator_stack (execute_operation by
+    default)
+    :param allow_names: True if the expression may contain variables, which are inserted as Variable instances
+    :return: The single item left on the operand stack after all the operators were executed
+    :raises ExpressionTooComplexError: If the expression is longer or nested deeper than the configured limits
+    :raises InvalidNumberFormatError: If the handle_number function raises this exception
+    :raises UnknownCharacterError: If an invalid character is encountered in the expression
+    :raises InsufficientOperandsError: If there are not enough operands in the expression or if the handle_operator
+    function raises this exception
+    :raises InsufficientOperatorsError: If the handle_number function raises this exception or if the handle_operator
+    function raises this exception
+    :raises InvalidUseOfOperatorError: If the handle_operator function raises this exception
+    :raises InvalidValueForOperatorError: If the execute function raises this exception
+    """
+    return process_tokens(tokenize_expression(expression, allow_names), execute)
+
+
+def set_instrumentation(instrumentation):
+    """
+    Installs an instrumentation that evaluate_expression hands every expression to, or removes it
+    :param instrumentation: An Instrumentation from calculator_core.instrumentation, or None to remove it
+    """
+    global INSTRUMENTATION
+    INSTRUMENTATION = instrumentation
+
+
+def get_instrumentation():
+    """
+    Returns the instrumentation that evaluate_expression hands every expression to
+    :return: The installed Instrumentation, or None
+    """
+    return INSTRUMENTATION
+
+
+def set_resource_limits(resource_limits):
+    """
+    Installs resource limits that evaluate_expression enforces on every expression, or removes them.
+    When an instrumentation is installed as well, it profiles the evaluations within the limits
+    :param resource_limits: A ResourceLimits from calculator_core.resource_limits, or None to remove them
+    """
+    global RESOURCE_LIMITS
+    RESOURCE_LIMITS = resource_limits
+
+
+def get_resource_limits():
+    """
+    Returns the resource limits that evaluate_expression enforces on every expression
+    :return: The installed ResourceLimits, or None
+    """
+    return RESOURCE_LIMITS
+
+
+def get_hooks() -> list:
+    """
+    Returns the installed hooks in the order they wrap an evaluation, the instrumentation around the resource limits
+    :return: A list of the installed Instrumentation and ResourceLimits
+    """
+    return [hook for hook in (INSTRUMENTATION, RESOURCE_LIMITS) if hook is not None]
+
+
+def tokenize_lazily(expression: str, allow_names: bool = False, start: int = 0):
+    """
+    Splits an expression into tokens like tokenize_expression, but checks its length when the first token is read, so
+    that the error is raised inside the hooks that read the tokens
+    :param expression: The expression to tokenize
+    :param allow_names: True if the expression may contain variables
+    :param start: The offset the first token starts at, which must be the end of an earlier token
+    :return: A generator of the tokens of the expression
+    :raises ExpressionTooComplexError: If the expression is longer than the configured maximal length
+    """
+    yield from tokenize_expression(expression, allow_names, start)
+
+
+def run_hooks(expression: str, tokens, execute=None, parse=None, run=None, hooks: list | None = None):
+    """
+    Runs the shunting-yard algorithm over the tokens of an expression through hooks. Every hook has a
+    process(expression, tokens, execute, parse, run) method that wraps the tokens and the execute and parse functions
+    before it passes them to run, which is the next hook, or process_tokens for the innermost one
+    :param expression: The expression, for the hooks
+    :param tokens: An iterable of the tokens of the expression
+    :param execute: A function that executes the operator at the top of the operator_stack (execute_operation by
+    default)
+    :param parse: A function that converts the text of a number token (parse_number by default)
+    :param run: A function called with the tokens, the execute and the parse functions that processes them
+    (process_tokens by default)
+    :param hooks: The hooks from the outermost to the innermost (the installed ones by default)
+    :return: The result of the expression
+    :raises ResourceLimitExceededError: If resource limits are among the hooks and the evaluation exceeds one of them
+    """
+    if execute is None:
+        execute = execute_operation
+    if parse is None:
+        parse = parse_number
+    if run is None:
+        run = process_tokens
+    if hooks is None:
+        hooks = get_hooks()
+    for hook in reversed(hooks):
+        run = partial(hook.process, expression, run=run)
+    return run(tokens, execute, parse)
+
+
+def evaluate_with_hooks(expression: str, backend=None, hooks: list | None = None) -> int | float:
+    """
+    Evaluates an expression through hooks, see run_hooks
+    :param expression: The expression to evaluate
+    :param backend: A numeric backend from calculator_core.numeric_backends, or None for the default float arithmetic
+    :param hooks: The hooks from the outermost to the innermost (the installed ones by default)
+    :return: The result of the expression
+    :raises ExpressionTooComplexError: If the expression is longer or nested deeper than the configured limits
+    :raises InvalidNumberFormatError: If the expression contains an invalid number
+    :raises UnknownCharacterError: If an invalid character is encountered in the expression
+    :raises InsufficientOperandsError: If there are not enough operands in the expression
+    :raises InsufficientOperatorsError: If there are not enough operators or mismatched parentheses
+    :raises InvalidUseOfOperatorError: If an operator is used incorrectly
+    :raises InvalidValueForOperatorError: If an operator is given invalid value
+    :raises ResourceLimitExceededError: If resource limits are among the hooks and the evaluation exceeds one of them
+    """
+    if backend is None:
+        return run_hooks(expression, tokenize_lazily(expression), hooks=hooks)
+    with backend.activate():
+        return run_hooks(expression, tokenize_lazily(expression), backend.execute_operation, backend.parse_number,
+                         hooks=hooks)
+
+
+def evaluate_expression(expression: str, backend=None) -> int | float:
+    """
+    Evaluates the given expression.
+    It can be called from several threads, since every call has its own stacks, but it reads the registered operators,
+    the expression limits and the installed hooks when it is called. calculator_core.evaluator.Evaluator keeps its own
+    copy of this configuration
+    :param expression: The expression to evaluate
+    :param backend: A numeric backend from calculator_core.numeric_backends, or None for the default float arithmetic
+    :return: The result of the expression
+    :raises ExpressionTooComplexError: If the expression is longer or nested deeper than the configured limits
+    :raises InvalidNumberFormatError: If the handle_number function raises this exception
+    :raises UnknownCharacterError: If an invalid character is encountered in the expression
+    :raises InsufficientOperandsError: If there are not enough operands in the expression or if the handle_operator
+    function raises this exception
+    :raises InsufficientOperatorsError: If the handle_number function raises this exception or if the handle_operator
+    function raises this exception
+    :raises InvalidUseOfOperatorError: If the handle_operator function raises this exception
+    :raises InvalidValueForOperatorError: If the execute_operation function raises this exception or if the
+    handle_operator function raises this exception
+    :raises ResourceLimitExceededError: If resource limits are installed and the evaluation exceeds one of them
+    """
+    if INSTRUMENTATION is not None or RESOURCE_LIMITS is not None:
+        return evaluate_with_hooks(expression, backend)
+    if backend is None:
+        return process_expression(expression)
+    with backend.activate():
+        return process_tokens(tokenize_expression(expression), backend.execute_operation, backend.parse_number)
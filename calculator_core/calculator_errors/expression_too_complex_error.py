@@ -0,0 +1,6 @@
+"""
+Kept for backward compatibility, the class is defined in calculator_core.errors
+"""
+from calculator_core.errors import ExpressionTooComplexError
+
+__all__ = ["ExpressionTooComplexError"]
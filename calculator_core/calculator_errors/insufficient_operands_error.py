@@ -1,3 +1,6 @@
-class InsufficientOperandsError(Exception):
-    """Exception raised when there are not enough operands for an operation"""
-    pass
+"""
+Kept for backward compatibility, the class is defined in calculator_core.errors
+"""
+from calculator_core.errors import InsufficientOperandsError
+
+__all__ = ["InsufficientOperandsError"]
@@ -1,3 +1,6 @@
-class InvalidNumberFormatError(Exception):
-    """Exception raised for invalid number format"""
-    pass
+"""
+Kept for backward compatibility, the class is defined in calculator_core.errors
+"""
+from calculator_core.errors import InvalidNumberFormatError
+
+__all__ = ["InvalidNumberFormatError"]
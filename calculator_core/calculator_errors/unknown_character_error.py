@@ -1,3 +1,6 @@
-class UnknownCharacterError(Exception):
-    """Exception raised when an invalid character is encountered in the expression"""
-    pass
+"""
+Kept for backward compatibility, the class is defined in calculator_core.errors
+"""
+from calculator_core.errors import UnknownCharacterError
+
+__all__ = ["UnknownCharacterError"]
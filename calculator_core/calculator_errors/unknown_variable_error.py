@@ -0,0 +1,6 @@
+"""
+Kept for backward compatibility, the class is defined in calculator_core.errors
+"""
+from calculator_core.errors import UnknownVariableError
+
+__all__ = ["UnknownVariableError"]
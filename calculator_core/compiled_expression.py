@@ -0,0 +1,109 @@
+from calculator_core.calculator import apply_binary_operator, apply_unary_operator
+from calculator_core.errors import UnknownVariableError
+from calculator_core.expression_tree import (ExpressionNode, OperationNode, VariableNode, iterate_post_order,
+                                             optimize_tree, parse_expression_tree)
+
+from operators.operator_types.operator_record import OperatorRecord
+
+PUSH_CONSTANT = 0
+APPLY_UNARY = 1
+APPLY_BINARY = 2
+LOAD_VARIABLE = 3
+
+
+class CompiledExpression(object):
+    """
+    Represents an expression that was parsed once into a flat postfix program
+    """
+
+    def __init__(self, expression: str, program: tuple[tuple[int, OperatorRecord | str | int | float], ...]):
+        """
+        Initializes a new CompiledExpression instance
+        :param expression: The source expression
+        :param program: The postfix program, a tuple of (opcode, constant, variable name or operator record)
+        instructions
+        """
+        self.__expression = expression
+        self.__program = program
+        self.__variables = tuple(sorted({argument for opcode, argument in program if opcode == LOAD_VARIABLE}))
+
+    def get_expression(self) -> str:
+        """
+        Returns the source expression
+        :return: The source expression
+        """
+        return self.__expression
+
+    def get_program(self) -> tuple[tuple[int, OperatorRecord | str | int | float], ...]:
+        """
+        Returns the postfix program
+        :return: The postfix program
+        """
+        return self.__program
+
+    def get_variables(self) -> tuple[str, ...]:
+        """
+        Returns the names of the variables of the expression
+        :return: The sorted names of the variables
+        """
+        return self.__variables
+
+    def evaluate(self, **variables: int | float) -> int | float:
+        """
+        Evaluates the compiled expression by walking its postfix program
+        :param variables: The values of the variables of the expression
+        :return: The result of the expression
+        :raises UnknownVariableError: If no value is given for a variable of the expression
+        :raises InvalidValueForOperatorError: If an operator is given invalid value
+        """
+        stack = []
+        for opcode, argument in self.__program:
+            if opcode == PUSH_CONSTANT:
+                stack.append(argument)
+            elif opcode == APPLY_UNARY:
+                stack.append(apply_unary_operator(argument, stack.pop()))
+            elif opcode == APPLY_BINARY:
+                operand2 = stack.pop()
+                stack.append(apply_binary_operator(argument, stack.pop(), operand2))
+            elif argument in variables:
+                stack.append(variables[argument])
+            else:
+                raise UnknownVariableError(f"No value was given for the variable '{argument}'")
+        return stack.pop()
+
+
+def flatten_tree(root: ExpressionNode) -> tuple[tuple[int, OperatorRecord | str | int | float], ...]:
+    """
+    Converts an expression tree into a postfix program without recursion
+    :param root: The root node
+    :return: The postfix program
+    """
+    program = []
+    for node in iterate_post_order(root):
+        if isinstance(node, OperationNode):
+            record = node.get_record()
+            program.append((APPLY_UNARY if record.arity == 1 else APPLY_BINARY, record))
+        elif isinstance(node, VariableNode):
+            program.append((LOAD_VARIABLE, node.get_name()))
+        else:
+            program.append((PUSH_CONSTANT, node.get_value()))
+    return tuple(program)
+
+
+def compile_expression(expression: str, allow_names: bool = False, optimize: bool = False) -> CompiledExpression:
+    """
+    Parses the given expression once into a reusable CompiledExpression
+    :param expression: The expression to compile
+    :param allow_names: True if the expression may contain variables (names of letters, digits and underscores)
+    :param optimize: True to fold constants and remove redundant operations before the program is built
+    :return: The compiled expression
+    :raises InvalidNumberFormatError: If the expression contains an invalid number
+    :raises UnknownCharacterError: If an invalid character is encountered in the expression
+    :raises InsufficientOperandsError: If there are not enough operands in the expression
+    :raises InsufficientOperatorsError: If there are not enough operators or mismatched parentheses
+    :raises InvalidUseOfOperatorError: If an operator is used incorrectly
+    """
+    root = parse_expression_tree(expression, allow_names)
+    if optimize:
+        root = optimize_tree(root)
+    return CompiledExpression(expression, flatten_tree(root))
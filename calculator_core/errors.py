@@ -0,0 +1,66 @@
+"""
+The exceptions of the calculator, defined in a single module so a cold start imports one file for all of them.
+The modules under calculator_core/calculator_errors and operators/operator_errors re-export these classes, so both
+import paths give the same class. The templates of their messages are defined here as well, so that every evaluation
+path, including the non-raising one of calculator_core.evaluation_result, reports the same messages
+"""
+
+INSUFFICIENT_OPERANDS_TEMPLATE = "Insufficient operands in the expression"
+BINARY_OPERANDS_TEMPLATE = "Not enough operands for binary operation ('{}')"
+BINARY_OPERATORS_TEMPLATE = "Not enough operators for a binary operation"
+MISMATCHED_PARENTHESES_TEMPLATE = "Mismatched parentheses"
+DECIMAL_POINT_TEMPLATE = "A decimal point must be followed or preceded by a digit"
+DECIMAL_POINTS_TEMPLATE = "A number cannot contain more than one decimal point"
+UNKNOWN_CHARACTER_TEMPLATE = "Invalid character encountered: {}"
+LENGTH_TEMPLATE = "The expression is longer than {} characters"
+DEPTH_TEMPLATE = "Parentheses are nested deeper than {} levels"
+EMPTY_PARENTHESES_TEMPLATE = "Empty parentheses"
+INVALID_USE_TEMPLATE = "Invalid use of '{}' operator"
+PREFIX_NEIGHBOR_TEMPLATE = "Operator '{}' needs to be next to a number or parentheses"
+POSTFIX_POSITION_TEMPLATE = "Operator '{}' should be to the right of a number"
+PREFIX_POSITION_TEMPLATE = "Operator '{}' should be to the left of a number"
+
+
+class InsufficientOperandsError(Exception):
+    """Exception raised when there are not enough operands for an operation"""
+    pass
+
+
+class InsufficientOperatorsError(Exception):
+    """Exception raised when there are not enough operands for an operation."""
+    pass
+
+
+class InvalidNumberFormatError(Exception):
+    """Exception raised for invalid number format"""
+    pass
+
+
+class UnknownCharacterError(Exception):
+    """Exception raised when an invalid character is encountered in the expression"""
+    pass
+
+
+class UnknownVariableError(Exception):
+    """Exception raised when an expression is evaluated without a value for one of its variables"""
+    pass
+
+
+class ExpressionTooComplexError(Exception):
+    """Exception raised when an expression is longer or more deeply nested than the configured limits"""
+    pass
+
+
+class InvalidUseOfOperatorError(Exception):
+    """Exception raised for invalid use of an operator."""
+    pass
+
+
+class InvalidValueForOperatorError(Exception):
+    """Exception raised for invalid value for an operator."""
+    pass
+
+
+class ResourceLimitExceededError(Exception):
+    """Exception raised when an evaluation exceeds its operation budget, integer size or time limit"""
+    pass
@@ -0,0 +1,239 @@
+"""
+A non-raising evaluation API for workloads with many invalid expressions.
+try_evaluate runs process_tokens through the installed hooks like evaluate_expression, and reports the first error as an
+error code, a message template and the offset of the token that caused it, instead of raising. The message is only
+formatted when it is requested, and the exception of evaluate_expression can still be built from the result. The
+templates are the ones calculator_core.errors defines for the code that raises the errors
+"""
+import re
+from functools import partial
+
+from calculator_core.calculator import (ShuntingYardState, execute_operation, process_tokens, run_hooks,
+                                        tokenize_expression)
+from calculator_core.errors import (BINARY_OPERANDS_TEMPLATE, BINARY_OPERATORS_TEMPLATE, DECIMAL_POINT_TEMPLATE,
+                                    DECIMAL_POINTS_TEMPLATE, DEPTH_TEMPLATE, EMPTY_PARENTHESES_TEMPLATE,
+                                    INSUFFICIENT_OPERANDS_TEMPLATE, INVALID_USE_TEMPLATE, LENGTH_TEMPLATE,
+                                    MISMATCHED_PARENTHESES_TEMPLATE, POSTFIX_POSITION_TEMPLATE,
+                                    PREFIX_NEIGHBOR_TEMPLATE, PREFIX_POSITION_TEMPLATE, UNKNOWN_CHARACTER_TEMPLATE,
+                                    ExpressionTooComplexError, InsufficientOperandsError, InsufficientOperatorsError,
+                                    InvalidNumberFormatError, InvalidUseOfOperatorError, InvalidValueForOperatorError,
+                                    ResourceLimitExceededError, UnknownCharacterError)
+from calculator_core.lexer import OPERATOR, RIGHT_PARENTHESIS
+
+# The error codes, 0 for a successful evaluation
+SUCCESS = 0
+INSUFFICIENT_OPERANDS = 1
+INSUFFICIENT_OPERATORS = 2
+INVALID_NUMBER_FORMAT = 3
+UNKNOWN_CHARACTER = 4
+EXPRESSION_TOO_COMPLEX = 5
+INVALID_USE_OF_OPERATOR = 6
+INVALID_VALUE_FOR_OPERATOR = 7
+RESOURCE_LIMIT_EXCEEDED = 8
+
+ERROR_CLASSES = (None, InsufficientOperandsError, InsufficientOperatorsError, InvalidNumberFormatError,
+                 UnknownCharacterError, ExpressionTooComplexError, InvalidUseOfOperatorError,
+                 InvalidValueForOperatorError, ResourceLimitExceededError)
+
+# The messages of the errors of evaluate_expression, formatted with the argument of the result: (error code, template)
+MESSAGES = ((SUCCESS, ""),
+            (INSUFFICIENT_OPERANDS, INSUFFICIENT_OPERANDS_TEMPLATE),
+            (INSUFFICIENT_OPERANDS, BINARY_OPERANDS_TEMPLATE),
+            (INSUFFICIENT_OPERATORS, BINARY_OPERATORS_TEMPLATE),
+            (INSUFFICIENT_OPERATORS, MISMATCHED_PARENTHESES_TEMPLATE),
+            (INVALID_NUMBER_FORMAT, DECIMAL_POINT_TEMPLATE),
+            (INVALID_NUMBER_FORMAT, DECIMAL_POINTS_TEMPLATE),
+            (UNKNOWN_CHARACTER, UNKNOWN_CHARACTER_TEMPLATE),
+            (EXPRESSION_TOO_COMPLEX, LENGTH_TEMPLATE),
+            (EXPRESSION_TOO_COMPLEX, DEPTH_TEMPLATE),
+            (INVALID_USE_OF_OPERATOR, EMPTY_PARENTHESES_TEMPLATE),
+            (INVALID_USE_OF_OPERATOR, INVALID_USE_TEMPLATE),
+            (INVALID_USE_OF_OPERATOR, PREFIX_NEIGHBOR_TEMPLATE),
+            (INVALID_USE_OF_OPERATOR, POSTFIX_POSITION_TEMPLATE),
+            (INVALID_USE_OF_OPERATOR, PREFIX_POSITION_TEMPLATE),
+            (INVALID_VALUE_FOR_OPERATOR, "{}"),
+            (RESOURCE_LIMIT_EXCEEDED, "{}"))
+
+(NO_ERROR, INSUFFICIENT_OPERANDS_MESSAGE, BINARY_OPERANDS_MESSAGE, BINARY_OPERATORS_MESSAGE, MISMATCHED_MESSAGE,
+ DECIMAL_POINT_MESSAGE, DECIMAL_POINTS_MESSAGE, UNKNOWN_CHARACTER_MESSAGE, LENGTH_MESSAGE, DEPTH_MESSAGE,
+ EMPTY_PARENTHESES_MESSAGE, INVALID_USE_MESSAGE, PREFIX_NEIGHBOR_MESSAGE, POSTFIX_POSITION_MESSAGE,
+ PREFIX_POSITION_MESSAGE, INVALID_VALUE_MESSAGE, RESOURCE_LIMIT_MESSAGE) = range(len(MESSAGES))
+
+# The messages of every error class, with a pattern that matches the formatted message and captures its argument
+MESSAGE_PATTERNS = {}
+for message_id, (code, template) in enumerate(MESSAGES[1:], 1):
+    MESSAGE_PATTERNS.setdefault(ERROR_CLASSES[code], []).append(
+        (message_id, re.compile(re.escape(template).replace(r"\{\}", "(.*)"), re.DOTALL)))
+
+
+class EvaluationResult(object):
+    """
+    The outcome of try_evaluate: the value of the expression, or the code, message and source offset of its first error
+    """
+    __slots__ = ('__value', '__message_id', '__argument', '__offset')
+
+    def __init__(self, value: int | float | None = None, message_id: int = NO_ERROR, argument=None, offset: int = -1):
+        """
+        Initializes a new EvaluationResult instance
+        :param value: The value of the expression, None if the evaluation failed
+        :param message_id: The index of the message of the error in MESSAGES, NO_ERROR for a successful evaluation
+        :param argument: The value the message is formatted with
+        :param offset: The offset of the token that caused the error in the expression
+        """
+        self.__value = value
+        self.__message_id = message_id
+        self.__argument = argument
+        self.__offset = offset
+
+    def __repr__(self) -> str:
+        if self.is_success():
+            return f"EvaluationResult(value={self.__value!r})"
+        return f"EvaluationResult(error={self.get_error_name()}, offset={self.__offset})"
+
+    def is_success(self) -> bool:
+        """
+        Checks if the expression was evaluated
+        :return: True if the result holds a value, False if it holds an error
+        """
+        return self.__message_id == NO_ERROR
+
+    def get_value(self) -> int | float | None:
+        """
+        Returns the value of the expression
+        :return: The value, or None if the evaluation failed
+        """
+        return self.__value
+
+    def get_error_code(self) -> int:
+        """
+        Returns the code of the error
+        :return: One of the error codes of this module, SUCCESS if the evaluation succeeded
+        """
+        return MESSAGES[self.__message_id][0]
+
+    def get_message_id(self) -> int:
+        """
+        Returns the index of the message of the error in MESSAGES
+        :return: The index of the message, NO_ERROR if the evaluation succeeded
+        """
+        return self.__message_id
+
+    def get_error_name(self) -> str | None:
+        """
+        Returns the name of the exception class that evaluate_expression raises for the error
+        :return: The name of the class, or None if the evaluation succeeded
+        """
+        error_class = ERROR_CLASSES[self.get_error_code()]
+        return None if error_class is None else error_class.__name__
+
+    def get_offset(self) -> int:
+        """
+        Returns the offset of the token that caused the error: the operator whose operation failed for the errors of an
+        operation, and the end of the expression for the errors found after the last token
+        :return: The offset, or -1 if the evaluation succeeded
+        """
+        return self.__offset
+
+    def get_message(self) -> str:
+        """
+        Formats the message of the error
+        :return: The message of the exception that evaluate_expression raises, or an empty string on success
+        """
+        return MESSAGES[self.__message_id][1].format(self.__argument)
+
+    def to_exception(self) -> Exception | None:
+        """
+        Builds the exception that evaluate_expression raises for the error
+        :return: The exception, or None if the evaluation succeeded
+        """
+        error_class = ERROR_CLASSES[self.get_error_code()]
+        if error_class is None:
+            return None
+        if self.__message_id == INVALID_VALUE_MESSAGE:
+            return error_class(self.__argument)
+        return error_class(self.get_message())
+
+    def unwrap(self) -> int | float:
+        """
+        Returns the value of the expression, or raises its error
+        :return: The value
+        :raises Exception: The exception that evaluate_expression raises for the expression
+        """
+        if self.is_success():
+            return self.__value
+        raise self.to_exception()
+
+
+def detach_error(error: Exception) -> Exception:
+    """
+    Drops the traceback and the context of an error raised by an operator function. They reference the frames of the
+    evaluation, which would keep the result and the stacks alive until the next garbage collection
+    :param error: The error
+    :return: The same error
+    """
+    error.__traceback__ = None
+    error.__context__ = None
+    return error
+
+
+def build_result(error: Exception, offset: int) -> EvaluationResult:
+    """
+    Builds the result of an error raised by an evaluation
+    :param error: The error, one of ERROR_CLASSES
+    :param offset: The offset of the token that caused the error
+    :return: The result of the error, with the message it was raised with
+    """
+    if isinstance(error, InvalidValueForOperatorError):
+        argument = error.args[0]
+        return EvaluationResult(None, INVALID_VALUE_MESSAGE,
+                                detach_error(argument) if isinstance(argument, Exception) else argument, offset)
+    message = str(error)
+    for message_id, pattern in MESSAGE_PATTERNS[error.__class__]:
+        match = pattern.fullmatch(message)
+        if match is not None:
+            return EvaluationResult(None, message_id, match.group(1) if match.re.groups else None, offset)
+    raise ValueError(f"Unknown message of {error.__class__.__name__}: {message}")
+
+
+def try_evaluate(expression: str) -> EvaluationResult:
+    """
+    Evaluates an expression without raising the errors of the calculator.
+    It runs process_tokens through the installed hooks, so the result holds the error that evaluate_expression raises
+    :param expression: The expression to evaluate
+    :return: The value of the expression, or its first error with the offset of the token that caused it (the operator
+    of a failed operation)
+    :raises OverflowError: If an operation raises it, like evaluate_expression
+    """
+    operator_stack = []
+    # The offsets of the operators and the left parentheses on the operator stack
+    offset_stack = []
+    # The offset of the current token, or of the next one between two tokens
+    offset = 0
+    # The offset of the operator being executed
+    operator_offset = None
+
+    def locate():
+        nonlocal offset
+        for token in tokenize_expression(expression):
+            kind, value, offset = token
+            yield token
+            if OPERATOR <= kind <= RIGHT_PARENTHESIS:
+                # The token was handled: it pushed an operator or a left parenthesis, or popped a left parenthesis
+                # without execute
+                if len(offset_stack) < len(operator_stack):
+                    offset_stack.append(offset)
+                elif len(offset_stack) > len(operator_stack):
+                    offset_stack.pop()
+            offset += len(value)
+
+    def execute(operand_stack: list[int | float], operator_stack: list[str]):
+        nonlocal operator_offset
+        operator_offset = offset_stack.pop()
+        execute_operation(operand_stack, operator_stack)
+        operator_offset = None
+
+    try:
+        return EvaluationResult(run_hooks(expression, locate(), execute,
+                                          run=partial(process_tokens, state=ShuntingYardState([], operator_stack))))
+    except ERROR_CLASSES[1:] as e:
+        return build_result(e, offset if operator_offset is None else operator_offset)
@@ -0,0 +1,144 @@
+"""
+Evaluators with their own configuration, for applications that evaluate expressions from many threads.
+An Evaluator takes a snapshot of the operator table and the expression limits when it is created, so operators
+registered later and set_expression_limits do not change it. It keeps its stacks between evaluations in thread-local
+storage: every thread reuses its own stacks, so a single Evaluator can be shared by the threads of a pool. It runs
+process_tokens with its own records, so the results and the raised errors are the same as those of evaluate_expression
+with the same operators
+"""
+import threading
+
+from calculator_core.calculator import (ShuntingYardState, apply_binary_operator, apply_unary_operator,
+                                        get_expression_limits, get_operator_record, pop_operands, process_tokens)
+from calculator_core.errors import LENGTH_TEMPLATE, ExpressionTooComplexError
+from calculator_core.lexer import build_token_pattern, tokenize
+
+from operators.operator_registry import REGISTRY_LOCK, build_operator_records, get_registry_version
+from operators.operator_types.operator_record import OperatorRecord
+from operators.operators_dict import OPERATORS
+
+DEFAULT_EVALUATOR = None
+DEFAULT_EVALUATOR_KEY = None
+
+
+class Evaluator(object):
+    """
+    Evaluates expressions with its own operator table, numeric backend and expression limits
+    """
+
+    def __init__(self, operators: dict | None = None, backend=None, max_length: int | None = None,
+                 max_depth: int | None = None):
+        """
+        Initializes a new Evaluator instance
+        :param operators: A dictionary of symbols and operators, like OPERATORS. It needs the "unaryMinus" and
+        "numberMinus" operators to handle '-' (a copy of the registered operators by default)
+        :param backend: A numeric backend from calculator_core.numeric_backends, or None for the default float
+        arithmetic
+        :param max_length: The maximal number of characters of an expression (the configured limit by default)
+        :param max_depth: The maximal nesting depth of parentheses (the configured limit by default)
+        """
+        if operators is None:
+            with REGISTRY_LOCK:
+                operators = dict(OPERATORS)
+        default_length, default_depth = get_expression_limits()
+        self.__records = build_operator_records(operators)
+        self.__token_pattern = build_token_pattern(operators)
+        self.__backend = backend
+        self.__max_length = default_length if max_length is None else max_length
+        self.__max_depth = default_depth if max_depth is None else max_depth
+        self.__scratch = threading.local()
+
+    def get_backend(self):
+        """
+        Returns the numeric backend of the evaluator
+        :return: The backend, or None for the default float arithmetic
+        """
+        return self.__backend
+
+    def get_expression_limits(self) -> tuple[int, int]:
+        """
+        Returns the limits above which expressions are rejected before they are evaluated
+        :return: The maximal number of characters of an expression and the maximal nesting depth of parentheses
+        """
+        return self.__max_length, self.__max_depth
+
+    def get_operator_records(self) -> dict[str, OperatorRecord]:
+        """
+        Returns the operator table of the evaluator
+        :return: A copy of the dictionary of symbols and operator records
+        """
+        return dict(self.__records)
+
+    def evaluate(self, expression: str) -> int | float:
+        """
+        Evaluates the given expression
+        :param expression: The expression to evaluate
+        :return: The result of the expression
+        :raises ExpressionTooComplexError: If the expression is longer or nested deeper than the limits of the evaluator
+        :raises InvalidNumberFormatError: If the expression contains an invalid number
+        :raises UnknownCharacterError: If an invalid character is encountered in the expression
+        :raises InsufficientOperandsError: If there are not enough operands in the expression
+        :raises InsufficientOperatorsError: If there are not enough operators or mismatched parentheses
+        :raises InvalidUseOfOperatorError: If an operator is used incorrectly
+        :raises InvalidValueForOperatorError: If an operator is given invalid value
+        """
+        if len(expression) > self.__max_length:
+            raise ExpressionTooComplexError(LENGTH_TEMPLATE.format(self.__max_length))
+        scratch = self.__scratch
+        stacks = getattr(scratch, 'stacks', None)
+        if stacks is None:
+            # The first evaluation of this thread, or an evaluation nested in an operator of another one
+            stacks = ([], [])
+        else:
+            scratch.stacks = None
+        try:
+            state = ShuntingYardState(*stacks)
+            tokens = tokenize(expression, pattern=self.__token_pattern)
+            if self.__backend is None:
+                return process_tokens(tokens, self.__execute, None, state, records=self.__records,
+                                      max_depth=self.__max_depth)
+            with self.__backend.activate():
+                return process_tokens(tokens, self.__execute, self.__backend.parse_number, state,
+                                      records=self.__records, max_depth=self.__max_depth)
+        finally:
+            stacks[0].clear()
+            stacks[1].clear()
+            scratch.stacks = stacks
+
+    def __execute(self, operand_stack: list, operator_stack: list[str]):
+        """
+        Executes the operator at the top of the operator_stack like calculator.execute_operation, with the records and
+        the backend of the evaluator
+        :param operand_stack: The operand stack
+        :param operator_stack: The operator stack
+        :raises InsufficientOperandsError: If there are insufficient operands to perform a binary operation
+        :raises InsufficientOperatorsError: If there are mismatched parentheses
+        :raises InvalidUseOfOperatorError: If a right unary operator has no operand
+        :raises InvalidValueForOperatorError: If an operator is given invalid value
+        """
+        record = get_operator_record(operator_stack.pop(), self.__records)
+        operands = pop_operands(operand_stack, record)
+        if not operands:
+            # A left unary operator without operand is dropped
+            return
+
+        if self.__backend is not None:
+            operand_stack.append(self.__backend.apply_operator(record, operands))
+        elif record.arity == 2:
+            operand_stack.append(apply_binary_operator(record, *operands))
+        else:
+            operand_stack.append(apply_unary_operator(record, operands[0]))
+
+
+def get_evaluator() -> Evaluator:
+    """
+    Returns an evaluator of the registered operators and the configured expression limits that all the threads can
+    share, created again after they change
+    :return: The shared evaluator
+    """
+    global DEFAULT_EVALUATOR, DEFAULT_EVALUATOR_KEY
+    key = (get_registry_version(), get_expression_limits())
+    if DEFAULT_EVALUATOR_KEY != key:
+        DEFAULT_EVALUATOR = Evaluator()
+        DEFAULT_EVALUATOR_KEY = key
+    return DEFAULT_EVALUATOR
@@ -0,0 +1,170 @@
+"""
+Evaluation of bundles of related expressions that share sub-expressions.
+The expressions are parsed by process_expression (so precedence and unary minus are resolved as in evaluate_expression)
+into a single DAG, where identical sub-trees are hash-consed into one node. Every node is then evaluated at most once
+for the whole bundle
+"""
+from calculator_core.calculator import (apply_binary_operator, apply_unary_operator, get_operator_record, pop_operands,
+                                        process_expression)
+from calculator_core.expression_tree import ConstantNode, ExpressionNode, OperationNode
+
+
+class ExpressionBundle(object):
+    """
+    A list of expressions parsed into a shared DAG, whose results are computed once per unique sub-expression
+    """
+
+    def __init__(self, expressions=()):
+        """
+        Initializes a new ExpressionBundle instance
+        :param expressions: An iterable of expressions to add to the bundle
+        """
+        self.__nodes = {}
+        self.__entries = []
+        self.__outcomes = {}
+        self.__operations = 0
+        self.__evaluations = 0
+        for expression in expressions:
+            self.add(expression)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def add(self, expression: str) -> int:
+        """
+        Parses an expression into the shared DAG of the bundle
+        :param expression: The expression to add
+        :return: The index of the expression in the bundle
+        """
+        executed = []
+
+        def build_shared_node(operand_stack: list, operator_stack: list[str]):
+            # build_node of expression_tree, with the nodes taken from the bundle when they already exist
+            record = get_operator_record(operator_stack.pop())
+            operands = pop_operands(operand_stack, record)
+            if operands:
+                node = self.__intern(record, tuple(map(self.__intern_operand, operands)))
+                executed.append(node)
+                operand_stack.append(node)
+
+        try:
+            root = self.__intern_operand(process_expression(expression, build_shared_node))
+            error = None
+        except Exception as e:
+            root = None
+            error = e
+        # The operations in the order evaluate_expression executes them, and the syntax error found after them
+        self.__entries.append((root, tuple(executed), error))
+        self.__operations += len(executed)
+        return len(self.__entries) - 1
+
+    def __intern(self, record, operands: tuple[ExpressionNode, ...]) -> OperationNode:
+        """
+        Returns the node of an operation, creating it if no identical operation was parsed yet
+        :param record: The record of the operator
+        :param operands: The interned operand nodes
+        :return: The shared node of the operation
+        """
+        key = (record,) + tuple(map(id, operands))
+        node = self.__nodes.get(key)
+        if node is None:
+            node = self.__nodes[key] = OperationNode(record, operands)
+        return node
+
+    def __intern_operand(self, operand: ExpressionNode | int | float) -> ExpressionNode:
+        """
+        Returns the node of an item of the operand stack, sharing the constant nodes of equal numbers
+        :param operand: A node or a number
+        :return: The shared node of the operand
+        """
+        if isinstance(operand, ExpressionNode):
+            return operand
+        key = ('constant', type(operand), operand)
+        node = self.__nodes.get(key)
+        if node is None:
+            node = self.__nodes[key] = ConstantNode(operand)
+        return node
+
+    def __evaluate_node(self, root: ExpressionNode) -> tuple:
+        """
+        Evaluates a node and the nodes it depends on that were not evaluated yet, without recursion
+        :param root: The node to evaluate
+        :return: The outcome of the node, a tuple of (value, error)
+        """
+        outcomes = self.__outcomes
+        pending = [root]
+        while pending:
+            node = pending[-1]
+            if id(node) in outcomes:
+                pending.pop()
+                continue
+            if isinstance(node, ConstantNode):
+                outcomes[id(node)] = (node.get_value(), None)
+                pending.pop()
+                continue
+            operands = node.get_operands()
+            missing = [operand for operand in operands if id(operand) not in outcomes]
+            if missing:
+                pending.extend(reversed(missing))
+                continue
+
+            pending.pop()
+            operand_outcomes = [outcomes[id(operand)] for operand in operands]
+            # The first error in post-order is the one evaluate_expression raises
+            error = next((error for _, error in operand_outcomes if error is not None), None)
+            if error is not None:
+                outcomes[id(node)] = (None, error)
+                continue
+            self.__evaluations += 1
+            record = node.get_record()
+            try:
+                if record.arity == 1:
+                    outcomes[id(node)] = (apply_unary_operator(record, operand_outcomes[0][0]), None)
+                else:
+                    outcomes[id(node)] = (apply_binary_operator(record, operand_outcomes[0][0],
+                                                                operand_outcomes[1][0]), None)
+            except Exception as e:
+                outcomes[id(node)] = (None, e)
+        return outcomes[id(root)]
+
+    def evaluate(self) -> list[int | float | Exception]:
+        """
+        Evaluates every expression of the bundle. Shared sub-expressions are computed once, and their results are kept
+        for the expressions added later
+        :return: The result of every expression in order, or the exception that evaluate_expression raises for it
+        """
+        results = []
+        for root, executed, error in self.__entries:
+            if error is not None:
+                # An operation executed before the syntax error was found fails first
+                for node in executed:
+                    operation_error = self.__evaluate_node(node)[1]
+                    if operation_error is not None:
+                        error = operation_error
+                        break
+                results.append(error)
+                continue
+            value, error = self.__evaluate_node(root)
+            results.append(value if error is None else error)
+        return results
+
+    def get_statistics(self) -> dict[str, int]:
+        """
+        Returns the counters of the bundle
+        :return: A dictionary of the number of expressions, unique nodes, operations of the expressions (what evaluating
+        them one by one executes, errors aside), operator applications, and the applications the sharing saved
+        """
+        return {"expressions": len(self.__entries), "unique_nodes": len(self.__nodes),
+                "operations": self.__operations, "evaluations": self.__evaluations,
+                "saved_evaluations": self.__operations - self.__evaluations}
+
+
+def evaluate_bundle(expressions) -> tuple[list[int | float | Exception], int]:
+    """
+    Evaluates a bundle of related expressions, computing every shared sub-expression once
+    :param expressions: An iterable of expressions
+    :return: The result (or exception) of every expression in order, and the number of operator applications saved
+    """
+    bundle = ExpressionBundle(expressions)
+    results = bundle.evaluate()
+    return results, bundle.get_statistics()["saved_evaluations"]
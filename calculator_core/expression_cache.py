@@ -0,0 +1,126 @@
+import re
+import time
+from collections import OrderedDict
+
+from calculator_core.calculator import evaluate_expression, get_expression_limits, get_resource_limits
+from calculator_core.errors import ResourceLimitExceededError
+
+from operators.operator_registry import get_registry_version
+from operators.operators_math_functions import get_cost_budget
+
+WHITESPACE_PATTERN = re.compile(r"[ \t]+")
+
+
+def normalize_expression(expression: str) -> str:
+    """
+    Normalizes the whitespace of an expression without changing its meaning.
+    A run of spaces and tabs behaves exactly like a single space, and leading or trailing whitespace is ignored
+    :param expression: The expression to normalize
+    :return: The normalized expression
+    """
+    return WHITESPACE_PATTERN.sub(' ', expression).strip(' ')
+
+
+def get_configuration() -> tuple:
+    """
+    Returns the settings that the outcomes of expressions depend on
+    :return: The version of the operator registry, the expression limits and the cost budget
+    """
+    return get_registry_version(), get_expression_limits(), get_cost_budget()
+
+
+class ExpressionCache(object):
+    """
+    A bounded LRU cache of expression results (and errors) placed in front of evaluate_expression.
+    The entries are dropped when the operators, the expression limits or the cost budget change, and expressions are
+    evaluated without the cache while resource limits are installed, since their outcomes depend on the limits
+    """
+
+    def __init__(self, max_size: int = 4096, ttl: float | None = None, evaluate=None):
+        """
+        Initializes a new ExpressionCache instance
+        :param max_size: The maximum number of cached expressions
+        :param ttl: The number of seconds an entry stays valid, or None to keep entries until they are evicted
+        :param evaluate: The function that evaluates an expression (evaluate_expression by default)
+        :raises ValueError: If max_size is not positive
+        """
+        if max_size <= 0:
+            raise ValueError("The size of the cache must be positive")
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__evaluate = evaluate if evaluate is not None else evaluate_expression
+        self.__entries = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__configuration = get_configuration()
+
+    def evaluate(self, expression: str) -> int | float:
+        """
+        Evaluates the given expression, using the cached outcome when possible
+        :param expression: The expression to evaluate
+        :return: The result of the expression
+        :raises Exception: The same exception type evaluate_expression raises for the expression
+        """
+        if get_resource_limits() is not None:
+            return self.__evaluate(expression)
+        configuration = get_configuration()
+        if self.__configuration != configuration:
+            # Operators were registered or removed, or the limits changed, so the cached outcomes may be stale
+            self.__entries.clear()
+            self.__configuration = configuration
+
+        key = normalize_expression(expression)
+        entry = self.__entries.get(key)
+        if entry is not None and (self.__ttl is None or entry[2] > time.monotonic()):
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+        else:
+            self.__misses += 1
+            entry = self.__store(key)
+
+        is_error, outcome, _ = entry
+        if is_error:
+            raise outcome[0](*outcome[1])
+        return outcome
+
+    def __store(self, key: str) -> tuple:
+        """
+        Evaluates an expression and stores its outcome
+        :param key: The normalized expression
+        :return: The stored entry, a tuple of (is_error, outcome, expiration time)
+        :raises ResourceLimitExceededError: If the evaluation exceeds resource limits, which is not stored
+        """
+        try:
+            outcome = (False, self.__evaluate(key))
+        except ResourceLimitExceededError:
+            # It depends on the limits of the evaluation rather than on the expression
+            raise
+        except Exception as e:
+            outcome = (True, (e.__class__, e.args))
+
+        expiration = time.monotonic() + self.__ttl if self.__ttl is not None else None
+        entry = outcome + (expiration,)
+        self.__entries[key] = entry
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.__max_size:
+            self.__entries.popitem(last=False)
+            self.__evictions += 1
+        return entry
+
+    def clear(self):
+        """
+        Removes all the entries from the cache and resets its statistics
+        """
+        self.__entries.clear()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def get_statistics(self) -> dict[str, int]:
+        """
+        Returns the statistics of the cache
+        :return: A dictionary with the hits, misses, evictions and current size of the cache
+        """
+        return {"hits": self.__hits, "misses": self.__misses, "evictions": self.__evictions,
+                "size": len(self.__entries), "max_size": self.__max_size}
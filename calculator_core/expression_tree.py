@@ -0,0 +1,279 @@
+from calculator_core.calculator import (apply_binary_operator, apply_unary_operator, get_operator_record, pop_operands,
+                                        process_expression)
+from calculator_core.errors import UnknownVariableError
+from calculator_core.lexer import Variable
+
+from operators.operator_registry import resolve_function
+from operators.operator_types.operator_record import OperatorRecord
+from operators.operators_math_functions import negate
+
+
+class ExpressionNode(object):
+    """
+    Base class for the nodes of a parsed expression
+    """
+    __slots__ = ()
+
+
+class ConstantNode(ExpressionNode):
+    """
+    Represents a number of an expression
+    """
+    __slots__ = ('__value',)
+
+    def __init__(self, value: int | float):
+        """
+        Initializes a new ConstantNode instance
+        :param value: The number
+        """
+        self.__value = value
+
+    def get_value(self) -> int | float:
+        """
+        Returns the number of the node
+        :return: The number of the node
+        """
+        return self.__value
+
+
+class VariableNode(ExpressionNode):
+    """
+    Represents a variable of an expression
+    """
+    __slots__ = ('__name',)
+
+    def __init__(self, name: str):
+        """
+        Initializes a new VariableNode instance
+        :param name: The name of the variable
+        """
+        self.__name = name
+
+    def get_name(self) -> str:
+        """
+        Returns the name of the variable
+        :return: The name of the variable
+        """
+        return self.__name
+
+
+class OperationNode(ExpressionNode):
+    """
+    Represents an operator applied to its operands
+    """
+    __slots__ = ('__record', '__operands')
+
+    def __init__(self, record: OperatorRecord, operands: tuple[ExpressionNode, ...]):
+        """
+        Initializes a new OperationNode instance
+        :param record: The record of the operator
+        :param operands: The operand nodes, in their original order
+        """
+        self.__record = record
+        self.__operands = operands
+
+    def get_record(self) -> OperatorRecord:
+        """
+        Returns the record of the operator
+        :return: The record of the operator
+        """
+        return self.__record
+
+    def get_operands(self) -> tuple[ExpressionNode, ...]:
+        """
+        Returns the operand nodes
+        :return: The operand nodes, in their original order
+        """
+        return self.__operands
+
+
+def to_node(operand: ExpressionNode | Variable | int | float) -> ExpressionNode:
+    """
+    Converts an item of the operand stack into a node
+    :param operand: A node, a variable or a number
+    :return: The node of the operand
+    """
+    if isinstance(operand, ExpressionNode):
+        return operand
+    if isinstance(operand, Variable):
+        return VariableNode(operand.get_name())
+    return ConstantNode(operand)
+
+
+def build_node(operand_stack: list, operator_stack: list[str]):
+    """
+    Pops one operation like execute_operation does, but inserts an OperationNode into the operand_stack instead of its
+    result
+    :param operand_stack: list of operands (numbers, variables or nodes)
+    :param operator_stack: list of operators
+    :raises InsufficientOperandsError: If there are insufficient operands to perform a binary operation
+    :raises InsufficientOperatorsError: If there are mismatched parentheses
+    :raises InvalidUseOfOperatorError: If a right unary operator has no operand
+    """
+    record = get_operator_record(operator_stack.pop())
+    operands = pop_operands(operand_stack, record)
+    if operands:
+        operand_stack.append(OperationNode(record, tuple(to_node(operand) for operand in operands)))
+
+
+def parse_expression_tree(expression: str, allow_names: bool = False) -> ExpressionNode:
+    """
+    Parses an expression into a tree with the same validation as evaluate_expression
+    :param expression: The expression to parse
+    :param allow_names: True if the expression may contain variables
+    :return: The root node of the expression
+    :raises InvalidNumberFormatError: If the expression contains an invalid number
+    :raises UnknownCharacterError: If an invalid character is encountered in the expression
+    :raises InsufficientOperandsError: If there are not enough operands in the expression
+    :raises InsufficientOperatorsError: If there are not enough operators or mismatched parentheses
+    :raises InvalidUseOfOperatorError: If an operator is used incorrectly
+    """
+    return to_node(process_expression(expression, build_node, allow_names))
+
+
+def iterate_post_order(root: ExpressionNode):
+    """
+    Iterates over the nodes of a tree in post-order (the order in which evaluate_expression executes them) without
+    recursion
+    :param root: The root node
+    :return: A generator of the nodes, every operation node after its operands
+    """
+    pending = [(root, False)]
+    while pending:
+        node, is_expanded = pending.pop()
+        if is_expanded or not isinstance(node, OperationNode):
+            yield node
+        else:
+            pending.append((node, True))
+            pending.extend((operand, False) for operand in reversed(node.get_operands()))
+
+
+def evaluate_tree(root: ExpressionNode, **variables: int | float) -> int | float:
+    """
+    Evaluates a parsed (and possibly optimized) expression tree
+    :param root: The root node
+    :param variables: The values of the variables of the expression
+    :return: The result of the expression
+    :raises UnknownVariableError: If no value is given for a variable of the expression
+    :raises InvalidValueForOperatorError: If an operator is given invalid value
+    """
+    values = []
+    for node in iterate_post_order(root):
+        if isinstance(node, OperationNode):
+            record = node.get_record()
+            if record.arity == 1:
+                values.append(apply_unary_operator(record, values.pop()))
+            else:
+                operand2 = values.pop()
+                values.append(apply_binary_operator(record, values.pop(), operand2))
+        elif isinstance(node, ConstantNode):
+            values.append(node.get_value())
+        elif node.get_name() in variables:
+            values.append(variables[node.get_name()])
+        else:
+            raise UnknownVariableError(f"No value was given for the variable '{node.get_name()}'")
+    return values.pop()
+
+
+def fold_constants(record: OperatorRecord, operands: tuple[ExpressionNode, ...]) -> ExpressionNode | None:
+    """
+    Computes an operation whose operands are all constants
+    :param record: The record of the operator
+    :param operands: The optimized operand nodes
+    :return: A constant node of the result, or None if the operation cannot be folded. Operations that fail are not
+    folded, so their error is still raised when the tree is evaluated
+    """
+    if not all(isinstance(operand, ConstantNode) for operand in operands):
+        return None
+    try:
+        if record.arity == 1:
+            return ConstantNode(apply_unary_operator(record, operands[0].get_value()))
+        return ConstantNode(apply_binary_operator(record, operands[0].get_value(), operands[1].get_value()))
+    except Exception:
+        return None
+
+
+def is_constant(node: ExpressionNode, value: int) -> bool:
+    """
+    Checks if a node is a given constant
+    :param node: The node to check
+    :param value: The constant
+    :return: True if the node is a constant node of the value, False otherwise
+    """
+    return isinstance(node, ConstantNode) and node.get_value() == value
+
+
+def simplify_operation(record: OperatorRecord, operands: tuple[ExpressionNode, ...],
+                       keys: tuple[int, ...]) -> ExpressionNode | None:
+    """
+    Removes double negations and identity operations.
+    Only operation nodes are returned in place of their parent, since their results are already normalized like the
+    result of the parent would be (variables are not rounded until an operator is applied to them)
+    :param record: The record of the operator
+    :param operands: The optimized operand nodes
+    :param keys: The structural keys of the operands, equal for identical sub-trees
+    :return: The node that replaces the operation, or None to keep it
+    """
+    if record.arity == 1:
+        operand = operands[0]
+        if resolve_function(record.function) is negate and isinstance(operand, OperationNode) and \
+                resolve_function(operand.get_record().function) is negate and \
+                isinstance(operand.get_operands()[0], OperationNode):
+            return operand.get_operands()[0]
+        return None
+
+    left, right = operands
+    symbol = record.symbol
+    if symbol == '*':
+        replacement = left if is_constant(right, 1) else right if is_constant(left, 1) else None
+    elif symbol == '+':
+        replacement = left if is_constant(right, 0) else right if is_constant(left, 0) else None
+    elif symbol == '-':
+        replacement = left if is_constant(right, 0) else None
+    elif symbol in ('$', '&'):
+        replacement = left if keys[0] == keys[1] else None
+    else:
+        replacement = None
+
+    if isinstance(replacement, OperationNode):
+        return replacement
+    return None
+
+
+def optimize_tree(root: ExpressionNode) -> ExpressionNode:
+    """
+    Folds constant sub-expressions and removes double negations (~~x, --x) and identities (x*1, x+0, x-0, x$x, x&x).
+    The optimized tree evaluates to the same result, or raises the same error, as the original one
+    :param root: The root node of the tree to optimize
+    :return: The root node of the optimized tree
+    """
+    optimized = []
+    node_keys = {}
+    interned_keys = {}
+    for node in iterate_post_order(root):
+        if isinstance(node, OperationNode):
+            record = node.get_record()
+            operands = tuple(optimized[-record.arity:])
+            del optimized[-record.arity:]
+            operand_keys = tuple(node_keys[id(operand)] for operand in operands)
+
+            new_node = fold_constants(record, operands) or simplify_operation(record, operands, operand_keys)
+            if new_node is None:
+                new_node = node if operands == node.get_operands() else OperationNode(record, operands)
+                key = (record.symbol,) + operand_keys
+            elif isinstance(new_node, ConstantNode):
+                key = ('constant', type(new_node.get_value()), new_node.get_value())
+            else:
+                key = None
+        elif isinstance(node, ConstantNode):
+            new_node = node
+            key = ('constant', type(node.get_value()), node.get_value())
+        else:
+            new_node = node
+            key = ('variable', node.get_name())
+
+        if key is not None:
+            # Identical sub-trees get the same small integer key
+            node_keys[id(new_node)] = interned_keys.setdefault(key, len(interned_keys))
+        optimized.append(new_node)
+    return optimized.pop()
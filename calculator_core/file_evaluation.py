@@ -0,0 +1,170 @@
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from calculator_core.calculator import get_expression_limits, get_hooks, process_tokens
+from calculator_core.errors import UNKNOWN_CHARACTER_TEMPLATE, UnknownCharacterError
+from calculator_core.lexer import UNKNOWN, Token
+from calculator_core.result_formatting import format_error, format_expression, format_result
+
+from operators.operator_registry import get_registry_version
+from operators.operators_dict import OPERATORS
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+MIN_PARALLEL_FILE_SIZE = 1024 * 1024
+
+BYTES_TOKEN_PATTERN = None
+BYTES_TOKEN_VALUES = {}
+BYTES_PATTERN_VERSION = None
+
+
+class NonAsciiLineError(Exception):
+    """Exception raised by the bytes tokenizer on a non-ASCII byte, so the line is evaluated as a decoded string"""
+    pass
+
+
+def get_bytes_token_pattern() -> re.Pattern:
+    """
+    Returns the bytes version of lexer.TOKEN_PATTERN, rebuilt after the registered operators change.
+    Only single-byte (ASCII) operator symbols are in the pattern, lines with other characters are decoded
+    :return: The compiled bytes pattern, where the index of the matching group is the kind of the token
+    """
+    global BYTES_TOKEN_PATTERN, BYTES_PATTERN_VERSION
+    if BYTES_PATTERN_VERSION != get_registry_version():
+        symbols = sorted(symbol for symbol in OPERATORS if len(symbol) == 1 and symbol.isascii())
+        operators = ''.join(re.escape(symbol) for symbol in symbols)
+        BYTES_TOKEN_PATTERN = re.compile(rf"([0-9.]+)|([{operators}])|(\()|(\))|([ \t]+)|((?!))|(.)".encode('ascii'),
+                                         re.DOTALL)
+        # The string values of the common tokens, so that they are not decoded every time
+        BYTES_TOKEN_VALUES.clear()
+        BYTES_TOKEN_VALUES.update((value.encode('ascii'), value) for value in [*symbols, '(', ')', ' '])
+        BYTES_PATTERN_VERSION = get_registry_version()
+    return BYTES_TOKEN_PATTERN
+
+
+def tokenize_bytes(buffer, start: int, end: int):
+    """
+    Lazily splits the bytes of one line of a buffer into tokens, without copying the line into a string
+    :param buffer: A bytes-like object, such as a memory map
+    :param start: The offset of the first byte of the line
+    :param end: The offset after the last byte of the line
+    :return: A generator of the tokens of the line, with string values like the ones of lexer.tokenize
+    :raises UnknownCharacterError: If an invalid ASCII character is encountered in the line
+    :raises NonAsciiLineError: If a non-ASCII byte is encountered in the line
+    """
+    new_token = tuple.__new__
+    values = BYTES_TOKEN_VALUES
+    for match in get_bytes_token_pattern().finditer(buffer, start, end):
+        kind = match.lastindex - 1
+        if kind == UNKNOWN:
+            byte = buffer[match.start()]
+            if byte >= 0x80:
+                raise NonAsciiLineError()
+            raise UnknownCharacterError(UNKNOWN_CHARACTER_TEMPLATE.format(chr(byte)))
+        value = match.group()
+        yield new_token(Token, (kind, values.get(value) or value.decode('ascii'), match.start() - start))
+
+
+def format_line(buffer, start: int, end: int) -> str:
+    """
+    Evaluates one line of a buffer and formats its result or error like main.handle_expression
+    :param buffer: A bytes-like object, such as a memory map
+    :param start: The offset of the first byte of the line
+    :param end: The offset after the last byte of the line, without the line ending
+    :return: The formatted result or error
+    """
+    if end - start <= get_expression_limits()[0] and not get_hooks():
+        try:
+            return format_result(process_tokens(tokenize_bytes(buffer, start, end)))
+        except NonAsciiLineError:
+            pass
+        except Exception as e:
+            return format_error(e)
+    # Non-ASCII and overlong lines, and all the lines while hooks are installed, are decoded and go through the string
+    # path, which runs the hooks
+    return format_expression(bytes(buffer[start:end]).decode('utf-8', errors='replace'))
+
+
+def format_byte_range(path: str, start: int, end: int) -> bytes:
+    """
+    Evaluates the lines of a line-aligned byte range of a file in a worker
+    :param path: The path of the file
+    :param start: The offset of the first byte of the range
+    :param end: The offset after the last byte of the range
+    :return: The UTF-8 encoded result lines of the range, each followed by a newline
+    """
+    lines = []
+    with open(path, 'rb') as input_file, mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        position = start
+        while position < end:
+            line_end = mapped.find(b'\n', position, end)
+            next_position = end if line_end == -1 else line_end + 1
+            if line_end == -1:
+                line_end = end
+            if line_end > position and mapped[line_end - 1] == 0x0d:
+                line_end -= 1
+            lines.append(format_line(mapped, position, line_end))
+            position = next_position
+    lines.append('')
+    return '\n'.join(lines).encode('utf-8')
+
+
+def split_line_ranges(buffer, size: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[tuple[int, int]]:
+    """
+    Splits a buffer into byte ranges of about chunk_size bytes that end at line endings
+    :param buffer: A bytes-like object, such as a memory map
+    :param size: The size of the buffer
+    :param chunk_size: The approximate size of a range
+    :return: A list of (start, end) offsets, in order
+    """
+    ranges = []
+    start = 0
+    while start < size:
+        end = min(start + chunk_size, size)
+        if end < size:
+            newline = buffer.find(b'\n', end - 1)
+            end = size if newline == -1 else newline + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def evaluate_file(input_path: str, output_path: str, workers: int | None = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Evaluates a file of newline-separated expressions and writes the result lines, in input order, to an output file.
+    The input is memory-mapped and split into line-aligned byte ranges that workers tokenize directly from the mapped
+    bytes. Operators registered and hooks installed at runtime reach the workers only when processes are forked
+    :param input_path: The path of the expressions file (lines end with \\n or \\r\\n)
+    :param output_path: The path of the results file, one line per expression like main.handle_expression prints
+    :param workers: The number of worker processes (the number of CPUs by default, 1 evaluates in this process)
+    :param chunk_size: The approximate number of bytes of the range sent to a worker at once
+    :return: The number of byte ranges that were evaluated
+    """
+    size = os.path.getsize(input_path)
+    with open(output_path, 'wb') as output_file:
+        if size == 0:
+            return 0
+        with open(input_path, 'rb') as input_file, \
+                mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            ranges = split_line_ranges(mapped, size, chunk_size)
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers == 1 or size < MIN_PARALLEL_FILE_SIZE or len(ranges) == 1:
+            for start, end in ranges:
+                output_file.write(format_byte_range(input_path, start, end))
+            return len(ranges)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # A bounded window of ranges in flight keeps the finished, unwritten results small
+            pending = deque()
+            for start, end in ranges:
+                if len(pending) >= 2 * workers:
+                    output_file.write(pending.popleft().result())
+                pending.append(executor.submit(format_byte_range, input_path, start, end))
+            while pending:
+                output_file.write(pending.popleft().result())
+    return len(ranges)
@@ -0,0 +1,136 @@
+from functools import partial
+from typing import NamedTuple
+
+from calculator_core.calculator import ShuntingYardState, process_tokens, run_hooks, tokenize_lazily
+
+DEFAULT_CHECKPOINT_INTERVAL = 8
+
+
+class Checkpoint(NamedTuple):
+    """
+    The state of the shunting-yard loop after the token that ends at a position of the expression. The stacks are
+    stored as changes to the stacks of the previous checkpoint: the number of items kept and the items pushed after them
+    """
+    position: int
+    kept_operands: int
+    operands: tuple
+    kept_operators: int
+    operators: tuple
+    previous: str | int | float | None
+    is_previous_left_parenthesis: bool
+    depth: int
+
+
+INITIAL_CHECKPOINT = Checkpoint(0, 0, (), 0, (), None, False, 0)
+
+
+def common_prefix_length(text1: str, text2: str) -> int:
+    """
+    Finds the length of the common prefix of two strings with a binary search over slice comparisons
+    :param text1: The first string
+    :param text2: The second string
+    :return: The number of leading characters the strings share
+    """
+    low, high = 0, min(len(text1), len(text2))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if text1[:middle] == text2[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class IncrementalEvaluator(object):
+    """
+    Evaluates successive versions of an expression that is edited at its end, like an expression typed into an
+    interactive session. The state of the shunting-yard loop is saved every few tokens, and every evaluation resumes
+    from the last saved state that the edit did not change. A saved state only holds the stack items that changed since
+    the previous one, so the saved states of an expression take memory linear in its number of tokens
+    """
+
+    def __init__(self, checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        """
+        Initializes a new IncrementalEvaluator instance
+        :param checkpoint_interval: The number of tokens between two saved states
+        """
+        self.__checkpoint_interval = checkpoint_interval
+        self.__expression = ''
+        self.__checkpoints = [INITIAL_CHECKPOINT]
+        self.__resume_position = 0
+
+    def get_expression(self) -> str:
+        """
+        Returns the last evaluated expression
+        :return: The last evaluated expression
+        """
+        return self.__expression
+
+    def get_resume_position(self) -> int:
+        """
+        Returns the position the last evaluation resumed from
+        :return: The offset of the first token that the last evaluation processed
+        """
+        return self.__resume_position
+
+    def evaluate(self, expression: str) -> int | float:
+        """
+        Evaluates an expression, reusing the saved states of the previous expressions.
+        A state saved after a token that ends at position p is reused only if the edit kept the first p + 1 characters,
+        since the character after a token is the one that ended it. The result and the raised error are the same as
+        those of evaluate_expression, and the installed instrumentation and resource limits see the evaluation of the
+        tokens after the resume position
+        :param expression: The expression to evaluate
+        :return: The result of the expression
+        :raises ExpressionTooComplexError: If the expression is longer or nested deeper than the configured limits
+        :raises InvalidNumberFormatError: If the expression contains an invalid number
+        :raises UnknownCharacterError: If an invalid character is encountered in the expression
+        :raises InsufficientOperandsError: If there are not enough operands in the expression
+        :raises InsufficientOperatorsError: If there are not enough operators or mismatched parentheses
+        :raises InvalidUseOfOperatorError: If an operator is used incorrectly
+        :raises InvalidValueForOperatorError: If an operator is given invalid value
+        :raises ResourceLimitExceededError: If resource limits are installed and the evaluation exceeds one of them
+        """
+        checkpoints = self.__checkpoints
+        prefix_length = common_prefix_length(self.__expression, expression)
+        while checkpoints[-1].position >= prefix_length and len(checkpoints) > 1:
+            checkpoints.pop()
+        self.__expression = expression
+
+        operand_stack = []
+        operator_stack = []
+        for checkpoint in checkpoints:
+            del operand_stack[checkpoint.kept_operands:]
+            operand_stack.extend(checkpoint.operands)
+            del operator_stack[checkpoint.kept_operators:]
+            operator_stack.extend(checkpoint.operators)
+        position, _, _, _, _, previous, is_previous_left_parenthesis, depth = checkpoints[-1]
+        self.__resume_position = position
+
+        interval = self.__checkpoint_interval
+        remaining = interval
+        # The lowest length of every stack since the last checkpoint, below which the items were not replaced
+        operand_mark = len(operand_stack)
+        operator_mark = len(operator_stack)
+
+        def save(end: int, previous_item, is_left_parenthesis: bool, nesting_depth: int):
+            nonlocal remaining, operand_mark, operator_mark
+            # A token pops at most one item more than the difference it makes to the length of a stack, so the
+            # stacks went down to one item below their current lengths at most
+            operand_mark = min(operand_mark, len(operand_stack) - 1)
+            operator_mark = min(operator_mark, len(operator_stack) - 1)
+            remaining -= 1
+            if not remaining:
+                kept_operands = max(operand_mark, 0)
+                kept_operators = max(operator_mark, 0)
+                checkpoints.append(Checkpoint(end, kept_operands, tuple(operand_stack[kept_operands:]), kept_operators,
+                                              tuple(operator_stack[kept_operators:]), previous_item,
+                                              is_left_parenthesis, nesting_depth))
+                operand_mark = len(operand_stack)
+                operator_mark = len(operator_stack)
+                remaining = interval
+
+        state = ShuntingYardState(operand_stack, operator_stack, previous, is_previous_left_parenthesis, depth)
+        # The installed hooks see the tokens after the resume position only
+        return run_hooks(expression, tokenize_lazily(expression, start=position),
+                         run=partial(process_tokens, state=state, checkpoint=save))
@@ -0,0 +1,173 @@
+import threading
+from time import perf_counter_ns
+
+from calculator_core.calculator import evaluate_with_hooks, get_instrumentation, set_instrumentation
+
+from operators.operators_dict import OPERATOR_RECORDS
+
+PHASES = ("tokenize", "shunting_yard", "execute")
+
+
+class Instrumentation(object):
+    """
+    Collects per-phase timings, per-operator call counts and times and per-class error counts of the expressions that
+    evaluate_expression evaluates while it is installed with set_instrumentation. It is a hook of calculator.run_hooks,
+    around the resource limits when both are installed
+    """
+
+    def __init__(self, callback=None):
+        """
+        Initializes a new Instrumentation instance
+        :param callback: A function called after every evaluation with the expression, a dictionary of the nanoseconds
+        spent in every phase and the name of the class of the raised error (or None)
+        """
+        self.__callback = callback
+        self.__lock = threading.Lock()
+        self.__evaluations = 0
+        self.__phase_times = dict.fromkeys(PHASES, 0)
+        self.__operator_calls = {}
+        self.__operator_times = {}
+        self.__errors = {}
+
+    def evaluate(self, expression: str, backend=None) -> int | float:
+        """
+        Evaluates an expression like evaluate_expression does, recording its profile.
+        Tokens are read lazily, and the time of every read is added to the time of the tokenizer, so errors are raised
+        in the same order as evaluate_expression raises them. The time of the shunting-yard loop does not include the
+        time of the tokenizer nor the time of the operations
+        :param expression: The expression to evaluate
+        :param backend: A numeric backend from calculator_core.numeric_backends, or None for the default float
+        arithmetic
+        :return: The result of the expression
+        :raises ExpressionTooComplexError: If the expression is longer or nested deeper than the configured limits
+        :raises InvalidNumberFormatError: If the expression contains an invalid number
+        :raises UnknownCharacterError: If an invalid character is encountered in the expression
+        :raises InsufficientOperandsError: If there are not enough operands in the expression
+        :raises InsufficientOperatorsError: If there are not enough operators or mismatched parentheses
+        :raises InvalidUseOfOperatorError: If an operator is used incorrectly
+        :raises InvalidValueForOperatorError: If an operator is given invalid value
+        """
+        return evaluate_with_hooks(expression, backend, [self])
+
+    def process(self, expression: str, tokens, execute, parse, run) -> int | float:
+        """
+        Processes the tokens of an expression, recording its profile, as a hook of calculator.run_hooks
+        :param expression: The expression
+        :param tokens: An iterable of the tokens of the expression
+        :param execute: The function that executes the operator at the top of the operator_stack
+        :param parse: The function that converts the text of a number token
+        :param run: The function that processes the tokens with the wrapped functions
+        :return: The result of the expression
+        """
+        operator_calls = {}
+        operator_times = {}
+
+        def timed_execute(operand_stack: list, operator_stack: list[str]):
+            symbol = operator_stack[-1]
+            if symbol not in OPERATOR_RECORDS:
+                # A left parenthesis, which raises the mismatched parentheses error
+                return execute(operand_stack, operator_stack)
+            start = perf_counter_ns()
+            try:
+                execute(operand_stack, operator_stack)
+            finally:
+                operator_calls[symbol] = operator_calls.get(symbol, 0) + 1
+                operator_times[symbol] = operator_times.get(symbol, 0) + perf_counter_ns() - start
+
+        phase_times = dict.fromkeys(PHASES, 0)
+        error = None
+        start = perf_counter_ns()
+        try:
+            return run(timed_tokens(tokens, phase_times), timed_execute, parse)
+        except Exception as e:
+            error = e.__class__.__name__
+            raise
+        finally:
+            phase_times["execute"] = sum(operator_times.values())
+            phase_times["shunting_yard"] = perf_counter_ns() - start - phase_times["tokenize"] - phase_times["execute"]
+            self.__record(expression, phase_times, operator_calls, operator_times, error)
+
+    def __record(self, expression: str, phase_times: dict[str, int], operator_calls: dict[str, int],
+                 operator_times: dict[str, int], error: str | None):
+        """
+        Adds the profile of one evaluation to the totals and passes it to the callback
+        :param expression: The evaluated expression
+        :param phase_times: The nanoseconds spent in every phase
+        :param operator_calls: The number of executions of every operator symbol
+        :param operator_times: The nanoseconds spent executing every operator symbol
+        :param error: The name of the class of the raised error, or None
+        """
+        with self.__lock:
+            self.__evaluations += 1
+            for phase, elapsed in phase_times.items():
+                self.__phase_times[phase] += elapsed
+            for symbol, calls in operator_calls.items():
+                self.__operator_calls[symbol] = self.__operator_calls.get(symbol, 0) + calls
+                self.__operator_times[symbol] = self.__operator_times.get(symbol, 0) + operator_times[symbol]
+            if error is not None:
+                self.__errors[error] = self.__errors.get(error, 0) + 1
+        if self.__callback is not None:
+            self.__callback(expression, phase_times, error)
+
+    def snapshot(self) -> dict:
+        """
+        Returns a copy of the collected totals
+        :return: A dictionary with the number of 'evaluations', the nanoseconds of every phase in 'phases', the 'calls'
+        and 'nanoseconds' of every operator symbol in 'operators' and the count of every error class in 'errors'
+        """
+        with self.__lock:
+            return {"evaluations": self.__evaluations, "phases": dict(self.__phase_times),
+                    "operators": {symbol: {"calls": calls, "nanoseconds": self.__operator_times[symbol]}
+                                  for symbol, calls in self.__operator_calls.items()},
+                    "errors": dict(self.__errors)}
+
+    def reset(self):
+        """
+        Clears the collected totals
+        """
+        with self.__lock:
+            self.__evaluations = 0
+            self.__phase_times = dict.fromkeys(PHASES, 0)
+            self.__operator_calls = {}
+            self.__operator_times = {}
+            self.__errors = {}
+
+
+def timed_tokens(tokens, phase_times: dict[str, int]):
+    """
+    Passes the tokens of an expression through, adding the time of every read of a token to the "tokenize" phase
+    :param tokens: An iterable of the tokens of the expression
+    :param phase_times: The nanoseconds spent in every phase of the evaluation
+    :return: A generator of the tokens
+    """
+    tokens = iter(tokens)
+    while True:
+        start = perf_counter_ns()
+        try:
+            token = next(tokens, None)
+        finally:
+            phase_times["tokenize"] += perf_counter_ns() - start
+        if token is None:
+            return
+        yield token
+
+
+def enable_instrumentation(callback=None) -> Instrumentation:
+    """
+    Installs a new Instrumentation in evaluate_expression
+    :param callback: A function called after every evaluation, see Instrumentation
+    :return: The installed instrumentation
+    """
+    instrumentation = Instrumentation(callback)
+    set_instrumentation(instrumentation)
+    return instrumentation
+
+
+def disable_instrumentation() -> Instrumentation | None:
+    """
+    Removes the instrumentation from evaluate_expression, so it runs its default path again
+    :return: The removed instrumentation, or None if none was installed
+    """
+    instrumentation = get_instrumentation()
+    set_instrumentation(None)
+    return instrumentation
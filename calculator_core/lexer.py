@@ -0,0 +1,140 @@
+import re
+from collections import namedtuple
+from collections.abc import Iterator
+
+from calculator_core.errors import (DECIMAL_POINTS_TEMPLATE, DECIMAL_POINT_TEMPLATE, UNKNOWN_CHARACTER_TEMPLATE,
+                                    InvalidNumberFormatError, UnknownCharacterError)
+
+from operators.operator_registry import add_registry_listener
+from operators.operators_dict import OPERATORS
+
+NUMBER = 0
+OPERATOR = 1
+LEFT_PARENTHESIS = 2
+RIGHT_PARENTHESIS = 3
+WHITESPACE = 4
+NAME = 5
+UNKNOWN = 6
+
+
+class Token(namedtuple("Token", ["kind", "value", "offset"])):
+    """
+    Represents a token of an expression: its kind (NUMBER, OPERATOR, ...), its text and its offset in the expression
+    """
+    __slots__ = ()
+
+
+class Variable(object):
+    """
+    Represents a named variable of an expression, bound to a value when the expression is evaluated
+    """
+    __slots__ = ('__name',)
+
+    def __init__(self, name: str):
+        """
+        Initializes a new Variable instance
+        :param name: The name of the variable
+        """
+        self.__name = name
+
+    def get_name(self) -> str:
+        """
+        Returns the name of the variable
+        :return: The name of the variable
+        """
+        return self.__name
+
+
+def build_token_pattern(symbols, allow_names: bool = False) -> re.Pattern:
+    """
+    Builds the regular expression that splits an expression into tokens
+    :param symbols: The operator symbols that may appear in an expression
+    :param allow_names: True if names of variables are tokens, False if their letters are unknown characters
+    :return: The compiled pattern, where the index of the matching group is the kind of the token
+    """
+    operators = ''.join(re.escape(symbol) for symbol in sorted(symbols) if len(symbol) == 1)
+    names = r"[A-Za-z_][A-Za-z_0-9]*" if allow_names else r"(?!)"
+    return re.compile(rf"([\d.]+)|([{operators}])|(\()|(\))|([ \t]+)|({names})|(.)", re.DOTALL)
+
+
+TOKEN_PATTERN = build_token_pattern(OPERATORS)
+NAMED_TOKEN_PATTERN = build_token_pattern(OPERATORS, allow_names=True)
+
+
+def rebuild_token_patterns():
+    """
+    Rebuilds the token patterns from the registered operators
+    """
+    global TOKEN_PATTERN, NAMED_TOKEN_PATTERN
+    TOKEN_PATTERN = build_token_pattern(OPERATORS)
+    NAMED_TOKEN_PATTERN = build_token_pattern(OPERATORS, allow_names=True)
+
+
+add_registry_listener(rebuild_token_patterns)
+
+
+def tokenize(expression: str, allow_names: bool = False, start: int = 0,
+             pattern: re.Pattern | None = None) -> Iterator[Token]:
+    """
+    Lazily splits an expression into tokens in a single pass.
+    Number tokens keep their text, so number format errors are raised in the same order as before, when the number is
+    handled
+    :param expression: The expression to split
+    :param allow_names: True if the expression may contain names of variables
+    :param start: The offset the first token starts at, which must be the end of an earlier token
+    :param pattern: A pattern built by build_token_pattern for other operators (the pattern of the registered operators
+    by default, then allow_names is ignored)
+    :return: A generator of the tokens of the expression
+    :raises UnknownCharacterError: If an invalid character is encountered in the expression
+    """
+    new_token = tuple.__new__
+    if pattern is None:
+        pattern = NAMED_TOKEN_PATTERN if allow_names else TOKEN_PATTERN
+    for match in pattern.finditer(expression, start):
+        kind = match.lastindex - 1
+        if kind == UNKNOWN:
+            raise UnknownCharacterError(UNKNOWN_CHARACTER_TEMPLATE.format(match.group()))
+        # Building the tuple directly skips the argument handling of Token.__new__ on the hot path
+        yield new_token(Token, (kind, match.group(), match.start()))
+
+
+def find_number_format_error(text: str) -> str | None:
+    """
+    Finds the error in the format of the text of a number token, without raising it
+    :param text: A run of digits and decimal points
+    :return: The message of the InvalidNumberFormatError of the number, or None if its format is valid
+    """
+    if text[0] == '.' and (len(text) == 1 or not text[1].isdigit()):
+        return DECIMAL_POINT_TEMPLATE
+    if text.count('.') > 1:
+        return DECIMAL_POINTS_TEMPLATE
+    return None
+
+
+def check_number_format(text: str):
+    """
+    Checks the format of the text of a number token
+    :param text: A run of digits and decimal points
+    :raises InvalidNumberFormatError: If the number contains more than one decimal point or if a decimal point is not
+    followed or preceded by a digit
+    """
+    message = find_number_format_error(text)
+    if message is not None:
+        raise InvalidNumberFormatError(message)
+
+
+def parse_number(text: str) -> int | float:
+    """
+    Converts the text of a number token into a number
+    :param text: A run of digits and decimal points
+    :return: The number (an integer if the number has no fractional part)
+    :raises InvalidNumberFormatError: If the check_number_format function raises this exception
+    """
+    if '.' not in text:
+        return int(text)
+
+    check_number_format(text)
+    number = float(text)
+    if number.is_integer():
+        return int(number)
+    return number
@@ -0,0 +1,315 @@
+"""
+Predicts results that are too big before they are computed.
+Every sub-expression gets bounds on the base-10 logarithm of its absolute value, computed from the bounds of its
+operands by an estimator of its operator function. An operation whose lower bound already has more digits than the
+limit (the cost budget of the operators by default) raises the "too big" error of the operator, without computing its
+operands or itself
+"""
+import math
+import sys
+from functools import partial
+from typing import NamedTuple
+
+from calculator_core.calculator import execute_operation, process_tokens, tokenize_expression
+from calculator_core.errors import (ExpressionTooComplexError, InsufficientOperandsError, InsufficientOperatorsError,
+                                    InvalidNumberFormatError, InvalidUseOfOperatorError, InvalidValueForOperatorError,
+                                    UnknownCharacterError)
+from calculator_core.expression_tree import ConstantNode, OperationNode, iterate_post_order, parse_expression_tree
+
+from operators.operator_registry import resolve_function
+from operators.operator_types.operator_record import OperatorRecord
+from operators.operators_dict import OPERATOR_RECORDS
+from operators.operators_math_functions import (LOG10_OF_2, add, average, divide, factorial, get_cost_budget, maximum,
+                                                minimum, modulus, multiply, negate, power, subtract, sum_of_digits)
+
+FLOAT_MAX_LOG10 = math.log10(sys.float_info.max)
+# The relative error of the logarithms, so that rounding never predicts an error for a result that fits
+LOG10_TOLERANCE = 1e-12
+# x! is computed with lgamma only for x up to 10 ** MAX_FACTORIAL_LOG10, larger inputs are astronomically too big
+MAX_FACTORIAL_LOG10 = 300
+
+
+class MagnitudeBounds(NamedTuple):
+    """
+    Bounds on log10 of the absolute value of a sub-expression. low is -inf if the value may be zero and high is inf if
+    it is unbounded. value is the value itself for constants
+    """
+    low: float
+    high: float
+    value: int | float | None = None
+
+
+UNBOUNDED = MagnitudeBounds(-math.inf, math.inf)
+
+
+def bound_value(value: int | float) -> MagnitudeBounds:
+    """
+    Bounds a known number
+    :param value: The number
+    :return: The bounds of the number
+    """
+    magnitude = math.log10(abs(value)) if value else -math.inf
+    return MagnitudeBounds(magnitude, magnitude, value)
+
+
+def add_logarithms(log1: float, log2: float) -> float:
+    """
+    Adds two logarithms of absolute values, which is the logarithm of their product
+    :param log1: The first logarithm
+    :param log2: The second logarithm
+    :return: The sum, -inf if either value is zero
+    """
+    if log1 == -math.inf or log2 == -math.inf:
+        return -math.inf
+    return log1 + log2
+
+
+def estimate_sum(bounds1: MagnitudeBounds, bounds2: MagnitudeBounds) -> MagnitudeBounds:
+    """
+    Bounds x + y and x - y. The lower bound is known only if one operand is more than twice as big as the other
+    :param bounds1: The bounds of x
+    :param bounds2: The bounds of y
+    :return: The bounds of the result
+    """
+    high = max(bounds1.high, bounds2.high) + LOG10_OF_2
+    for big, small in ((bounds1, bounds2), (bounds2, bounds1)):
+        if big.low > small.high + LOG10_OF_2:
+            return MagnitudeBounds(big.low + math.log10(1 - 10 ** (small.high - big.low)), high)
+    return MagnitudeBounds(-math.inf, high)
+
+
+def estimate_average(bounds1: MagnitudeBounds, bounds2: MagnitudeBounds) -> MagnitudeBounds:
+    """
+    Bounds (x + y) / 2
+    :param bounds1: The bounds of x
+    :param bounds2: The bounds of y
+    :return: The bounds of the result
+    """
+    low, high, _ = estimate_sum(bounds1, bounds2)
+    return MagnitudeBounds(low - LOG10_OF_2, high - LOG10_OF_2)
+
+
+def estimate_product(bounds1: MagnitudeBounds, bounds2: MagnitudeBounds) -> MagnitudeBounds:
+    """
+    Bounds x * y
+    :param bounds1: The bounds of x
+    :param bounds2: The bounds of y
+    :return: The bounds of the result
+    """
+    return MagnitudeBounds(add_logarithms(bounds1.low, bounds2.low), add_logarithms(bounds1.high, bounds2.high))
+
+
+def estimate_quotient(bounds1: MagnitudeBounds, bounds2: MagnitudeBounds) -> MagnitudeBounds:
+    """
+    Bounds x / y
+    :param bounds1: The bounds of x
+    :param bounds2: The bounds of y
+    :return: The bounds of the result, unbounded above if y may be zero
+    """
+    if bounds2.high == -math.inf:
+        # Left to divide, which rejects a zero divisor
+        return UNBOUNDED
+    if bounds1.high == -math.inf:
+        return MagnitudeBounds(-math.inf, -math.inf)
+    return MagnitudeBounds(add_logarithms(bounds1.low, -bounds2.high), add_logarithms(bounds1.high, -bounds2.low))
+
+
+def estimate_power(bounds1: MagnitudeBounds, bounds2: MagnitudeBounds) -> MagnitudeBounds:
+    """
+    Bounds x ^ y. The result is a float, so it is bounded by the largest float, and the exponent must be known to bound
+    it more closely
+    :param bounds1: The bounds of x
+    :param bounds2: The bounds of y
+    :return: The bounds of the result
+    :raises ValueError: If the result is predicted to be bigger than the largest float
+    """
+    exponent = bounds2.value
+    if exponent is None:
+        return MagnitudeBounds(-math.inf, FLOAT_MAX_LOG10)
+    if exponent == 0:
+        return MagnitudeBounds(0.0, 0.0)
+    if not (isinstance(exponent, int) or exponent.is_integer()) and (bounds1.value is None or bounds1.value < 0):
+        # Left to power, which rejects a negative base with a fractional exponent
+        return MagnitudeBounds(-math.inf, FLOAT_MAX_LOG10)
+    if exponent < 0 and bounds1.high == -math.inf:
+        # Left to power, which rejects zero to a negative power
+        return MagnitudeBounds(-math.inf, FLOAT_MAX_LOG10)
+    try:
+        exponent = float(exponent)
+    except OverflowError:
+        exponent = math.inf if exponent > 0 else -math.inf
+    # |x| ^ y grows with |x| for a positive y and shrinks with it for a negative one
+    low, high = (bounds1.low, bounds1.high) if exponent > 0 else (bounds1.high, bounds1.low)
+    low, high = (low * exponent if low else 0.0), (high * exponent if high else 0.0)
+    if low > FLOAT_MAX_LOG10 * (1 + LOG10_TOLERANCE):
+        raise ValueError("The result of the power operation is too big")
+    return MagnitudeBounds(low, min(high, FLOAT_MAX_LOG10))
+
+
+def estimate_modulus(bounds1: MagnitudeBounds, bounds2: MagnitudeBounds) -> MagnitudeBounds:
+    """
+    Bounds x % y, which is smaller than y
+    :param bounds1: The bounds of x
+    :param bounds2: The bounds of y
+    :return: The bounds of the result
+    """
+    return MagnitudeBounds(-math.inf, bounds2.high)
+
+
+def estimate_extremum(bounds1: MagnitudeBounds, bounds2: MagnitudeBounds) -> MagnitudeBounds:
+    """
+    Bounds the maximum or the minimum of x and y, whose signs are unknown
+    :param bounds1: The bounds of x
+    :param bounds2: The bounds of y
+    :return: The bounds of the result
+    """
+    return MagnitudeBounds(-math.inf, max(bounds1.high, bounds2.high))
+
+
+def estimate_negation(bounds: MagnitudeBounds) -> MagnitudeBounds:
+    """
+    Bounds -x, keeping the value of a negative constant
+    :param bounds: The bounds of x
+    :return: The bounds of the result
+    """
+    return MagnitudeBounds(bounds.low, bounds.high, None if bounds.value is None else -bounds.value)
+
+
+def log10_factorial(log10_x: float) -> float:
+    """
+    Computes log10(x!) from log10(x)
+    :param log10_x: The logarithm of x
+    :return: The logarithm of x!, inf for astronomically large inputs
+    """
+    if log10_x == -math.inf:
+        return 0.0
+    if log10_x > MAX_FACTORIAL_LOG10:
+        return math.inf
+    return math.lgamma(10 ** log10_x + 1) / math.log(10)
+
+
+def estimate_factorial(bounds: MagnitudeBounds) -> MagnitudeBounds:
+    """
+    Bounds x!, which grows with x. Only known integers are bounded, since the bounds of a computed operand do not tell
+    whether it is an integer
+    :param bounds: The bounds of x
+    :return: The bounds of the result
+    """
+    if not isinstance(bounds.value, int) or bounds.value < 0:
+        # Left to factorial, which rejects the value, or to the check of the computed operand
+        return UNBOUNDED
+    return MagnitudeBounds(log10_factorial(bounds.low), log10_factorial(bounds.high))
+
+
+def estimate_sum_of_digits(bounds: MagnitudeBounds) -> MagnitudeBounds:
+    """
+    Bounds the sum of the digits of x, which is at least 1 and at most 9 per digit
+    :param bounds: The bounds of x
+    :return: The bounds of the result
+    """
+    if bounds.high == -math.inf:
+        # Left to sum_of_digits, which rejects zero
+        return UNBOUNDED
+    if bounds.high == math.inf:
+        return MagnitudeBounds(0.0, math.inf)
+    return MagnitudeBounds(0.0, math.log10(9 * (max(math.floor(bounds.high), 0) + 1)))
+
+
+# The estimators of the operator functions, so that an operator replaced in the registry is not estimated by mistake
+ESTIMATORS = {add: estimate_sum, subtract: estimate_sum, multiply: estimate_product, divide: estimate_quotient,
+              power: estimate_power, modulus: estimate_modulus, average: estimate_average, maximum: estimate_extremum,
+              minimum: estimate_extremum, negate: estimate_negation, factorial: estimate_factorial,
+              sum_of_digits: estimate_sum_of_digits}
+
+
+def estimate_operation(record: OperatorRecord, operands: list[MagnitudeBounds],
+                       max_digits: int | None = None) -> MagnitudeBounds:
+    """
+    Bounds the result of an operation and checks it against the limit
+    :param record: The record of the operator
+    :param operands: The bounds of the operands
+    :param max_digits: The number of digits past which a result is too big (the cost budget by default)
+    :return: The bounds of the result, unbounded for operators without estimator
+    :raises InvalidValueForOperatorError: If the result is predicted to be too big
+    """
+    function = resolve_function(record.function)
+    estimator = ESTIMATORS.get(function)
+    if estimator is None:
+        return UNBOUNDED
+    try:
+        bounds = estimator(*operands)
+    except ValueError as e:
+        raise InvalidValueForOperatorError(e)
+    if max_digits is None:
+        max_digits = get_cost_budget()
+    if bounds.low >= max_digits * (1 + LOG10_TOLERANCE):
+        raise InvalidValueForOperatorError(f"The result of the {function.__name__} operation is too big")
+    return bounds
+
+
+def estimate_tree(root, max_digits: int | None = None) -> MagnitudeBounds:
+    """
+    Bounds every sub-expression of a tree, from the leaves up
+    :param root: The root node of the tree
+    :param max_digits: The number of digits past which a result is too big (the cost budget by default)
+    :return: The bounds of the whole expression
+    :raises InvalidValueForOperatorError: If the result of a sub-expression is predicted to be too big
+    """
+    bounds = []
+    for node in iterate_post_order(root):
+        if isinstance(node, OperationNode):
+            arity = node.get_record().arity
+            operands = bounds[-arity:]
+            del bounds[-arity:]
+            bounds.append(estimate_operation(node.get_record(), operands, max_digits))
+        elif isinstance(node, ConstantNode):
+            bounds.append(bound_value(node.get_value()))
+        else:
+            bounds.append(UNBOUNDED)
+    return bounds.pop()
+
+
+def guarded_execute_operation(operand_stack: list[int | float], operator_stack: list[str],
+                              max_digits: int | None = None):
+    """
+    Executes an operation like execute_operation, after checking the bounds of its result from its known operands
+    :param operand_stack: list of operands
+    :param operator_stack: list of operators
+    :param max_digits: The number of digits past which a result is too big (the cost budget by default)
+    :raises InsufficientOperandsError: If there are insufficient operands to perform a binary operation
+    :raises InsufficientOperatorsError: If there are mismatched parentheses
+    :raises InvalidValueForOperatorError: If the result is predicted to be too big or an operator is given invalid value
+    """
+    record = OPERATOR_RECORDS.get(operator_stack[-1])
+    if record is not None and len(operand_stack) >= record.arity:
+        estimate_operation(record, [bound_value(operand) for operand in operand_stack[-record.arity:]], max_digits)
+    execute_operation(operand_stack, operator_stack)
+
+
+def evaluate_with_magnitude_checks(expression: str, max_digits: int | None = None) -> int | float:
+    """
+    Evaluates an expression after predicting the magnitude of its sub-expressions.
+    The whole tree of a valid expression is bounded first, so a sub-expression that is too big is reported before
+    anything is computed, even if an operation executed before it would raise another error. An invalid expression has
+    no tree, so its errors are reported in the order evaluate_expression reports them. The bounds after a subtraction or
+    an unknown operator are loose, so every operation is checked again from its computed operands before it is executed
+    :param expression: The expression to evaluate
+    :param max_digits: The number of digits past which a result is too big (the cost budget by default)
+    :return: The result of the expression
+    :raises ExpressionTooComplexError: If the expression is longer or nested deeper than the configured limits
+    :raises InvalidNumberFormatError: If the expression contains an invalid number
+    :raises UnknownCharacterError: If an invalid character is encountered in the expression
+    :raises InsufficientOperandsError: If there are not enough operands in the expression
+    :raises InsufficientOperatorsError: If there are not enough operators or mismatched parentheses
+    :raises InvalidUseOfOperatorError: If an operator is used incorrectly
+    :raises InvalidValueForOperatorError: If a result is predicted to be too big or an operator is given invalid value
+    """
+    try:
+        root = parse_expression_tree(expression)
+    except (ExpressionTooComplexError, InsufficientOperandsError, InsufficientOperatorsError, InvalidNumberFormatError,
+            InvalidUseOfOperatorError, UnknownCharacterError):
+        # Raised again by process_tokens, after the operations that come before the error in the expression
+        root = None
+    if root is not None:
+        estimate_tree(root, max_digits)
+    return process_tokens(tokenize_expression(expression), partial(guarded_execute_operation, max_digits=max_digits))
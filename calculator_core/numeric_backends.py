@@ -0,0 +1,187 @@
+from contextlib import nullcontext
+from decimal import Context, Decimal, localcontext
+from fractions import Fraction
+
+from calculator_core.calculator import execute_operation, get_operator_record, pop_operands
+from calculator_core.errors import InvalidValueForOperatorError
+from calculator_core.lexer import check_number_format, parse_number
+
+from operators.operator_types.operator_record import OperatorRecord
+from operators.operators_exact_functions import exact_factorial, exact_modulus, exact_power, exact_sum_of_digits
+
+EXACT_FUNCTIONS = {"^": exact_power, "%": exact_modulus, "!": exact_factorial, "#": exact_sum_of_digits}
+
+
+class NumericBackend(object):
+    """
+    Base class for the numeric types an expression can be evaluated with
+    """
+
+    def __init__(self, functions: dict | None = None):
+        """
+        Initializes a new NumericBackend instance
+        :param functions: A dictionary of operator symbols and the functions that replace their default implementation
+        """
+        self.__functions = dict(functions or {})
+
+    def activate(self):
+        """
+        Returns a context manager that is active while an expression is evaluated
+        :return: The context manager
+        """
+        return nullcontext()
+
+    def parse_number(self, text: str):
+        """
+        Converts the text of a number token into a number of the backend
+        :param text: A run of digits and decimal points
+        :return: The number
+        :raises InvalidNumberFormatError: If the number format is invalid
+        """
+        raise NotImplementedError
+
+    def normalize(self, num):
+        """
+        Converts the result of an operation into a number of the backend
+        :param num: The result of an operation
+        :return: The normalized result
+        """
+        raise NotImplementedError
+
+    def execute_operation(self, operand_stack: list, operator_stack: list[str]):
+        """
+        Executes one operation with the functions of the backend and insert the result into the operand_stack
+        :param operand_stack: list of operands
+        :param operator_stack: list of operators
+        :raises InsufficientOperandsError: If there are insufficient operands to perform a binary operation
+        :raises InsufficientOperatorsError: If there are mismatched parentheses
+        :raises InvalidValueForOperatorError: If an operator is given invalid value
+        """
+        record = get_operator_record(operator_stack.pop())
+        operands = pop_operands(operand_stack, record)
+        if operands:
+            operand_stack.append(self.apply_operator(record, operands))
+
+    def apply_operator(self, record: OperatorRecord, operands: tuple):
+        """
+        Applies an operator to its operands with the functions of the backend
+        :param record: The record of the operator
+        :param operands: The operands of the operator, in order
+        :return: The normalized result of the operation
+        :raises InvalidValueForOperatorError: If the operator is given invalid value
+        """
+        function = self.__functions.get(record.symbol, record.function)
+        if len(operands) == 1:
+            try:
+                num = function(operands[0])
+            except (ValueError, TypeError) as e:
+                raise InvalidValueForOperatorError(e)
+        else:
+            try:
+                num = function(operands[0], operands[1])
+            except (ZeroDivisionError, ValueError) as e:
+                raise InvalidValueForOperatorError(e)
+
+        return self.normalize(num)
+
+
+class FloatBackend(NumericBackend):
+    """
+    The default backend, float arithmetic with results rounded to 10 digits
+    """
+
+    def parse_number(self, text: str) -> int | float:
+        """
+        Converts the text of a number token into an integer or a float
+        :param text: A run of digits and decimal points
+        :return: The number
+        :raises InvalidNumberFormatError: If the number format is invalid
+        """
+        return parse_number(text)
+
+    def normalize(self, num: int | float) -> int | float:
+        """
+        Converts integral floats to integers and rounds the result of an operation
+        :param num: The result of an operation
+        :return: The normalized result
+        """
+        if isinstance(num, float) and num.is_integer():
+            num = int(num)
+        return round(num, 10)
+
+    def execute_operation(self, operand_stack: list[int | float], operator_stack: list[str]):
+        """
+        Executes one operation exactly like the default evaluation path
+        :param operand_stack: list of operands
+        :param operator_stack: list of operators
+        """
+        execute_operation(operand_stack, operator_stack)
+
+
+class DecimalBackend(NumericBackend):
+    """
+    Decimal arithmetic with a configurable number of significant digits
+    """
+
+    def __init__(self, precision: int = 28):
+        """
+        Initializes a new DecimalBackend instance
+        :param precision: The number of significant digits of every result
+        """
+        super().__init__(EXACT_FUNCTIONS)
+        self.__context = Context(prec=precision)
+
+    def activate(self):
+        """
+        Returns a context manager that applies the precision of the backend
+        :return: The context manager
+        """
+        return localcontext(self.__context)
+
+    def parse_number(self, text: str) -> Decimal:
+        """
+        Converts the text of a number token into a Decimal
+        :param text: A run of digits and decimal points
+        :return: The number
+        :raises InvalidNumberFormatError: If the number format is invalid
+        """
+        check_number_format(text)
+        return Decimal(text)
+
+    def normalize(self, num: int | Decimal) -> Decimal:
+        """
+        Rounds the result of an operation to the precision of the backend
+        :param num: The result of an operation
+        :return: The normalized result
+        """
+        return self.__context.plus(Decimal(num))
+
+
+class FractionBackend(NumericBackend):
+    """
+    Exact rational arithmetic. Powers with a fractional exponent are the only inexact operation
+    """
+
+    def __init__(self):
+        """
+        Initializes a new FractionBackend instance
+        """
+        super().__init__(EXACT_FUNCTIONS)
+
+    def parse_number(self, text: str) -> Fraction:
+        """
+        Converts the text of a number token into a Fraction
+        :param text: A run of digits and decimal points
+        :return: The number
+        :raises InvalidNumberFormatError: If the number format is invalid
+        """
+        check_number_format(text)
+        return Fraction(text)
+
+    def normalize(self, num: int | Fraction) -> Fraction:
+        """
+        Converts the result of an operation into a Fraction
+        :param num: The result of an operation
+        :return: The normalized result
+        """
+        return Fraction(num)
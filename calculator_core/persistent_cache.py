@@ -0,0 +1,412 @@
+"""
+A cache of expression results and compiled programs that outlives the process, stored in an SQLite database.
+Entries are keyed by a hash of the normalized expression and of a fingerprint of the operator table, the source of the
+modules of its functions, the expression limits and the cost budget, so processes with another configuration never read
+each other's entries, and the entries of a changed configuration are no longer found (they are evicted as the least
+recently used ones). Concurrent processes share the database through
+the locking of SQLite in write-ahead-log mode. The cache is optional: when the database cannot be used, expressions are
+evaluated without it
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from calculator_core.calculator import evaluate_expression, get_expression_limits, get_resource_limits
+from calculator_core.compiled_expression import PUSH_CONSTANT, LOAD_VARIABLE, CompiledExpression, compile_expression
+from calculator_core.expression_cache import normalize_expression
+from calculator_core.errors import ResourceLimitExceededError
+from calculator_core.result_formatting import CALCULATOR_ERRORS
+
+from operators.operator_registry import LazyFunction, get_registry_version
+from operators.operators_dict import OPERATOR_RECORDS
+from operators.operators_math_functions import get_cost_budget
+
+DATABASE_NAME = "expression_cache.sqlite3"
+SCHEMA_VERSION = 1
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# The bytes counted for every entry besides its key and value, roughly the overhead of a row and its index entry
+ENTRY_OVERHEAD = 48
+# Eviction frees space down to this fraction of the maximal size, so that it does not run on every store
+EVICTION_TARGET = 0.9
+# The number of microseconds after which a hit updates the last use time of an entry
+TOUCH_INTERVAL = 60 * 1000000
+# The number of seconds a process waits for the lock of the database
+LOCK_TIMEOUT = 30
+# Integers with more bits are stored as hexadecimal text, which has no digit limit and is converted in linear time
+MAX_DECIMAL_INTEGER_BITS = 4096
+
+# The errors that depend on the limits of one evaluation rather than on the expression are not stored
+ERROR_CLASSES = {error_class.__name__: error_class for error_class in CALCULATOR_ERRORS
+                 if error_class is not ResourceLimitExceededError}
+
+TABLE_FINGERPRINT = None
+TABLE_FINGERPRINT_KEY = None
+MODULE_VERSIONS = {}
+
+
+def get_module_version(module_name: str | None) -> str:
+    """
+    Returns a version of a module that changes when its source changes, without importing it
+    :param module_name: The name of the module
+    :return: The SHA-256 digest of the file of the module, or its origin if it has no file
+    """
+    version = MODULE_VERSIONS.get(module_name)
+    if version is None:
+        module = sys.modules.get(module_name)
+        path = getattr(module, '__file__', None)
+        if path is None and module is None:
+            try:
+                spec = importlib.util.find_spec(module_name)
+            except (ImportError, ValueError, AttributeError, TypeError):
+                spec = None
+            path = None if spec is None else spec.origin
+        try:
+            with open(path, 'rb') as file:
+                version = hashlib.sha256(file.read()).hexdigest()
+        except (OSError, TypeError, ValueError):
+            # A built-in module, or one created at runtime
+            version = str(path)
+        MODULE_VERSIONS[module_name] = version
+    return version
+
+
+def describe_function(function) -> str:
+    """
+    Describes the function of an operator the same way in every process
+    :param function: A function or a LazyFunction
+    :return: The qualified name of the function, the version of its module, and a hash of the code of lambdas and nested
+    functions
+    """
+    if isinstance(function, LazyFunction):
+        # The same description as the loaded function, so loading it does not change the fingerprint
+        return f"{function.get_qualified_name()}@{get_module_version(function.get_module_name())}"
+    module_name = getattr(function, '__module__', None)
+    name = f"{module_name}.{getattr(function, '__qualname__', repr(function))}@{get_module_version(module_name)}"
+    code = getattr(function, '__code__', None)
+    if '<' in name and code is not None:
+        # Lambdas and nested functions share their names, so their code tells them apart
+        name += ':' + hashlib.sha256(code.co_code + repr(code.co_consts).encode('utf-8')).hexdigest()
+    return name
+
+
+def get_table_fingerprint() -> bytes:
+    """
+    Returns a fingerprint of the registered operators, the expression limits and the cost budget that is the same in
+    every process with the same configuration. It is computed again after one of them changes
+    :return: The SHA-256 digest of the configuration
+    """
+    global TABLE_FINGERPRINT, TABLE_FINGERPRINT_KEY
+    key = (get_registry_version(), get_expression_limits(), get_cost_budget())
+    if TABLE_FINGERPRINT_KEY != key:
+        description = [[record.symbol, record.arity, record.fixity, record.precedence,
+                        describe_function(record.function)] for record in OPERATOR_RECORDS.values()]
+        description.sort()
+        description.append(list(get_expression_limits()))
+        description.append(get_cost_budget())
+        TABLE_FINGERPRINT = hashlib.sha256(json.dumps(description).encode('utf-8')).digest()
+        TABLE_FINGERPRINT_KEY = key
+    return TABLE_FINGERPRINT
+
+
+def encode_number(number: int | float) -> int | float | dict:
+    """
+    Encodes a number for the database
+    :param number: An integer or a float
+    :return: The number, or a dictionary with the hexadecimal text of a big integer
+    """
+    if type(number) is int and number.bit_length() > MAX_DECIMAL_INTEGER_BITS:
+        return {"hex": hex(number)}
+    return number
+
+
+def decode_number(encoded: int | float | dict) -> int | float:
+    """
+    Decodes a number read from the database
+    :param encoded: A number encoded by encode_number
+    :return: The number
+    """
+    if type(encoded) is dict:
+        return int(encoded["hex"], 16)
+    return encoded
+
+
+def encode_error(error: Exception) -> dict | None:
+    """
+    Encodes an error of the calculator for the database
+    :param error: The raised error
+    :return: A JSON-serializable description, or None if the error is not one of the calculator that can be stored
+    """
+    if error.__class__.__name__ not in ERROR_CLASSES:
+        return None
+    return {"error": [error.__class__.__name__, str(error)]}
+
+
+def decode_error(outcome: dict) -> Exception:
+    """
+    Builds the error of an encoded outcome
+    :param outcome: The outcome read from the database
+    :return: The error, with the class and message of the one that was stored
+    """
+    name, message = outcome["error"]
+    return ERROR_CLASSES[name](message)
+
+
+class PersistentCache(object):
+    """
+    A size-bounded cache of the results and compiled programs of expressions, stored in a directory that many processes
+    can share. Outcomes are computed by evaluate_expression on a miss, so an installed instrumentation only sees the
+    expressions that are not cached. While resource limits are installed, expressions are evaluated without the cache,
+    since their outcomes depend on the limits
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initializes a new PersistentCache instance, creating the directory and the database if needed
+        :param directory: The directory of the database
+        :param max_bytes: The approximate size of the stored entries above which the least recently used are evicted
+        :raises ValueError: If max_bytes is not positive
+        :raises sqlite3.Error: If the database cannot be opened
+        """
+        if max_bytes <= 0:
+            raise ValueError("The size of the cache must be positive")
+        os.makedirs(directory, exist_ok=True)
+        self.__path = os.path.join(directory, DATABASE_NAME)
+        self.__max_bytes = max_bytes
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__errors = 0
+        self.__connection = sqlite3.connect(self.__path, timeout=LOCK_TIMEOUT, isolation_level=None,
+                                            check_same_thread=False)
+        try:
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute("PRAGMA synchronous=NORMAL")
+            self.__create_schema()
+        except sqlite3.Error:
+            self.__connection.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get_path(self) -> str:
+        """
+        Returns the path of the database
+        :return: The path of the database file
+        """
+        return self.__path
+
+    def __create_schema(self):
+        """
+        Creates the tables of the database, or creates them again if they have another schema version
+        """
+        connection = self.__connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                connection.execute("DROP TABLE IF EXISTS entries")
+                connection.execute("DROP TABLE IF EXISTS metadata")
+                connection.execute("CREATE TABLE entries (key BLOB PRIMARY KEY, value TEXT NOT NULL, "
+                                   "size INTEGER NOT NULL, used INTEGER NOT NULL) WITHOUT ROWID")
+                connection.execute("CREATE INDEX entries_used ON entries (used)")
+                connection.execute("CREATE TABLE metadata (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                connection.execute("INSERT INTO metadata VALUES ('size', 0)")
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def evaluate(self, expression: str) -> int | float:
+        """
+        Evaluates the given expression, using the stored outcome when possible
+        :param expression: The expression to evaluate
+        :return: The result of the expression
+        :raises Exception: The same exception evaluate_expression raises for the expression
+        """
+        if get_resource_limits() is not None:
+            return evaluate_expression(expression)
+        key = self.__build_key("result", normalize_expression(expression))
+        outcome = self.__load(key)
+        if outcome is None:
+            try:
+                result = evaluate_expression(expression)
+            except Exception as e:
+                encoded = encode_error(e)
+                if encoded is not None:
+                    self.__store(key, encoded)
+                raise
+            if type(result) in (int, float):
+                self.__store(key, {"value": encode_number(result)})
+            return result
+
+        if "error" in outcome:
+            raise decode_error(outcome)
+        return decode_number(outcome["value"])
+
+    def compile(self, expression: str, allow_names: bool = False, optimize: bool = False) -> CompiledExpression:
+        """
+        Compiles the given expression like compile_expression, using the stored program when possible
+        :param expression: The expression to compile
+        :param allow_names: True if the expression may contain variables
+        :param optimize: True to fold constants and remove redundant operations before the program is built
+        :return: The compiled expression
+        :raises Exception: The same exception compile_expression raises for the expression
+        """
+        key = self.__build_key(f"program:{allow_names:d}:{optimize:d}", normalize_expression(expression))
+        outcome = self.__load(key)
+        if outcome is None:
+            try:
+                compiled = compile_expression(expression, allow_names, optimize)
+            except Exception as e:
+                encoded = encode_error(e)
+                if encoded is not None:
+                    self.__store(key, encoded)
+                raise
+            program = [[opcode, encode_number(argument) if opcode == PUSH_CONSTANT else
+                        argument if opcode == LOAD_VARIABLE else argument.symbol]
+                       for opcode, argument in compiled.get_program()]
+            self.__store(key, {"program": program})
+            return compiled
+
+        if "error" in outcome:
+            raise decode_error(outcome)
+        # The fingerprint in the key guarantees that the operators of the program are the registered ones
+        return CompiledExpression(expression, tuple(
+            (opcode, decode_number(argument) if opcode == PUSH_CONSTANT else
+             argument if opcode == LOAD_VARIABLE else OPERATOR_RECORDS[argument])
+            for opcode, argument in outcome["program"]))
+
+    @staticmethod
+    def __build_key(kind: str, expression: str) -> bytes:
+        """
+        Builds the key of an entry
+        :param kind: The kind of the stored outcome and its options
+        :param expression: The normalized expression
+        :return: The SHA-256 digest of the fingerprint of the configuration, the kind and the expression
+        """
+        digest = hashlib.sha256(get_table_fingerprint())
+        digest.update(f"{kind}\0{expression}".encode('utf-8', errors='surrogatepass'))
+        return digest.digest()
+
+    def __load(self, key: bytes) -> dict | None:
+        """
+        Reads a stored outcome and updates its last use time if it was not updated recently
+        :param key: The key of the entry
+        :return: The decoded outcome, or None if it is not stored or the database cannot be read
+        """
+        now = time.time_ns() // 1000
+        with self.__lock:
+            try:
+                row = self.__connection.execute("SELECT value, used FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[1] >= TOUCH_INTERVAL:
+                    self.__connection.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+            except sqlite3.Error:
+                self.__errors += 1
+                return None
+            if row is None:
+                self.__misses += 1
+                return None
+            self.__hits += 1
+        return json.loads(row[0])
+
+    def __store(self, key: bytes, outcome: dict):
+        """
+        Stores an outcome, and evicts the least recently used entries if the cache grows past its size.
+        An entry stored by another process in the meantime is kept, and an outcome that cannot be stored is counted as
+        an error without raising
+        :param key: The key of the entry
+        :param outcome: The JSON-serializable outcome
+        """
+        try:
+            value = json.dumps(outcome, separators=(',', ':'))
+        except (TypeError, ValueError):
+            with self.__lock:
+                self.__errors += 1
+            return
+        size = len(key) + len(value) + ENTRY_OVERHEAD
+        with self.__lock:
+            connection = self.__connection
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    inserted = connection.execute("INSERT OR IGNORE INTO entries VALUES (?, ?, ?, ?)",
+                                                  (key, value, size, time.time_ns() // 1000)).rowcount
+                    if inserted:
+                        connection.execute("UPDATE metadata SET value = value + ? WHERE name = 'size'", (size,))
+                        self.__evict()
+                    connection.execute("COMMIT")
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error:
+                self.__errors += 1
+
+    def __evict(self):
+        """
+        Removes the least recently used entries while the stored size is above the maximal size, inside the transaction
+        of a store
+        """
+        connection = self.__connection
+        total = connection.execute("SELECT value FROM metadata WHERE name = 'size'").fetchone()[0]
+        if total <= self.__max_bytes:
+            return
+        target = int(self.__max_bytes * EVICTION_TARGET)
+        keys = []
+        freed = 0
+        for key, size in connection.execute("SELECT key, size FROM entries ORDER BY used"):
+            if total - freed <= target:
+                break
+            keys.append((key,))
+            freed += size
+        connection.executemany("DELETE FROM entries WHERE key = ?", keys)
+        connection.execute("UPDATE metadata SET value = value - ? WHERE name = 'size'", (freed,))
+        self.__evictions += len(keys)
+
+    def clear(self):
+        """
+        Removes all the entries from the database, for every process, and resets the statistics
+        """
+        with self.__lock:
+            connection = self.__connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute("DELETE FROM entries")
+                connection.execute("UPDATE metadata SET value = 0 WHERE name = 'size'")
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+            self.__errors = 0
+
+    def get_statistics(self) -> dict[str, int]:
+        """
+        Returns the statistics of this instance and the size of the shared database
+        :return: A dictionary with the hits, misses, evictions and database errors of this instance, and the number of
+        entries and the approximate stored bytes of the database
+        """
+        with self.__lock:
+            entries = self.__connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            size = self.__connection.execute("SELECT value FROM metadata WHERE name = 'size'").fetchone()[0]
+            return {"hits": self.__hits, "misses": self.__misses, "evictions": self.__evictions,
+                    "errors": self.__errors, "entries": entries, "bytes": size, "max_bytes": self.__max_bytes}
+
+    def close(self):
+        """
+        Closes the database
+        """
+        with self.__lock:
+            self.__connection.close()
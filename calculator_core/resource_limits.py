@@ -0,0 +1,276 @@
+"""
+Per-evaluation resource limits.
+ResourceLimits counts the operations that an evaluation executes, bounds the bit length of its integers and checks a
+wall-clock deadline between operations. These checks are cooperative: a single operation that is already running, such
+as a big factorial, is only stopped by the integer limit, which rejects it from its operands before it is computed, or
+by HardTimeoutEvaluator, which evaluates in a worker process that is terminated when the timeout expires
+"""
+import math
+import multiprocessing
+import threading
+from time import monotonic
+
+from calculator_core.calculator import (evaluate_expression, evaluate_with_hooks, get_resource_limits,
+                                        set_resource_limits)
+from calculator_core.errors import ResourceLimitExceededError
+from calculator_core.magnitude_estimation import ESTIMATORS, bound_value
+
+from operators.operator_registry import resolve_function
+from operators.operators_dict import OPERATOR_RECORDS
+
+# The number of tokens read between two checks of the deadline
+TOKENS_PER_DEADLINE_CHECK = 1024
+
+LOG2_10 = math.log2(10)
+
+
+class ResourceLimits(object):
+    """
+    The limits that an evaluation must stay within, enforced by evaluate_expression while they are installed with
+    set_resource_limits. A limit set to None is not enforced. The limits are a hook of calculator.run_hooks, inside the
+    instrumentation when both are installed
+    """
+
+    def __init__(self, max_operations: int | None = None, max_bit_length: int | None = None,
+                 timeout: float | None = None):
+        """
+        Initializes a new ResourceLimits instance
+        :param max_operations: The maximal number of operators executed in one evaluation
+        :param max_bit_length: The maximal number of bits of an integer operand or intermediate result
+        :param timeout: The maximal number of seconds an evaluation may take
+        """
+        self.__max_operations = max_operations
+        self.__max_bit_length = max_bit_length
+        self.__timeout = timeout
+
+    def get_max_operations(self) -> int | None:
+        """
+        Returns the maximal number of operators executed in one evaluation
+        :return: The operation budget, or None
+        """
+        return self.__max_operations
+
+    def get_max_bit_length(self) -> int | None:
+        """
+        Returns the maximal number of bits of an integer operand or intermediate result
+        :return: The bit length limit, or None
+        """
+        return self.__max_bit_length
+
+    def get_timeout(self) -> float | None:
+        """
+        Returns the maximal number of seconds an evaluation may take
+        :return: The timeout, or None
+        """
+        return self.__timeout
+
+    def evaluate(self, expression: str, backend=None) -> int | float:
+        """
+        Evaluates an expression like evaluate_expression does, within the limits
+        :param expression: The expression to evaluate
+        :param backend: A numeric backend from calculator_core.numeric_backends, or None for the default float
+        arithmetic
+        :return: The result of the expression
+        :raises ExpressionTooComplexError: If the expression is longer or nested deeper than the configured limits
+        :raises InvalidNumberFormatError: If the expression contains an invalid number
+        :raises UnknownCharacterError: If an invalid character is encountered in the expression
+        :raises InsufficientOperandsError: If there are not enough operands in the expression
+        :raises InsufficientOperatorsError: If there are not enough operators or mismatched parentheses
+        :raises InvalidUseOfOperatorError: If an operator is used incorrectly
+        :raises InvalidValueForOperatorError: If an operator is given invalid value
+        :raises ResourceLimitExceededError: If the evaluation exceeds one of the limits
+        """
+        return evaluate_with_hooks(expression, backend, [self])
+
+    def process(self, expression: str, tokens, execute, parse, run) -> int | float:
+        """
+        Processes the tokens of an expression within the limits, as a hook of calculator.run_hooks
+        :param expression: The expression
+        :param tokens: An iterable of the tokens of the expression
+        :param execute: The function that executes the operator at the top of the operator_stack
+        :param parse: The function that converts the text of a number token
+        :param run: The function that processes the tokens with the wrapped functions
+        :return: The result of the expression
+        :raises ResourceLimitExceededError: If the evaluation exceeds one of the limits
+        """
+        max_operations = self.__max_operations
+        max_bit_length = self.__max_bit_length
+        timeout = self.__timeout
+        deadline = None if timeout is None else monotonic() + timeout
+        operations = 0
+
+        def limited_execute(operand_stack: list, operator_stack: list[str]):
+            nonlocal operations
+            record = OPERATOR_RECORDS.get(operator_stack[-1])
+            if record is None:
+                # A left parenthesis, which raises the mismatched parentheses error
+                return execute(operand_stack, operator_stack)
+            operations += 1
+            if max_operations is not None and operations > max_operations:
+                raise ResourceLimitExceededError(f"The expression executes more than {max_operations} operations")
+            if deadline is not None and monotonic() > deadline:
+                raise ResourceLimitExceededError(f"The evaluation took longer than {timeout} seconds")
+            if max_bit_length is not None and len(operand_stack) >= record.arity:
+                check_predicted_bit_length(record, operand_stack[-record.arity:], max_bit_length)
+            execute(operand_stack, operator_stack)
+            if max_bit_length is not None and operand_stack:
+                check_bit_length(operand_stack[-1], max_bit_length)
+
+        def limited_parse(value: str):
+            number = parse(value)
+            if max_bit_length is not None:
+                check_bit_length(number, max_bit_length)
+            return number
+
+        if deadline is not None:
+            tokens = check_deadline(tokens, deadline, timeout)
+        return run(tokens, limited_execute, limited_parse)
+
+
+def check_bit_length(number, max_bit_length: int):
+    """
+    Checks that a number is not an integer with more bits than the limit
+    :param number: The number to check
+    :param max_bit_length: The maximal number of bits
+    :raises ResourceLimitExceededError: If the number is an integer with more bits than the limit
+    """
+    if type(number) is int and number.bit_length() > max_bit_length:
+        raise ResourceLimitExceededError(f"An intermediate result has more than {max_bit_length} bits")
+
+
+def check_predicted_bit_length(record, operands: list, max_bit_length: int):
+    """
+    Checks the predicted size of the integer result of an operation before it is computed, so that an operation such as
+    a big factorial or power is rejected instead of running for a long time
+    :param record: The record of the operator
+    :param operands: The operands of the operation
+    :param max_bit_length: The maximal number of bits
+    :raises ResourceLimitExceededError: If the result is predicted to have more bits than the limit
+    """
+    if not all(type(operand) is int for operand in operands):
+        return
+    estimator = ESTIMATORS.get(resolve_function(record.function))
+    if estimator is None:
+        return
+    try:
+        low = estimator(*map(bound_value, operands)).low
+    except ValueError:
+        # The operation raises its own error
+        return
+    if low * LOG2_10 > max_bit_length + 1:
+        raise ResourceLimitExceededError(f"The result of the '{record.symbol}' operation would have more than "
+                                         f"{max_bit_length} bits")
+
+
+def check_deadline(tokens, deadline: float, timeout: float):
+    """
+    Passes the tokens of an expression through, checking the deadline every TOKENS_PER_DEADLINE_CHECK tokens
+    :param tokens: An iterable of the tokens of the expression
+    :param deadline: The monotonic time past which the evaluation is stopped
+    :param timeout: The timeout the deadline was computed from, for the message
+    :return: A generator of the tokens
+    :raises ResourceLimitExceededError: If the deadline passes
+    """
+    for count, token in enumerate(tokens, 1):
+        if count % TOKENS_PER_DEADLINE_CHECK == 0 and monotonic() > deadline:
+            raise ResourceLimitExceededError(f"The evaluation took longer than {timeout} seconds")
+        yield token
+
+
+def enable_resource_limits(max_operations: int | None = None, max_bit_length: int | None = None,
+                           timeout: float | None = None) -> ResourceLimits:
+    """
+    Installs new resource limits in evaluate_expression
+    :param max_operations: The maximal number of operators executed in one evaluation
+    :param max_bit_length: The maximal number of bits of an integer operand or intermediate result
+    :param timeout: The maximal number of seconds an evaluation may take
+    :return: The installed resource limits
+    """
+    resource_limits = ResourceLimits(max_operations, max_bit_length, timeout)
+    set_resource_limits(resource_limits)
+    return resource_limits
+
+
+def disable_resource_limits() -> ResourceLimits | None:
+    """
+    Removes the resource limits from evaluate_expression, so it runs its default path again
+    :return: The removed resource limits, or None if none were installed
+    """
+    resource_limits = get_resource_limits()
+    set_resource_limits(None)
+    return resource_limits
+
+
+def evaluate_in_worker(expression: str, resource_limits: ResourceLimits | None) -> int | float:
+    """
+    Evaluates an expression in a worker process of HardTimeoutEvaluator
+    :param expression: The expression to evaluate
+    :param resource_limits: The cooperative limits to enforce as well, or None
+    :return: The result of the expression
+    """
+    if resource_limits is None:
+        return evaluate_expression(expression)
+    return resource_limits.evaluate(expression)
+
+
+class HardTimeoutEvaluator(object):
+    """
+    Evaluates expressions in a worker process that is terminated, and started again, when an evaluation outlives the
+    timeout. Unlike the deadline of ResourceLimits, this also stops an operation that is already running.
+    One expression is evaluated at a time, and operators registered at runtime reach the worker only when processes are
+    forked
+    """
+
+    def __init__(self, timeout: float, resource_limits: ResourceLimits | None = None):
+        """
+        Initializes a new HardTimeoutEvaluator instance, the worker process is started by the first evaluation
+        :param timeout: The maximal number of seconds an evaluation may take
+        :param resource_limits: The cooperative limits that the worker enforces as well, or None
+        """
+        self.__timeout = timeout
+        self.__resource_limits = resource_limits
+        self.__lock = threading.Lock()
+        self.__pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get_timeout(self) -> float:
+        """
+        Returns the maximal number of seconds an evaluation may take
+        :return: The timeout
+        """
+        return self.__timeout
+
+    def evaluate(self, expression: str) -> int | float:
+        """
+        Evaluates an expression in the worker process
+        :param expression: The expression to evaluate
+        :return: The result of the expression
+        :raises ResourceLimitExceededError: If the evaluation outlives the timeout or exceeds one of the resource limits
+        :raises Exception: The error that evaluate_expression raises for the expression
+        """
+        with self.__lock:
+            if self.__pool is None:
+                self.__pool = multiprocessing.Pool(1)
+            pending = self.__pool.apply_async(evaluate_in_worker, (expression, self.__resource_limits))
+            try:
+                return pending.get(self.__timeout)
+            except multiprocessing.TimeoutError:
+                self.__pool.terminate()
+                self.__pool.join()
+                self.__pool = None
+                raise ResourceLimitExceededError(f"The evaluation took longer than {self.__timeout} seconds") from None
+
+    def close(self):
+        """
+        Stops the worker process
+        """
+        with self.__lock:
+            if self.__pool is not None:
+                self.__pool.close()
+                self.__pool.join()
+                self.__pool = None
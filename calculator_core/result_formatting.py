@@ -0,0 +1,61 @@
+from calculator_core.calculator import evaluate_expression
+from calculator_core.errors import (ExpressionTooComplexError, InsufficientOperandsError, InsufficientOperatorsError,
+                                    InvalidNumberFormatError, InvalidUseOfOperatorError, InvalidValueForOperatorError,
+                                    ResourceLimitExceededError, UnknownCharacterError)
+
+
+CALCULATOR_ERRORS = (InsufficientOperandsError, InvalidNumberFormatError, UnknownCharacterError,
+                     InsufficientOperatorsError, InvalidUseOfOperatorError, InvalidValueForOperatorError,
+                     ExpressionTooComplexError, ResourceLimitExceededError)
+
+
+def format_result(result: int | float) -> str:
+    """
+    Formats the result of an expression
+    :param result: The result to format
+    :return: The result as it is printed to the user
+    :raises OverflowError: If the result is too big to be converted to a float
+    """
+    if 'e' in str(float(result)):
+        return str(float(result))
+    return str(result)
+
+
+def describe_error(error: Exception) -> tuple[str, str]:
+    """
+    Describes an error raised while evaluating an expression
+    :param error: The error to describe
+    :return: A tuple containing the name of the error class and the message shown to the user
+    """
+    if isinstance(error, CALCULATOR_ERRORS):
+        return error.__class__.__name__, str(error)
+    if isinstance(error, (ValueError, OverflowError)):
+        return error.__class__.__name__, "The result of the expression is too big"
+    return error.__class__.__name__, str(error)
+
+
+def format_error(error: Exception) -> str:
+    """
+    Formats an error raised while evaluating an expression
+    :param error: The error to format
+    :return: The error as it is printed to the user
+    """
+    name, message = describe_error(error)
+    if isinstance(error, CALCULATOR_ERRORS + (ValueError, OverflowError)):
+        return f"{name}: {message}"
+    return f"Unexpected error: {name}, {message}"
+
+
+def format_expression(expression: str, evaluate=None) -> str:
+    """
+    Evaluates an expression and formats its result or error
+    :param expression: The expression to evaluate
+    :param evaluate: The function that evaluates the expression (evaluate_expression by default)
+    :return: The line printed to the user for the expression
+    """
+    if evaluate is None:
+        evaluate = evaluate_expression
+    try:
+        return format_result(evaluate(expression))
+    except Exception as e:
+        return format_error(e)
@@ -0,0 +1,75 @@
+from typing import NamedTuple
+
+from calculator_core.compiled_expression import (APPLY_UNARY, LOAD_VARIABLE, PUSH_CONSTANT, CompiledExpression,
+                                                 compile_expression)
+from calculator_core.errors import InvalidUseOfOperatorError, UnknownVariableError
+
+from operators.operator_registry import get_vectorized_function
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class VectorizedResult(NamedTuple):
+    """
+    The result of an expression evaluated over arrays of variable values
+    """
+    values: "numpy.ndarray"
+    errors: "numpy.ndarray"
+
+
+def evaluate_vectorized(expression: str | CompiledExpression, **arrays) -> VectorizedResult:
+    """
+    Evaluates an expression over whole arrays of variable values at once, running every operator as a NumPy operation.
+    Elements for which the scalar evaluation would raise InvalidValueForOperatorError, or whose digits the floats cannot
+    sum exactly, are NaN in the values and True in the errors
+    :param expression: The expression (or an expression compiled with allow_names=True) to evaluate
+    :param arrays: The values of the variables of the expression, as arrays (or scalars) that broadcast together
+    :return: The values and the error mask of the expression
+    :raises ImportError: If NumPy is not installed
+    :raises UnknownVariableError: If no values are given for a variable of the expression
+    :raises InvalidUseOfOperatorError: If an operator of the expression has no vectorized implementation
+    """
+    if numpy is None:
+        raise ImportError("evaluate_vectorized requires numpy")
+
+    if not isinstance(expression, CompiledExpression):
+        expression = compile_expression(expression, allow_names=True)
+
+    stack = []
+    with numpy.errstate(all='ignore'):
+        for opcode, argument in expression.get_program():
+            if opcode == PUSH_CONSTANT:
+                stack.append((numpy.asarray(argument, dtype=numpy.float64), None))
+                continue
+            if opcode == LOAD_VARIABLE:
+                if argument not in arrays:
+                    raise UnknownVariableError(f"No value was given for the variable '{argument}'")
+                stack.append((numpy.asarray(arrays[argument], dtype=numpy.float64), None))
+                continue
+
+            function = get_vectorized_function(argument.symbol)
+            if function is None:
+                raise InvalidUseOfOperatorError(f"Operator '{argument.symbol}' has no vectorized implementation")
+            if opcode == APPLY_UNARY:
+                operand, errors = stack.pop()
+                values, new_errors = function(operand)
+            else:
+                operand2, errors2 = stack.pop()
+                operand1, errors = stack.pop()
+                values, new_errors = function(operand1, operand2)
+                if errors2 is not None:
+                    errors = errors2 if errors is None else errors | errors2
+
+            if new_errors is not None:
+                errors = new_errors if errors is None else errors | new_errors
+            stack.append((numpy.round(values, 10), errors))
+
+        values, errors = stack.pop()
+        if errors is None:
+            errors = numpy.zeros(numpy.shape(values), dtype=bool)
+        values, errors = numpy.broadcast_arrays(values, errors)
+        values = numpy.where(errors, numpy.nan, values)
+    return VectorizedResult(values, errors.copy())
@@ -0,0 +1,410 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from calculator_core.calculator import evaluate_expression
+from calculator_core.result_formatting import describe_error, format_error, format_result
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+MAX_QUEUE_SIZE = 4096
+MAX_BATCH_SIZE = 256
+BATCH_DELAY = 0.002
+MAX_REQUEST_BYTES = 1 << 20
+MAX_HEADER_LINES = 100
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+                503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    """Exception raised when a request cannot be served, holding the HTTP status of the response"""
+
+    def __init__(self, status: int, message: str):
+        """
+        Initializes a new HttpError instance
+        :param status: The HTTP status code of the response
+        :param message: The message sent to the client
+        """
+        super().__init__(message)
+        self.__status = status
+
+    def get_status(self) -> int:
+        """
+        Returns the HTTP status code of the response
+        :return: The HTTP status code
+        """
+        return self.__status
+
+
+def describe_expression(expression: str, evaluate=None) -> dict:
+    """
+    Evaluates an expression into a JSON-serializable description of its result or error
+    :param expression: The expression to evaluate
+    :param evaluate: The function that evaluates the expression (evaluate_expression by default)
+    :return: A dictionary with either the formatted 'result' or the 'error' type and message, and the 'output' line that
+    main.handle_expression prints for the expression
+    """
+    if evaluate is None:
+        evaluate = evaluate_expression
+    try:
+        result = format_result(evaluate(expression))
+    except Exception as e:
+        name, message = describe_error(e)
+        return {"error": {"type": name, "message": message}, "output": format_error(e)}
+    return {"result": result, "output": result}
+
+
+def describe_expressions(expressions: list[str], max_result_digits: int | None = None,
+                         resource_limits=None) -> list[dict]:
+    """
+    Evaluates a micro-batch of expressions in a worker
+    :param expressions: The expressions to evaluate
+    :param max_result_digits: The number of digits past which results are predicted to be too big before they are
+    computed, or None to evaluate without magnitude checks
+    :param resource_limits: A ResourceLimits from calculator_core.resource_limits that every evaluation must stay
+    within, or None. It cannot be combined with max_result_digits
+    :return: The description of every expression, in order
+    """
+    if resource_limits is not None:
+        return [describe_expression(expression, resource_limits.evaluate) for expression in expressions]
+    if max_result_digits is None:
+        return [describe_expression(expression) for expression in expressions]
+    from calculator_core.magnitude_estimation import evaluate_with_magnitude_checks
+
+    evaluate = partial(evaluate_with_magnitude_checks, max_digits=max_result_digits)
+    return [describe_expression(expression, evaluate) for expression in expressions]
+
+
+def parse_request_body(body: bytes) -> tuple[list[str], bool]:
+    """
+    Parses the JSON body of an evaluation request
+    :param body: The body, either {"expression": "..."} or {"expressions": ["...", ...]}
+    :return: The expressions of the request, and True if the request is a batch
+    :raises HttpError: If the body is not a valid evaluation request
+    """
+    try:
+        request = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        raise HttpError(400, "The request body is not valid JSON")
+    if isinstance(request, dict) and isinstance(request.get("expression"), str):
+        return [request["expression"]], False
+    if isinstance(request, dict) and isinstance(request.get("expressions"), list) and \
+            all(isinstance(expression, str) for expression in request["expressions"]):
+        return request["expressions"], True
+    raise HttpError(400, "Expected {\"expression\": string} or {\"expressions\": [string, ...]}")
+
+
+class EvaluationServer(object):
+    """
+    An HTTP/JSON service that coalesces the expressions of concurrent requests into micro-batches evaluated by a pool of
+    worker processes
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int | None = None,
+                 max_queue_size: int = MAX_QUEUE_SIZE, max_batch_size: int = MAX_BATCH_SIZE,
+                 batch_delay: float = BATCH_DELAY, max_concurrent_batches: int | None = None,
+                 max_request_bytes: int = MAX_REQUEST_BYTES, max_result_digits: int | None = None,
+                 resource_limits=None):
+        """
+        Initializes a new EvaluationServer instance
+        :param host: The address to listen on
+        :param port: The port to listen on (0 picks a free port)
+        :param workers: The number of worker processes (the number of CPUs by default)
+        :param max_queue_size: The number of queued expressions above which requests are rejected with 503
+        :param max_batch_size: The maximum number of expressions sent to a worker at once
+        :param batch_delay: The number of seconds a batch waits for more expressions before it is sent
+        :param max_concurrent_batches: The number of batches evaluated at once (the number of workers by default)
+        :param max_request_bytes: The maximum size of a request body
+        :param max_result_digits: The number of digits past which results are predicted to be too big before they are
+        computed, or None to evaluate without magnitude checks
+        :param resource_limits: A ResourceLimits from calculator_core.resource_limits that every evaluation must stay
+        within, or None
+        :raises ValueError: If both max_result_digits and resource_limits are given
+        """
+        if max_result_digits is not None and resource_limits is not None:
+            raise ValueError("The magnitude checks and the resource limits cannot be combined")
+        self.__host = host
+        self.__port = port
+        self.__workers = workers or os.cpu_count() or 1
+        self.__max_queue_size = max_queue_size
+        self.__max_batch_size = max_batch_size
+        self.__batch_delay = batch_delay
+        self.__max_concurrent_batches = max_concurrent_batches or self.__workers
+        self.__max_request_bytes = max_request_bytes
+        self.__max_result_digits = max_result_digits
+        self.__resource_limits = resource_limits
+
+        self.__server = None
+        self.__executor = None
+        self.__queue = None
+        self.__batcher = None
+        self.__batch_slots = None
+        self.__batches = set()
+        self.__connections = set()
+        self.__idle_connections = set()
+        self.__is_stopping = False
+
+    def get_address(self) -> tuple[str, int]:
+        """
+        Returns the address the server listens on
+        :return: The host and the port of the server
+        """
+        return self.__host, self.__port
+
+    async def start(self):
+        """
+        Starts the worker pool and starts listening for requests
+        """
+        self.__executor = ProcessPoolExecutor(max_workers=self.__workers)
+        self.__queue = asyncio.Queue()
+        self.__batch_slots = asyncio.Semaphore(self.__max_concurrent_batches)
+        self.__batcher = asyncio.create_task(self.__run_batcher())
+        self.__server = await asyncio.start_server(self.__handle_connection, self.__host, self.__port)
+        self.__port = self.__server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """
+        Gracefully stops the server: stops accepting connections, rejects new requests, finishes the queued expressions
+        and the requests in progress, then shuts down the worker pool
+        """
+        self.__is_stopping = True
+        self.__server.close()
+        await self.__queue.join()
+        self.__batcher.cancel()
+        await asyncio.gather(self.__batcher, *self.__batches, return_exceptions=True)
+        for task in self.__idle_connections:
+            task.cancel()
+        await asyncio.gather(*self.__connections, return_exceptions=True)
+        await self.__server.wait_closed()
+        self.__executor.shutdown()
+
+    async def serve_forever(self):
+        """
+        Runs the server until SIGINT or SIGTERM is received, then stops it gracefully
+        """
+        await self.start()
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stop_event.set)
+        try:
+            await stop_event.wait()
+        finally:
+            await self.stop()
+
+    async def evaluate(self, expressions: list[str]) -> list[dict]:
+        """
+        Queues expressions for the next micro-batches and waits for their results
+        :param expressions: The expressions to evaluate
+        :return: The description of every expression, in order
+        :raises HttpError: If the server is stopping, there are more expressions than the queue can ever hold or the
+        queue has no room for the expressions
+        """
+        if self.__is_stopping:
+            raise HttpError(503, "The server is shutting down")
+        if len(expressions) > self.__max_queue_size:
+            raise HttpError(413, f"A request cannot have more than {self.__max_queue_size} expressions")
+        if self.__queue.qsize() + len(expressions) > self.__max_queue_size:
+            raise HttpError(503, "The server is overloaded, try again later")
+
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in expressions]
+        for expression, future in zip(expressions, futures):
+            self.__queue.put_nowait((expression, future))
+        return list(await asyncio.gather(*futures))
+
+    async def __run_batcher(self):
+        """
+        Collects queued expressions into batches of up to max_batch_size, waiting at most batch_delay after the first
+        expression of a batch, and hands every batch to the worker pool
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.__batch_slots.acquire()
+            batch = [await self.__queue.get()]
+            deadline = loop.time() + self.__batch_delay
+            while len(batch) < self.__max_batch_size:
+                if self.__queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.__queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.__queue.get_nowait())
+
+            task = asyncio.create_task(self.__evaluate_batch(batch))
+            self.__batches.add(task)
+            task.add_done_callback(self.__batches.discard)
+
+    async def __evaluate_batch(self, batch: list[tuple[str, asyncio.Future]]):
+        """
+        Evaluates a batch in the worker pool and resolves the futures of its expressions. When a worker dies, the
+        expressions of the batch get the error and the pool is replaced for the next batches
+        :param batch: A list of expressions and the futures waiting for their results
+        """
+        executor = self.__executor
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                executor, describe_expressions, [expression for expression, _ in batch],
+                self.__max_result_digits, self.__resource_limits)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and self.__executor is executor:
+                # A broken pool refuses every later batch, so the other batches of the same pool keep the new one
+                executor.shutdown(wait=False)
+                self.__executor = ProcessPoolExecutor(max_workers=self.__workers)
+            name, message = describe_error(e)
+            results = [{"error": {"type": name, "message": message}, "output": format_error(e)}] * len(batch)
+        finally:
+            self.__batch_slots.release()
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+            self.__queue.task_done()
+
+    async def __handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serves the requests of one connection until the client closes it or asks to close it
+        :param reader: The stream of the request
+        :param writer: The stream of the response
+        """
+        task = asyncio.current_task()
+        self.__connections.add(task)
+        try:
+            keep_alive = True
+            while keep_alive and not self.__is_stopping:
+                self.__idle_connections.add(task)
+                try:
+                    request_line = await reader.readline()
+                finally:
+                    self.__idle_connections.discard(task)
+                if not request_line:
+                    break
+                try:
+                    keep_alive = await self.__handle_request(request_line, reader, writer)
+                except HttpError as e:
+                    keep_alive = False
+                    self.__write_response(writer, e.get_status(), {"error": {"type": "HttpError", "message": str(e)}},
+                                          keep_alive)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self.__connections.discard(task)
+            writer.close()
+
+    async def __handle_request(self, request_line: bytes, reader: asyncio.StreamReader,
+                               writer: asyncio.StreamWriter) -> bool:
+        """
+        Reads one HTTP request and writes its response
+        :param request_line: The first line of the request
+        :param reader: The stream of the request
+        :param writer: The stream of the response
+        :return: True if the connection should be kept open for another request
+        :raises HttpError: If the request is invalid or cannot be served
+        """
+        try:
+            method, path, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, "Invalid request line")
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HttpError(400, "Too many headers")
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > self.__max_request_bytes:
+            raise HttpError(413, "The request body is too large")
+        body = await reader.readexactly(length)
+
+        keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+        if path == '/health':
+            self.__write_response(writer, 200, {"status": "stopping" if self.__is_stopping else "ok"}, keep_alive)
+            return keep_alive
+        if path != '/evaluate':
+            raise HttpError(404, f"Unknown path '{path}'")
+        if method != 'POST':
+            raise HttpError(405, "Use POST to evaluate expressions")
+
+        expressions, is_batch = parse_request_body(body)
+        results = await self.evaluate(expressions)
+        self.__write_response(writer, 200, {"results": results} if is_batch else results[0], keep_alive)
+        return keep_alive
+
+    @staticmethod
+    def __write_response(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool):
+        """
+        Writes a JSON response
+        :param writer: The stream of the response
+        :param status: The HTTP status code
+        :param payload: The JSON-serializable body
+        :param keep_alive: True if the connection is kept open after the response
+        """
+        body = json.dumps(payload).encode('utf-8')
+        headers = [f"HTTP/1.1 {status} {HTTP_REASONS[status]}", "Content-Type: application/json",
+                   f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+
+
+def parse_arguments(arguments: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments of the service
+    :param arguments: The arguments to parse (sys.argv by default)
+    :return: The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Calculator evaluation service")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="the address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="the port to listen on")
+    parser.add_argument('--workers', type=int, help="the number of worker processes")
+    parser.add_argument('--max-queue-size', type=int, default=MAX_QUEUE_SIZE,
+                        help="the number of queued expressions above which requests are rejected")
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE,
+                        help="the maximum number of expressions evaluated in one batch")
+    parser.add_argument('--batch-delay', type=float, default=BATCH_DELAY,
+                        help="the number of seconds a batch waits for more expressions")
+    parser.add_argument('--max-concurrent-batches', type=int, help="the number of batches evaluated at once")
+    parser.add_argument('--max-result-digits', type=int,
+                        help="reject results predicted to have more digits before computing them")
+    parser.add_argument('--max-operations', type=int, help="the maximal number of operations of an expression")
+    parser.add_argument('--max-bit-length', type=int, help="the maximal number of bits of an intermediate integer")
+    parser.add_argument('--timeout', type=float, help="the maximal number of seconds an expression may take")
+    args = parser.parse_args(arguments)
+    if args.max_result_digits is not None and \
+            any(limit is not None for limit in (args.max_operations, args.max_bit_length, args.timeout)):
+        parser.error("--max-result-digits cannot be combined with resource limits")
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    resource_limits = None
+    if args.max_operations is not None or args.max_bit_length is not None or args.timeout is not None:
+        from calculator_core.resource_limits import ResourceLimits
+
+        resource_limits = ResourceLimits(args.max_operations, args.max_bit_length, args.timeout)
+    asyncio.run(EvaluationServer(args.host, args.port, args.workers, args.max_queue_size, args.max_batch_size,
+                                 args.batch_delay, args.max_concurrent_batches,
+                                 max_result_digits=args.max_result_digits,
+                                 resource_limits=resource_limits).serve_forever())
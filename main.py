@@ -1,46 +1,110 @@
-from calculator_core.calculator import evaluate_expression
+import sys
+from itertools import islice
 
-from operators.operator_errors.invalid_use_of_operator_error import InvalidUseOfOperatorError
-from operators.operator_errors.invalid_value_for_operator_error import InvalidValueForOperatorError
-from calculator_core.calculator_errors.invalid_number_format_error import InvalidNumberFormatError
-from calculator_core.calculator_errors.insufficient_operators_error import InsufficientOperatorsError
-from calculator_core.calculator_errors.insufficient_operands_error import InsufficientOperandsError
-from calculator_core.calculator_errors.unknown_character_error import UnknownCharacterError
+from calculator_core.result_formatting import format_expression
 
+OUTPUT_BUFFER_LINES = 1024
 
-def handle_expression(expression: str):
+
+def handle_expression(expression: str, evaluate=None):
     """
     Handles a given expression
     :param expression: The expression to handle
+    :param evaluate: The function that evaluates the expression (evaluate_expression by default)
+    """
+    print(format_expression(expression, evaluate))
+
+
+def read_expressions(stream):
+    """
+    Lazily reads the expressions of a stream, one expression per line
+    :param stream: A text stream to read from
+    :return: A generator of the expressions without their line endings
+    """
+    for line in stream:
+        yield line[:-1] if line.endswith('\n') else line
+
+
+def write_lines(lines, output, buffer_lines: int = OUTPUT_BUFFER_LINES):
+    """
+    Writes lines to an output stream, a buffer of lines at a time
+    :param lines: An iterable of lines without line endings
+    :param output: A text stream to write to
+    :param buffer_lines: The number of lines written at once
+    """
+    lines = iter(lines)
+    buffer = list(islice(lines, buffer_lines))
+    while buffer:
+        buffer.append('')
+        output.write('\n'.join(buffer))
+        buffer = list(islice(lines, buffer_lines))
+
+
+def handle_stream(stream, output, evaluate=None):
+    """
+    Evaluates every expression of a stream and writes the result lines without prompts
+    :param stream: A text stream of expressions, one per line
+    :param output: A text stream to write the results to
+    :param evaluate: The function that evaluates the expressions (evaluate_expression by default)
     """
-    try:
-        res = evaluate_expression(expression)
-        if 'e' in str(float(res)):
-            print(float(res))
-        else:
-            print(res)
-    except (InsufficientOperandsError, InvalidNumberFormatError, UnknownCharacterError, InsufficientOperatorsError,
-            InvalidUseOfOperatorError, InvalidValueForOperatorError) as e:
-        print(f"{e.__class__.__name__}: {e}")
-    except (ValueError, OverflowError) as e:
-        print(f"{e.__class__.__name__}: The result of the expression is too big")
-    except Exception as e:
-        print(f"Unexpected error: {e.__class__.__name__}, {e}")
+    write_lines((format_expression(expression, evaluate) for expression in read_expressions(stream)), output)
+    output.flush()
 
 
-def main():
+def main(evaluate=None):
     """
     Main function that gets and processes the user's input
+    :param evaluate: The function that evaluates the expressions (evaluate_expression by default)
     """
     flag = True
     while flag:
         try:
             expression = input('Enter an expression: ')
-            handle_expression(expression)
+            handle_expression(expression, evaluate)
         except EOFError:
             print("Exiting Calculator...")
             flag = False
 
 
+def parse_arguments(arguments: list[str] | None = None):
+    """
+    Parses the command line arguments
+    :param arguments: The arguments to parse (sys.argv by default)
+    :return: The parsed arguments
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calculator")
+    parser.add_argument('--batch', nargs='?', const='-', metavar='FILE',
+                        help="evaluate the expressions of FILE (or stdin) without prompts, one per line")
+    parser.add_argument('--output', metavar='FILE',
+                        help="with --batch FILE, memory-map FILE and write the results to this file in parallel")
+    parser.add_argument('--workers', type=int, help="the number of worker processes of --output (one per CPU)")
+    parser.add_argument('--cache', metavar='DIRECTORY',
+                        help="keep the results in a cache in DIRECTORY that is shared by the runs of the calculator "
+                             "(not used with --output)")
+    return parser.parse_args(arguments)
+
+
 if __name__ == '__main__':
-    main()
+    # argparse is only imported when there are arguments to parse
+    args = parse_arguments() if len(sys.argv) > 1 else None
+    cache = None
+    if args is not None and args.cache is not None and args.output is None:
+        from calculator_core.persistent_cache import PersistentCache
+
+        cache = PersistentCache(args.cache)
+    evaluate = None if cache is None else cache.evaluate
+    if args is None or args.batch is None:
+        main(evaluate)
+    elif args.batch == '-':
+        handle_stream(sys.stdin, sys.stdout, evaluate)
+    elif args.output is not None:
+        from calculator_core.file_evaluation import evaluate_file
+
+        evaluate_file(args.batch, args.output, args.workers)
+    else:
+        with open(args.batch, encoding='utf-8') as input_file:
+            handle_stream(input_file, sys.stdout, evaluate)
+    if cache is not None:
+        cache.close()
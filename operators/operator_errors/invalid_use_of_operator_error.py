@@ -1,3 +1,6 @@
-class InvalidUseOfOperatorError(Exception):
-    """Exception raised for invalid use of an operator."""
-    pass
+"""
+Kept for backward compatibility, the class is defined in calculator_core.errors
+"""
+from calculator_core.errors import InvalidUseOfOperatorError
+
+__all__ = ["InvalidUseOfOperatorError"]
@@ -1,3 +1,6 @@
-class InvalidValueForOperatorError(Exception):
-    """Exception raised for invalid value for an operator."""
-    pass
+"""
+Kept for backward compatibility, the class is defined in calculator_core.errors
+"""
+from calculator_core.errors import InvalidValueForOperatorError
+
+__all__ = ["InvalidValueForOperatorError"]
@@ -5,6 +5,7 @@ class BasicBinaryOperator(BinaryOperator):
     """
     Represents a basic binary operator
     """
+    __slots__ = ()
 
     def __init__(self, precedence: int, function):
         """
@@ -5,6 +5,7 @@ class LeftUnaryOperator(UnaryOperator):
     """
     Represents a left unary operator
     """
+    __slots__ = ()
 
     def __init__(self, precedence: int, function):
         """
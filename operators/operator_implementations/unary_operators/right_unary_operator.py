@@ -5,6 +5,7 @@ class RightUnaryOperator(UnaryOperator):
     """
     Represents a right unary operator
     """
+    __slots__ = ()
 
     def __init__(self, precedence: int, function):
         """
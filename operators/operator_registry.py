@@ -0,0 +1,227 @@
+"""
+The table of the operators of the calculator.
+OPERATORS and OPERATOR_RECORDS are updated in place, so the modules that imported them (the evaluator and the tokenizer)
+see every registered operator. Functions given as LazyFunction are imported on their first call
+"""
+import importlib
+import threading
+
+from operators.operator_implementations.unary_operators.right_unary_operator import RightUnaryOperator
+from operators.operator_types.binary_operator import BinaryOperator
+from operators.operator_types.operator import Operator
+from operators.operator_types.operator_record import INFIX, POSTFIX, PREFIX, OperatorRecord
+from operators.operator_types.unary_operator import UnaryOperator
+
+DEFAULT_COST_HINT = 1.0
+RESERVED_CHARACTERS = "0123456789.() \t"
+
+OPERATORS = {}
+OPERATOR_RECORDS = {}
+COST_HINTS = {}
+VECTORIZED_IMPLEMENTATIONS = {}
+
+REGISTRY_VERSION = 0
+REGISTRY_LISTENERS = []
+REGISTRY_LOCK = threading.RLock()
+
+
+class LazyFunction(object):
+    """
+    A function that is imported from its module on its first call.
+    Once it is loaded, the operators registered with it get the loaded function, so later lookups call it directly
+    """
+    __slots__ = ('__module_name', '__attribute_name', '__function')
+
+    def __init__(self, module_name: str, attribute_name: str):
+        """
+        Initializes a new LazyFunction instance
+        :param module_name: The name of the module that defines the function
+        :param attribute_name: The name of the function in its module
+        """
+        self.__module_name = module_name
+        self.__attribute_name = attribute_name
+        self.__function = None
+
+    def __call__(self, *args):
+        """
+        Loads the function if needed and calls it
+        :param args: The arguments of the function
+        :return: The result of the function
+        """
+        return self.resolve()(*args)
+
+    def __repr__(self) -> str:
+        return f"LazyFunction('{self.__module_name}', '{self.__attribute_name}')"
+
+    def get_qualified_name(self) -> str:
+        """
+        Returns the name of the function with the name of its module, without importing it
+        :return: The qualified name of the function
+        """
+        return f"{self.__module_name}.{self.__attribute_name}"
+
+    def get_module_name(self) -> str:
+        """
+        Returns the name of the module that defines the function
+        :return: The name of the module
+        """
+        return self.__module_name
+
+    def resolve(self):
+        """
+        Imports the function if it was not imported yet
+        :return: The function
+        """
+        if self.__function is None:
+            function = getattr(importlib.import_module(self.__module_name), self.__attribute_name)
+            self.__function = function
+            replace_lazy_function(self, function)
+        return self.__function
+
+
+def resolve_function(function):
+    """
+    Returns the function behind a possibly lazy function
+    :param function: A function or a LazyFunction
+    :return: The loaded function
+    """
+    return function.resolve() if isinstance(function, LazyFunction) else function
+
+
+def build_operator_record(symbol: str, operator: Operator) -> OperatorRecord:
+    """
+    Builds the metadata record of an operator
+    :param symbol: The symbol of the operator
+    :param operator: The operator
+    :return: The record of the operator
+    """
+    if isinstance(operator, BinaryOperator):
+        return OperatorRecord(symbol, 2, INFIX, operator.get_precedence(), operator.get_function())
+    fixity = POSTFIX if isinstance(operator, RightUnaryOperator) else PREFIX
+    return OperatorRecord(symbol, 1, fixity, operator.get_precedence(), operator.get_function())
+
+
+def build_operator_records(operators: dict[str, Operator]) -> dict[str, OperatorRecord]:
+    """
+    Builds the metadata records of all the operators
+    :param operators: A dictionary of symbols and operators
+    :return: A dictionary of symbols and operator records
+    """
+    return {symbol: build_operator_record(symbol, operator) for symbol, operator in operators.items()}
+
+
+def check_operator_symbol(symbol: str):
+    """
+    Checks that a new symbol can be used by an operator.
+    Only single-character symbols appear in expressions, longer ones are internal names like "unaryMinus" that the
+    evaluator substitutes for a token
+    :param symbol: The symbol of the operator
+    :raises ValueError: If the symbol is empty, or is a digit, a decimal point, a parenthesis, a whitespace or a
+    character of variable names
+    """
+    if not symbol or (len(symbol) == 1 and (symbol in RESERVED_CHARACTERS or symbol.isalnum() or symbol == '_')):
+        raise ValueError(f"'{symbol}' cannot be the symbol of an operator")
+
+
+def register_operator(symbol: str, operator: Operator, vectorized=None, cost_hint: float = DEFAULT_COST_HINT):
+    """
+    Adds an operator, or replaces the operator of an existing symbol.
+    The tokenizer and the precedence rules of the evaluator use the new operator from the next expression on
+    :param symbol: The symbol of the operator in expressions (a single character), or an internal name such as
+    "unaryMinus"
+    :param operator: A BinaryOperator, LeftUnaryOperator or RightUnaryOperator. Its function may be a LazyFunction
+    :param vectorized: An optional NumPy implementation (or LazyFunction) that takes float arrays and returns the result
+    array and the error mask (or None), see operators_vectorized_functions
+    :param cost_hint: The relative cost of one operation, 1 for constant-time arithmetic
+    :raises TypeError: If the operator is not a binary or unary operator
+    :raises ValueError: If the symbol of a new operator cannot be tokenized
+    """
+    if not isinstance(operator, (BinaryOperator, UnaryOperator)):
+        raise TypeError(f"Expected a binary or unary operator, got {operator.__class__.__name__}")
+    with REGISTRY_LOCK:
+        if symbol not in OPERATORS:
+            check_operator_symbol(symbol)
+        OPERATORS[symbol] = operator
+        OPERATOR_RECORDS[symbol] = build_operator_record(symbol, operator)
+        COST_HINTS[symbol] = cost_hint
+        if vectorized is None:
+            VECTORIZED_IMPLEMENTATIONS.pop(symbol, None)
+        else:
+            VECTORIZED_IMPLEMENTATIONS[symbol] = vectorized
+        notify_registry_listeners()
+
+
+def unregister_operator(symbol: str):
+    """
+    Removes an operator
+    :param symbol: The symbol of the operator
+    :raises KeyError: If no operator is registered with the symbol
+    """
+    with REGISTRY_LOCK:
+        del OPERATORS[symbol]
+        del OPERATOR_RECORDS[symbol]
+        COST_HINTS.pop(symbol, None)
+        VECTORIZED_IMPLEMENTATIONS.pop(symbol, None)
+        notify_registry_listeners()
+
+
+def replace_lazy_function(lazy_function: LazyFunction, function):
+    """
+    Replaces a lazy function that was just loaded in the operators and records that use it.
+    The behavior of the operators does not change, so the registry version is kept
+    :param lazy_function: The loaded lazy function
+    :param function: The function it loaded
+    """
+    with REGISTRY_LOCK:
+        for symbol, record in OPERATOR_RECORDS.items():
+            if record.function is lazy_function:
+                OPERATORS[symbol] = OPERATORS[symbol].with_function(function)
+                OPERATOR_RECORDS[symbol] = record._replace(function=function)
+        for symbol, vectorized in VECTORIZED_IMPLEMENTATIONS.items():
+            if vectorized is lazy_function:
+                VECTORIZED_IMPLEMENTATIONS[symbol] = function
+
+
+def get_cost_hint(symbol: str) -> float:
+    """
+    Returns the relative cost of one operation of an operator
+    :param symbol: The symbol of the operator
+    :return: The cost hint given when the operator was registered
+    """
+    return COST_HINTS.get(symbol, DEFAULT_COST_HINT)
+
+
+def get_vectorized_function(symbol: str):
+    """
+    Returns the NumPy implementation of an operator, loading it if needed
+    :param symbol: The symbol of the operator
+    :return: The vectorized function, or None if the operator has none
+    """
+    vectorized = VECTORIZED_IMPLEMENTATIONS.get(symbol)
+    return None if vectorized is None else resolve_function(vectorized)
+
+
+def get_registry_version() -> int:
+    """
+    Returns a number that changes whenever an operator is registered or removed, for caches of evaluation results
+    :return: The version of the operator table
+    """
+    return REGISTRY_VERSION
+
+
+def add_registry_listener(listener):
+    """
+    Adds a function that is called without arguments after every change of the operator table
+    :param listener: The function to call
+    """
+    REGISTRY_LISTENERS.append(listener)
+
+
+def notify_registry_listeners():
+    """
+    Increments the registry version and calls the listeners
+    """
+    global REGISTRY_VERSION
+    REGISTRY_VERSION += 1
+    for listener in REGISTRY_LISTENERS:
+        listener()
@@ -5,6 +5,7 @@ class BinaryOperator(Operator):
     """
     Represents a binary operator
     """
+    __slots__ = ()
 
     def __init__(self, precedence: int, function):
         """
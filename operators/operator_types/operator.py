@@ -1,7 +1,11 @@
+import copy
+
+
 class Operator(object):
     """
     Base class for mathematical operator_types
     """
+    __slots__ = ('__precedence', '__function')
 
     def __init__(self, precedence: int, function):
         """
@@ -24,4 +28,14 @@ class Operator(object):
         Returns the function of the operator
         :return: The function of the operator
         """
-        return self.__function
\ No newline at end of file
+        return self.__function
+
+    def with_function(self, function):
+        """
+        Returns a copy of the operator with another function, keeping the class and every other attribute
+        :param function: A Function that implements the operation of the operator
+        :return: The copy of the operator
+        """
+        operator = copy.copy(self)
+        operator.__function = function
+        return operator
@@ -0,0 +1,13 @@
+from collections import namedtuple
+
+PREFIX = 0
+POSTFIX = 1
+INFIX = 2
+
+
+class OperatorRecord(namedtuple("OperatorRecord", ["symbol", "arity", "fixity", "precedence", "function"])):
+    """
+    Immutable metadata of an operator, precomputed once so the evaluator needs a single lookup per token: its symbol,
+    its number of operands, its fixity (PREFIX, POSTFIX or INFIX), its precedence and its function
+    """
+    __slots__ = ()
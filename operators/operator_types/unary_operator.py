@@ -5,6 +5,7 @@ class UnaryOperator(Operator):
     """
     Base class for unary operator_types
     """
+    __slots__ = ()
 
     def __init__(self, precedence: int, function):
         """
@@ -1,13 +1,40 @@
 from operators.operator_implementations.binary_operators.basic_binary_operator import BasicBinaryOperator
 from operators.operator_implementations.unary_operators.left_unary_operator import LeftUnaryOperator
 from operators.operator_implementations.unary_operators.right_unary_operator import RightUnaryOperator
+from operators.operator_registry import OPERATOR_RECORDS, OPERATORS, LazyFunction, register_operator
 
-from operators.operators_math_functions import *
+MATH_FUNCTIONS = "operators.operators_math_functions"
+VECTORIZED_FUNCTIONS = "operators.operators_vectorized_functions"
 
-OPERATORS = {"unaryMinus": LeftUnaryOperator(1, negate), "+": BasicBinaryOperator(1, add),
-             "-": BasicBinaryOperator(1, subtract), "*": BasicBinaryOperator(2, multiply),
-             "/": BasicBinaryOperator(2, divide), "^": BasicBinaryOperator(3, power),
-             "%": BasicBinaryOperator(4, modulus), "@": BasicBinaryOperator(5, average),
-             "$": BasicBinaryOperator(5, maximum), "&": BasicBinaryOperator(5, minimum),
-             "~": LeftUnaryOperator(6, negate), "!": RightUnaryOperator(6, factorial),
-             "#": RightUnaryOperator(6, sum_of_digits), "numberMinus": LeftUnaryOperator(10, negate)}
+# (symbol, operator class, precedence, function name, vectorized function name, cost hint)
+BUILTIN_OPERATORS = [("unaryMinus", LeftUnaryOperator, 1, "negate", "vector_negate", 1.0),
+                     ("+", BasicBinaryOperator, 1, "add", "vector_add", 1.0),
+                     ("-", BasicBinaryOperator, 1, "subtract", "vector_subtract", 1.0),
+                     ("*", BasicBinaryOperator, 2, "multiply", "vector_multiply", 1.0),
+                     ("/", BasicBinaryOperator, 2, "divide", "vector_divide", 1.0),
+                     ("^", BasicBinaryOperator, 3, "power", "vector_power", 4.0),
+                     ("%", BasicBinaryOperator, 4, "modulus", "vector_modulus", 1.0),
+                     ("@", BasicBinaryOperator, 5, "average", "vector_average", 1.0),
+                     ("$", BasicBinaryOperator, 5, "maximum", "vector_maximum", 1.0),
+                     ("&", BasicBinaryOperator, 5, "minimum", "vector_minimum", 1.0),
+                     ("~", LeftUnaryOperator, 6, "negate", "vector_negate", 1.0),
+                     ("!", RightUnaryOperator, 6, "factorial", "vector_factorial", 16.0),
+                     ("#", RightUnaryOperator, 6, "sum_of_digits", "vector_sum_of_digits", 8.0),
+                     ("numberMinus", LeftUnaryOperator, 10, "negate", "vector_negate", 1.0)]
+
+
+def register_builtin_operators():
+    """
+    Registers the operators of the calculator, with their functions loaded on first use
+    """
+    functions = {}
+    vectorized_functions = {}
+    for symbol, operator_class, precedence, function_name, vectorized_name, cost_hint in BUILTIN_OPERATORS:
+        # Operators that share a function share its LazyFunction, so it is loaded once
+        function = functions.setdefault(function_name, LazyFunction(MATH_FUNCTIONS, function_name))
+        vectorized = vectorized_functions.setdefault(vectorized_name, LazyFunction(VECTORIZED_FUNCTIONS,
+                                                                                   vectorized_name))
+        register_operator(symbol, operator_class(precedence, function), vectorized, cost_hint)
+
+
+register_builtin_operators()
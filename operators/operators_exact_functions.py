@@ -0,0 +1,86 @@
+"""
+Exact versions of the operator functions whose float implementation loses precision, for the Decimal and Fraction
+numeric backends. They live apart from operators_math_functions so the default path does not import decimal and
+fractions
+"""
+import math
+from decimal import Decimal
+from fractions import Fraction
+
+from operators.operators_math_functions import factorial, get_cost_budget, sum_of_integer_digits
+
+
+def exact_power(x: Decimal | Fraction, y: Decimal | Fraction) -> Decimal | Fraction:
+    """
+    Calculates x raised to the power of y without converting the operands to floats when the exponent is an integer
+    :param x: Base
+    :param y: Exponent
+    :return: x raised to the power of y
+    :raises ValueError: If a negative number is raised to a fractional power or if a zero is raised to a negative power
+    or if the result of the operation is too big
+    """
+    if x == 0 and y < 0:
+        raise ValueError("Cannot raise zero to a negative power")
+    try:
+        if y == int(y):
+            if x != 0 and abs(float(y) * math.log10(abs(x))) >= get_cost_budget():
+                raise ValueError("The result of the power operation is too big")
+            return x ** int(y)
+        if x < 0:
+            raise ValueError("Cannot raise a negative number to a fractional power")
+        if isinstance(x, Fraction):
+            return Fraction(math.pow(x, y))
+        return x ** y
+    except (OverflowError, ArithmeticError):
+        raise ValueError("The result of the power operation is too big")
+
+
+def exact_modulus(x: Decimal | Fraction, y: Decimal | Fraction) -> Decimal | Fraction:
+    """
+    Calculates the modulus of two exact numbers
+    :param x: First number
+    :param y: Second number
+    :return: Remainder of x divided by y, with the sign of y like the float modulus
+    :raises ZeroDivisionError: If 'y' is zero
+    """
+    if y == 0:
+        raise ZeroDivisionError("Cannot modulo by zero")
+    return x - y * math.floor(x / y)
+
+
+def exact_factorial(x: Decimal | Fraction) -> int:
+    """
+    Calculates the factorial of an exact number with an integral value
+    :param x: Number to find the factorial of
+    :return: Factorial of x
+    :raises TypeError: If 'x' is not an integer
+    :raises ValueError: If the factorial function raises this exception
+    """
+    if x != int(x):
+        raise TypeError("Factorial is defined only for integers")
+    return factorial(int(x))
+
+
+def exact_sum_of_digits(x: Decimal | Fraction) -> int:
+    """
+    Calculates the sum of the digits of the exact decimal representation of a number
+    :param x: Number to find the sum of digits
+    :return: Sum of the digits of the number
+    :raises ValueError: If 'x' is not positive or if its decimal representation does not terminate
+    """
+    if x <= 0:
+        raise ValueError("'#' operator is defined only for positive values")
+    if isinstance(x, Decimal):
+        return sum(x.as_tuple().digits)
+
+    denominator = x.denominator
+    twos = fives = 0
+    while denominator % 2 == 0:
+        denominator //= 2
+        twos += 1
+    while denominator % 5 == 0:
+        denominator //= 5
+        fives += 1
+    if denominator != 1:
+        raise ValueError("'#' operator is defined only for numbers with a terminating decimal representation")
+    return sum_of_integer_digits(x.numerator * 10 ** max(twos, fives) // x.denominator)
@@ -1,5 +1,10 @@
 import math
 
+MAX_RESULT_DIGITS = 100000
+DIGIT_CHUNK_SIZE = 1000
+LOG10_OF_2 = math.log10(2)
+SMALL_FACTORIALS = tuple(math.factorial(n) for n in range(21))
+
 
 def add(x: int | float, y: int | float) -> int | float:
     """
@@ -122,24 +127,76 @@ def negate(x: int | float) -> int | float:
     return -x
 
 
+def set_cost_budget(max_result_digits: int):
+    """
+    Sets the maximal number of digits that factorial, sum_of_digits and exact powers may produce or process
+    :param max_result_digits: The maximal number of decimal digits
+    """
+    global MAX_RESULT_DIGITS
+    MAX_RESULT_DIGITS = max_result_digits
+
+
+def get_cost_budget() -> int:
+    """
+    Returns the maximal number of digits that factorial, sum_of_digits and exact powers may produce or process
+    :return: The maximal number of decimal digits
+    """
+    return MAX_RESULT_DIGITS
+
+
+def count_integer_digits(x: int) -> int:
+    """
+    Estimates the number of decimal digits of an integer from its bit length, without converting it to a string
+    :param x: The integer
+    :return: The number of digits, possibly too big by one
+    """
+    return int(abs(x).bit_length() * LOG10_OF_2) + 1
+
+
 def factorial(x: int) -> int:
     """
     Calculates the factorial of a number
     :param x: Number to find the factorial of
     :return: Factorial of x
     :raises TypeError: If 'x' is not an integer
-    :raises ValueError: If 'x' is negative
+    :raises ValueError: If 'x' is negative or if the result has more digits than the cost budget allows
     """
     if not isinstance(x, int):
         raise TypeError("Factorial is defined only for integers")
     if x < 0:
         raise ValueError("Factorial is not defined for negative values")
-    if x == 0 or x == 1:
-        return 1
-    result = 1
-    for i in range(2, x + 1):
-        result *= i
-    return result
+    if x < len(SMALL_FACTORIALS):
+        return SMALL_FACTORIALS[x]
+    # x! has more than x digits from here on, so x alone rules out inputs that lgamma cannot take
+    if x > MAX_RESULT_DIGITS or math.lgamma(x + 1) / math.log(10) >= MAX_RESULT_DIGITS:
+        raise ValueError("The result of the factorial operation is too big")
+    return math.factorial(x)
+
+
+def sum_of_integer_digits(x: int) -> int:
+    """
+    Calculates the sum of the digits of a non-negative integer.
+    Big integers are split in halves by powers of ten until every part is short enough to be converted to a string
+    :param x: Number to find the sum of digits
+    :return: Sum of the digits of the number
+    :raises ValueError: If the number has more digits than the cost budget allows
+    """
+    digits = count_integer_digits(x)
+    if digits > MAX_RESULT_DIGITS:
+        raise ValueError("The number is too big for the '#' operator")
+
+    digits_sum = 0
+    pending = [(x, digits)]
+    while pending:
+        part, digits = pending.pop()
+        if digits <= DIGIT_CHUNK_SIZE:
+            digits_sum += sum(map(int, str(part)))
+        else:
+            half = digits // 2
+            high, low = divmod(part, 10 ** half)
+            pending.append((high, digits - half + 1))
+            pending.append((low, half))
+    return digits_sum
 
 
 def sum_of_digits(x: int | float) -> int:
@@ -147,10 +204,12 @@ def sum_of_digits(x: int | float) -> int:
     Calculates the sum of the digits of a number
     :param x: Number to find the sum of digits
     :return: Sum of the digits of the number
-    :raises ValueError: If 'x' is not positive
+    :raises ValueError: If 'x' is not positive or if it has more digits than the cost budget allows
     """
     if x <= 0:
         raise ValueError("'#' operator is defined only for positive values")
+    if isinstance(x, int):
+        return sum_of_integer_digits(x)
     x = float(x)
     x_without_point = str(x).replace('.', '')
     x_without_e = x_without_point.split('e')
@@ -0,0 +1,156 @@
+"""
+NumPy versions of the operator functions.
+Every function takes float arrays and returns a tuple of the result array and a boolean array of the elements for which
+the scalar function raises an error (or None when the operation cannot fail)
+"""
+import math
+
+import numpy as np
+
+from operators.operators_math_functions import sum_of_digits
+
+FLOAT_FACTORIALS = np.array([float(math.factorial(n)) for n in range(171)])
+MAX_EXACT_FLOAT_INTEGER = 2.0 ** 53
+
+
+def vector_add(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, None]:
+    """
+    Adds two arrays
+    :param x: First array
+    :param y: Second array
+    :return: Sum of x and y, and no errors
+    """
+    return x + y, None
+
+
+def vector_subtract(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, None]:
+    """
+    Subtracts two arrays
+    :param x: First array
+    :param y: Second array
+    :return: Difference of x and y, and no errors
+    """
+    return x - y, None
+
+
+def vector_multiply(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, None]:
+    """
+    Multiplies two arrays
+    :param x: First array
+    :param y: Second array
+    :return: Product of x and y, and no errors
+    """
+    return x * y, None
+
+
+def vector_divide(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Divides two arrays
+    :param x: Numerators
+    :param y: Denominators
+    :return: Quotient of x and y, and the elements where 'y' is zero
+    """
+    return x / y, y == 0
+
+
+def vector_power(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Raises the elements of x to the powers of y
+    :param x: Bases
+    :param y: Exponents
+    :return: x raised to the power of y, and the elements where zero is raised to a negative power, a negative number is
+    raised to a fractional power or the result overflows
+    """
+    values = np.power(x, y)
+    errors = ((x == 0) & (y < 0)) | ((x < 0) & (y != np.floor(y))) | (np.isinf(values) & np.isfinite(x) &
+                                                                         np.isfinite(y))
+    return values, errors
+
+
+def vector_modulus(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the modulus of two arrays
+    :param x: First array
+    :param y: Second array
+    :return: Remainder of x divided by y, and the elements where 'y' is zero
+    """
+    return np.mod(x, y), y == 0
+
+
+def vector_average(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, None]:
+    """
+    Calculates the average of two arrays
+    :param x: First array
+    :param y: Second array
+    :return: Average of x and y, and no errors
+    """
+    return (x + y) / 2, None
+
+
+def vector_maximum(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, None]:
+    """
+    Finds the maximum of two arrays
+    :param x: First array
+    :param y: Second array
+    :return: Maximum of x and y, and no errors
+    """
+    return np.where(x > y, x, y), None
+
+
+def vector_minimum(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, None]:
+    """
+    Finds the minimum of two arrays
+    :param x: First array
+    :param y: Second array
+    :return: Minimum of x and y, and no errors
+    """
+    return np.where(x < y, x, y), None
+
+
+def vector_negate(x: np.ndarray) -> tuple[np.ndarray, None]:
+    """
+    Negates an array
+    :param x: Array to be negated
+    :return: Negative of x, and no errors
+    """
+    return -x, None
+
+
+def vector_factorial(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the factorials of an array
+    :param x: Array to find the factorials of
+    :return: Factorials of x, and the elements that are negative, not integers, or too big for a float factorial
+    """
+    errors = (x < 0) | (x != np.floor(x)) | (x >= len(FLOAT_FACTORIALS))
+    return FLOAT_FACTORIALS[np.where(errors, 0, x).astype(np.intp)], errors
+
+
+def vector_sum_of_digits(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the sums of the digits of an array.
+    Integers are summed with array operations and fractions use the scalar function. Elements of 2 ** 53 or more are
+    errors: the float may be the rounded value of an exact integer of the scalar path, whose digits differ
+    :param x: Array to find the sums of digits of
+    :return: Sums of the digits of x, and the elements that are not positive, not below 2 ** 53 or too big for the
+    scalar function
+    """
+    shape = np.shape(x)
+    x = np.atleast_1d(x)
+    errors = ~(x > 0) | ~(x < MAX_EXACT_FLOAT_INTEGER)
+    exact = ~errors & (x == np.floor(x))
+
+    remaining = np.where(exact, x, 0)
+    values = np.zeros(x.shape)
+    while np.any(remaining):
+        values += np.mod(remaining, 10)
+        remaining = np.floor_divide(remaining, 10)
+
+    for index in np.flatnonzero(~errors & ~exact):
+        item = x.flat[index]
+        try:
+            values.flat[index] = sum_of_digits(float(item))
+        except ValueError:
+            errors.flat[index] = True
+    return values.reshape(shape), errors.reshape(shape)
+
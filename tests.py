@@ -1,20 +1,116 @@
+import asyncio
+import http.client
+import io
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+from decimal import Decimal
+from fractions import Fraction
+
 import pytest
-from calculator_core.calculator import evaluate_expression  # Adjust the import based on your module structure
+from calculator_core.array_evaluation import evaluate_with_arrays
+from calculator_core.calculator import (evaluate_expression, execute_operation, get_expression_limits,
+                                        set_expression_limits)
+from calculator_core.compiled_expression import compile_expression
+from benchmarks.import_time_benchmark import find_lazy_modules, run_importtime
+from benchmarks.benchmark_suite import compare_results, generate_workloads
+from calculator_core.batch_evaluation import evaluate_many
+from calculator_core.evaluation_result import (INSUFFICIENT_OPERATORS, INVALID_NUMBER_FORMAT, INVALID_USE_MESSAGE,
+                                               INVALID_VALUE_FOR_OPERATOR, MESSAGES, SUCCESS, UNKNOWN_CHARACTER,
+                                               EvaluationResult, try_evaluate)
+from calculator_core.evaluator import Evaluator, get_evaluator
+from calculator_core.expression_bundle import ExpressionBundle, evaluate_bundle
+from calculator_core.expression_cache import ExpressionCache
+from calculator_core import file_evaluation
+from calculator_core.expression_tree import ConstantNode, optimize_tree, parse_expression_tree
+from calculator_core.incremental_evaluation import IncrementalEvaluator
+from calculator_core.instrumentation import disable_instrumentation, enable_instrumentation
+from calculator_core.magnitude_estimation import estimate_tree, evaluate_with_magnitude_checks
+from calculator_core.lexer import LEFT_PARENTHESIS, NUMBER, OPERATOR, RIGHT_PARENTHESIS, WHITESPACE, Token, tokenize
+from calculator_core.numeric_backends import DecimalBackend, FloatBackend, FractionBackend
+from calculator_core.persistent_cache import PersistentCache
+from calculator_core.resource_limits import HardTimeoutEvaluator, disable_resource_limits, enable_resource_limits
+from calculator_core.result_formatting import format_expression
+from calculator_core.vectorized_evaluation import evaluate_vectorized
+from calculator_core.calculator_errors.expression_too_complex_error import ExpressionTooComplexError
 from calculator_core.calculator_errors.invalid_number_format_error import InvalidNumberFormatError
 from calculator_core.calculator_errors.insufficient_operators_error import InsufficientOperatorsError
 from calculator_core.calculator_errors.insufficient_operands_error import InsufficientOperandsError
 from calculator_core.calculator_errors.unknown_character_error import UnknownCharacterError
+from calculator_core.calculator_errors.unknown_variable_error import UnknownVariableError
+from calculator_core.errors import ResourceLimitExceededError
+from calculator_service.evaluation_server import EvaluationServer, describe_expressions
 
+from main import handle_expression, handle_stream
 from operators.operator_errors.invalid_use_of_operator_error import InvalidUseOfOperatorError
+from operators.operator_errors.invalid_value_for_operator_error import InvalidValueForOperatorError
+from operators.operator_implementations.binary_operators.basic_binary_operator import BasicBinaryOperator
+from operators.operator_implementations.unary_operators.right_unary_operator import RightUnaryOperator
+from operators.operator_registry import (OPERATOR_RECORDS, OPERATORS, LazyFunction, get_cost_hint, register_operator,
+                                         unregister_operator)
+from operators.operators_math_functions import factorial, get_cost_budget, set_cost_budget, sum_of_digits
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
-@pytest.mark.parametrize("expression, exception", [
+SYNTAX_ERRORS = [
     ("2*^3", InsufficientOperandsError),
     ("!3", InvalidUseOfOperatorError),
     ("5/)", InsufficientOperandsError),
     ("(4+5", InsufficientOperatorsError),
     ("$2+3", InsufficientOperandsError)
-])
+]
+
+SIMPLE_EQUATIONS = [
+    ("3^2", 9),
+    ("1+2", 3),
+    ("6-4", 2),
+    ("~(4/-2)", 2),
+    ("--2*3", 6),
+    ("9/5*10", 18),
+    ("-5^-2", -0.04),
+    ("3@5*3", 12),
+    ("6.*1", 6),
+    (".2^2", 0.04),
+    ("~(~3)", 3),
+    ("18/(2+1)", 6),
+    ("(2+3)&(4-1)", 3),
+    ("4*(2^3)", 32),
+    ("(2^2)$2", 4),
+]
+
+COMPLEX_EQUATIONS = [
+    ("(1 +2)! + (3@4)^2 - 5", 13.25),
+    ("3^2 % 5 + (2+3) @ 2", 12.5),
+    ("-(4 + 3^2) +  (2--1)!", -7),
+    ("5! + 123# - (2^3 + 12)", 106),
+    ("(2^   3 + 12) % 7 * 3 - 2/4", 17.5),
+    ("-(3  @ 20) $ 20 - 3^5 % 3", -29),
+    ("2 @ 3 @ 4 + 3*(2^2)! / 6", 15.25),
+    ("(100)!/99! - - - 2! &    2 * -1.3", 102.6),
+    ("(5+4*3) # & -4^(2*2) - 2", 254),
+    ("~--6 $ (2+3) + (4+1) % 2^3", 6),
+    ("(1+2^3)   # * (3*(2^2)! / 6)", 108),
+    ("20 - 3^ 9 % 2 + 4*(3 + 5^2) - 2*3", 123),
+    ("(3   /  (50. #!/1$500)    #/ 7) & 0.8", 0.0714285714),
+    ("((3+~- - 3 %2 ---5)*-2 +  10)#", 3),
+    ("   ~5  $ 4.5 @   3!!# +2 / 2 ", 7.75),
+    ("10. / 2 / 9 + ~12 / .1", -119.4444444444),
+    ("~(((44*2)# -16 ) /  25  ) +3#!", 6),
+    ("(5)-(- 1  ) & 6.5/ 2 / 1! ! !", 5.5),
+]
+
+
+@pytest.mark.parametrize("expression, exception", SYNTAX_ERRORS)
 def test_syntax_error(expression: str,
                       exception: InsufficientOperandsError | InsufficientOperatorsError | InvalidUseOfOperatorError):
     """
@@ -50,23 +146,7 @@ def test_whitespace_string():
         evaluate_expression("   \t  ")
 
 
-@pytest.mark.parametrize("expression, expected_result", [
-    ("3^2", 9),
-    ("1+2", 3),
-    ("6-4", 2),
-    ("~(4/-2)", 2),
-    ("--2*3", 6),
-    ("9/5*10", 18),
-    ("-5^-2", -0.04),
-    ("3@5*3", 12),
-    ("6.*1", 6),
-    (".2^2", 0.04),
-    ("~(~3)", 3),
-    ("18/(2+1)", 6),
-    ("(2+3)&(4-1)", 3),
-    ("4*(2^3)", 32),
-    ("(2^2)$2", 4),
-])
+@pytest.mark.parametrize("expression, expected_result", SIMPLE_EQUATIONS)
 def test_simple_equations(expression: str, expected_result: int | float):
     """
     Test simple expressions
@@ -76,26 +156,7 @@ def test_simple_equations(expression: str, expected_result: int | float):
     assert evaluate_expression(expression) == expected_result
 
 
-@pytest.mark.parametrize("expression, expected_result", [
-    ("(1 +2)! + (3@4)^2 - 5", 13.25),
-    ("3^2 % 5 + (2+3) @ 2", 12.5),
-    ("-(4 + 3^2) +  (2--1)!", -7),
-    ("5! + 123# - (2^3 + 12)", 106),
-    ("(2^   3 + 12) % 7 * 3 - 2/4", 17.5),
-    ("-(3  @ 20) $ 20 - 3^5 % 3", -29),
-    ("2 @ 3 @ 4 + 3*(2^2)! / 6", 15.25),
-    ("(100)!/99! - - - 2! &    2 * -1.3", 102.6),
-    ("(5+4*3) # & -4^(2*2) - 2", 254),
-    ("~--6 $ (2+3) + (4+1) % 2^3", 6),
-    ("(1+2^3)   # * (3*(2^2)! / 6)", 108),
-    ("20 - 3^ 9 % 2 + 4*(3 + 5^2) - 2*3", 123),
-    ("(3   /  (50. #!/1$500)    #/ 7) & 0.8", 0.0714285714),
-    ("((3+~- - 3 %2 ---5)*-2 +  10)#", 3),
-    ("   ~5  $ 4.5 @   3!!# +2 / 2 ", 7.75),
-    ("10. / 2 / 9 + ~12 / .1", -119.4444444444),
-    ("~(((44*2)# -16 ) /  25  ) +3#!", 6),
-    ("(5)-(- 1  ) & 6.5/ 2 / 1! ! !", 5.5),
-])
+@pytest.mark.parametrize("expression, expected_result", COMPLEX_EQUATIONS)
 def test_complex_valid_equations(expression: str, expected_result: int | float):
     """
     Test complex expressions
@@ -103,3 +164,974 @@ def test_complex_valid_equations(expression: str, expected_result: int | float):
     :param expected_result: The expected result for the expression
     """
     assert evaluate_expression(expression) == expected_result
+
+
+@pytest.mark.parametrize("expression, expected_result", SIMPLE_EQUATIONS + COMPLEX_EQUATIONS)
+def test_compiled_expression(expression: str, expected_result: int | float):
+    """
+    Test that a compiled expression gives the same result on every evaluation
+    :param expression: The expression to compile
+    :param expected_result: The expected result for the expression
+    """
+    compiled = compile_expression(expression)
+    assert compiled.evaluate() == expected_result
+    assert compiled.evaluate() == expected_result
+
+
+@pytest.mark.parametrize("expression, exception", SYNTAX_ERRORS + [("gddasrewgf", UnknownCharacterError),
+                                                                   ("1..2", InvalidNumberFormatError),
+                                                                   ("", InsufficientOperandsError)])
+def test_compile_time_errors(expression: str, exception: type[Exception]):
+    """
+    Test that invalid expressions are rejected when they are compiled
+    :param expression: The expression to compile
+    :param exception: Expected exception type for the invalid expression
+    """
+    with pytest.raises(exception):
+        compile_expression(expression)
+
+
+@pytest.mark.parametrize("expression, exception", SYNTAX_ERRORS + [("gddasrewgf", UnknownCharacterError),
+                                                                   ("1..2", InvalidNumberFormatError),
+                                                                   ("", InsufficientOperandsError),
+                                                                   ("5/(3-3)", InvalidValueForOperatorError)])
+def test_try_evaluate_errors(expression: str, exception: type[Exception]):
+    """
+    Test that the non-raising API reports the error that evaluate_expression raises, with the same message
+    :param expression: The invalid expression
+    :param exception: Expected exception type for the invalid expression
+    """
+    result = try_evaluate(expression)
+    assert not result.is_success() and result.get_value() is None
+    assert result.get_error_name() == exception.__name__
+    with pytest.raises(exception) as expected:
+        evaluate_expression(expression)
+    assert result.get_message() == str(expected.value)
+    with pytest.raises(exception, match=re.escape(str(expected.value))):
+        result.unwrap()
+
+
+def test_try_evaluate():
+    """
+    Test the values, error codes and error offsets of the non-raising API
+    """
+    for expression, expected_result in SIMPLE_EQUATIONS + COMPLEX_EQUATIONS:
+        result = try_evaluate(expression)
+        assert result.is_success() and result.get_error_code() == SUCCESS and result.get_offset() == -1
+        assert result.get_value() == expected_result
+    for expression, code, offset in [("2 + a", UNKNOWN_CHARACTER, 4), ("3 * 1..2", INVALID_NUMBER_FORMAT, 4),
+                                     ("(4+5", INSUFFICIENT_OPERATORS, 0), ("1 2", INSUFFICIENT_OPERATORS, 2),
+                                     ("4/0 + 1", INVALID_VALUE_FOR_OPERATOR, 1), ("2 * (1 - 3!!)", 0, -1),
+                                     ("1 + (2 * 3 / 0)", INVALID_VALUE_FOR_OPERATOR, 11)]:
+        result = try_evaluate(expression)
+        assert (result.get_error_code(), result.get_offset()) == (code, offset)
+
+
+def test_try_evaluate_messages():
+    """
+    Test that every message template of the non-raising API is the message that evaluate_expression raises
+    """
+    limits = get_expression_limits()
+    set_expression_limits(30, 3)
+    try:
+        message_ids = set()
+        for expression in ["", "1 +", "1 2", "(1", "1 + .", "1..2", "2 $ ?", "1+" * 20, "((((1))))", "()", "!",
+                           "~ * 2", "!3", "3 ~", "1 / 0"]:
+            result = try_evaluate(expression)
+            message_ids.add(result.get_message_id())
+            assert evaluate_outcome(lambda _: result.unwrap(), expression) == \
+                   evaluate_outcome(evaluate_expression, expression), expression
+        # A postfix operator always follows an operand in a valid position, so only its execution finds none
+        with pytest.raises(InvalidUseOfOperatorError) as expected:
+            execute_operation([], ["!"])
+        assert EvaluationResult(None, INVALID_USE_MESSAGE, "!").get_message() == str(expected.value)
+        message_ids.add(INVALID_USE_MESSAGE)
+
+        # The installed hooks apply to the non-raising API as well
+        instrumentation = enable_instrumentation()
+        enable_resource_limits(max_operations=2)
+        try:
+            for expression in ["1+2+3+4+5", "1+2", "1 +"]:
+                result = try_evaluate(expression)
+                message_ids.add(result.get_message_id())
+                assert evaluate_outcome(lambda _: result.unwrap(), expression) == \
+                       evaluate_outcome(evaluate_expression, expression), expression
+            assert try_evaluate("1+2+3+4+5").get_error_name() == "ResourceLimitExceededError"
+        finally:
+            disable_resource_limits()
+            disable_instrumentation()
+        assert instrumentation.snapshot()["evaluations"] == 7
+        assert message_ids == set(range(len(MESSAGES)))
+    finally:
+        set_expression_limits(*limits)
+
+
+def test_compiled_expression_invalid_value():
+    """
+    Test that invalid values for operators are reported when the compiled expression is evaluated
+    """
+    compiled = compile_expression("5/(3-3)")
+    with pytest.raises(InvalidValueForOperatorError):
+        compiled.evaluate()
+
+
+def test_expression_bundle():
+    """
+    Test that a bundle evaluates shared sub-expressions once and gives the results and errors of evaluate_expression
+    """
+    expressions = ["(12!#) + (2^30 @ 7)", "(2^30 @ 7) * 2 - (12!#)", "-(12!#)", "(12!#)", "1/(3-3) + (", "4 +",
+                   "(5/0) $ (2^30 @ 7)", "3 - -2^2"]
+    bundle = ExpressionBundle(expressions)
+    results = bundle.evaluate()
+    for expression, result in zip(expressions, results):
+        try:
+            assert result == evaluate_expression(expression)
+        except Exception as e:
+            assert type(result) is type(e) and str(result) == str(e)
+    statistics = bundle.get_statistics()
+    assert statistics["expressions"] == len(bundle) == len(expressions)
+    assert statistics["saved_evaluations"] == statistics["operations"] - statistics["evaluations"] >= 8
+    assert evaluate_bundle(["1+2", "(1+2)*(1+2)"]) == ([3, 9], 2)
+
+
+def test_expression_cache_statistics():
+    """
+    Test that the expression cache counts hits, misses and evictions
+    """
+    cache = ExpressionCache(max_size=2)
+    assert cache.evaluate("1+2") == 3
+    assert cache.evaluate(" \t1+2 ") == 3
+    assert cache.evaluate("2*3") == 6
+    assert cache.evaluate("5!") == 120
+    assert cache.get_statistics() == {"hits": 1, "misses": 3, "evictions": 1, "size": 2, "max_size": 2}
+
+
+def test_expression_cache_errors():
+    """
+    Test that the expression cache re-raises the cached exception type
+    """
+    cache = ExpressionCache()
+    for _ in range(2):
+        with pytest.raises(UnknownCharacterError):
+            cache.evaluate("2+a")
+    assert cache.get_statistics()["hits"] == 1
+
+
+def test_expression_cache_ttl():
+    """
+    Test that expired entries are evaluated again
+    """
+    cache = ExpressionCache(ttl=0)
+    cache.evaluate("1+2")
+    cache.evaluate("1+2")
+    assert cache.get_statistics()["misses"] == 2
+
+
+def test_expression_cache_limits():
+    """
+    Test that the expression cache is bypassed under resource limits and dropped when the cost budget changes
+    """
+    cache = ExpressionCache()
+    enable_resource_limits(max_operations=2)
+    try:
+        for _ in range(2):
+            with pytest.raises(ResourceLimitExceededError):
+                cache.evaluate("1+2+3+4")
+    finally:
+        disable_resource_limits()
+    assert cache.evaluate("1+2+3+4") == 10
+    assert cache.get_statistics() == {"hits": 0, "misses": 1, "evictions": 0, "size": 1, "max_size": 4096}
+
+    budget = get_cost_budget()
+    set_cost_budget(2)
+    try:
+        with pytest.raises(InvalidValueForOperatorError):
+            cache.evaluate("30!")
+    finally:
+        set_cost_budget(budget)
+    assert cache.evaluate("30!") == math.factorial(30)
+    assert cache.get_statistics()["misses"] == 3
+
+
+@pytest.mark.parametrize("expression, expected_output", [
+    ("1+2", "3"),
+    ("10^20", "1e+20"),
+    ("5/2", "2.5"),
+    ("200!", "OverflowError: The result of the expression is too big"),
+    ("2+a", "UnknownCharacterError: Invalid character encountered: a"),
+    ("5/0", "InvalidValueForOperatorError: Cannot divide by zero"),
+])
+def test_format_expression(expression: str, expected_output: str):
+    """
+    Test the line printed for the result or error of an expression
+    :param expression: The expression to evaluate
+    :param expected_output: The expected line
+    """
+    assert format_expression(expression) == expected_output
+
+
+def test_evaluate_many():
+    """
+    Test that batch evaluation keeps the input order, in process and across a process pool
+    """
+    expressions = [f"{index}*2" if index % 3 else "2+a" for index in range(3000)]
+    expected = [format_expression(expression) for expression in expressions]
+    assert evaluate_many(expressions[:10]) == expected[:10]
+    assert evaluate_many(expressions, workers=2, chunksize=500) == expected
+
+
+def test_handle_stream(capsys: pytest.CaptureFixture):
+    """
+    Test that batch mode prints the same lines as the interactive mode, without prompts
+    :param capsys: Captures the lines printed by handle_expression
+    """
+    expressions = ["1+2", "200!", "2+a", "", "3 @ 4"]
+    for expression in expressions:
+        handle_expression(expression)
+    output = io.StringIO()
+    handle_stream(io.StringIO("\n".join(expressions)), output)
+    assert output.getvalue() == capsys.readouterr().out
+
+
+def test_evaluate_file(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    """
+    Test that memory-mapped file evaluation writes the lines of batch mode in input order, with or without workers
+    :param tmp_path: A temporary directory for the input and output files
+    :param monkeypatch: Lowers the size of the files that are evaluated in parallel
+    """
+    expressions = [f"{index} * 3 - 2^2" if index % 4 else "(2+a" for index in range(2000)]
+    expressions += ["", "200!", "3 @ 4 $ ~-2", "1\t+ 2", "٣+1", "2²", "5/0", "7 \x00", "2.5.1+1", "4##"]
+    input_path = tmp_path / "expressions.txt"
+    input_path.write_bytes("\r\n".join(expressions[:5]).encode() + b"\r\n" + "\n".join(expressions[5:]).encode())
+    expected = io.StringIO()
+    with open(input_path, encoding='utf-8') as input_file:
+        handle_stream(input_file, expected)
+
+    output_path = tmp_path / "results.txt"
+    assert file_evaluation.evaluate_file(str(input_path), str(output_path), workers=1) == 1
+    assert output_path.read_text(encoding='utf-8') == expected.getvalue()
+    monkeypatch.setattr(file_evaluation, "MIN_PARALLEL_FILE_SIZE", 0)
+    assert file_evaluation.evaluate_file(str(input_path), str(output_path), workers=2, chunk_size=1000) > 2
+    assert output_path.read_text(encoding='utf-8') == expected.getvalue()
+
+    # The installed hooks apply to the lines of a file as well
+    input_path.write_bytes(b"1+2\n1+2+3+4+5\n")
+    enable_resource_limits(max_operations=2)
+    try:
+        file_evaluation.evaluate_file(str(input_path), str(output_path), workers=1)
+        assert output_path.read_text(encoding='utf-8').splitlines() == \
+               [format_expression("1+2"), format_expression("1+2+3+4+5")]
+        assert output_path.read_text(encoding='utf-8').splitlines()[1].startswith("ResourceLimitExceededError")
+    finally:
+        disable_resource_limits()
+
+    input_path.write_bytes(b"")
+    assert file_evaluation.evaluate_file(str(input_path), str(output_path)) == 0
+    assert output_path.read_bytes() == b""
+
+
+def test_tokenize():
+    """
+    Test that the lexer yields typed tokens with their offsets
+    """
+    assert list(tokenize("(12.5+ 3)!")) == [Token(LEFT_PARENTHESIS, "(", 0), Token(NUMBER, "12.5", 1),
+                                            Token(OPERATOR, "+", 5), Token(WHITESPACE, " ", 6),
+                                            Token(NUMBER, "3", 7), Token(RIGHT_PARENTHESIS, ")", 8),
+                                            Token(OPERATOR, "!", 9)]
+
+
+@pytest.mark.parametrize("expression, message", [
+    (".", "A decimal point must be followed or preceded by a digit"),
+    ("..5", "A decimal point must be followed or preceded by a digit"),
+    ("1.2.3", "A number cannot contain more than one decimal point"),
+    ("5..+1", "A number cannot contain more than one decimal point"),
+])
+def test_number_format_errors(expression: str, message: str):
+    """
+    Test the messages of invalid numbers
+    :param expression: The expression to evaluate
+    :param message: The expected message
+    """
+    with pytest.raises(InvalidNumberFormatError, match=message):
+        evaluate_expression(expression)
+
+
+@pytest.mark.parametrize("expression, expected_result", SIMPLE_EQUATIONS + COMPLEX_EQUATIONS)
+def test_float_backend(expression: str, expected_result: int | float):
+    """
+    Test that the float backend matches the default evaluation
+    :param expression: The expression to evaluate
+    :param expected_result: The expected result for the expression
+    """
+    assert evaluate_expression(expression, FloatBackend()) == expected_result
+
+
+@pytest.mark.parametrize("expression, expected_result", [
+    ("0.1 + 0.2", Fraction(3, 10)),
+    ("1/3 + 1/6", Fraction(1, 2)),
+    ("2^100", Fraction(2 ** 100)),
+    ("~7 % 3", Fraction(2)),
+    ("(1/8)#", 8),
+    ("30!/28!", Fraction(870)),
+])
+def test_fraction_backend(expression: str, expected_result: Fraction):
+    """
+    Test exact rational evaluation
+    :param expression: The expression to evaluate
+    :param expected_result: The expected exact result
+    """
+    assert evaluate_expression(expression, FractionBackend()) == expected_result
+
+
+def test_decimal_backend():
+    """
+    Test decimal evaluation with a configurable precision
+    """
+    assert evaluate_expression("0.1 + 0.2", DecimalBackend()) == Decimal("0.3")
+    assert evaluate_expression("1/3", DecimalBackend(precision=5)) == Decimal("0.33333")
+    assert evaluate_expression("2^0.5", DecimalBackend(precision=6)) == Decimal("1.41421")
+    with pytest.raises(InvalidValueForOperatorError):
+        evaluate_expression("5 % 0", DecimalBackend())
+    with pytest.raises(InvalidValueForOperatorError):
+        evaluate_expression("(1/3)#", FractionBackend())
+
+
+@pytest.mark.parametrize("number, expected_result", [
+    (0, 1),
+    (20, 2432902008176640000),
+    (30, 265252859812191058636308480000000),
+])
+def test_factorial(number: int, expected_result: int):
+    """
+    Test the factorial table and the fast factorial
+    :param number: Number to find the factorial of
+    :param expected_result: The expected factorial
+    """
+    assert factorial(number) == expected_result
+
+
+def test_sum_of_digits_of_big_integers():
+    """
+    Test that the digits of big integers are summed exactly
+    """
+    assert sum_of_digits(10 ** 20 + 1) == 2
+    assert sum_of_digits(123456789 * ((10 ** 9000 - 1) // (10 ** 9 - 1))) == 45 * 1000
+    assert sum_of_digits(12.5) == 8
+
+
+def test_cost_budget():
+    """
+    Test that inputs over the cost budget are rejected before they are computed
+    """
+    budget = get_cost_budget()
+    try:
+        set_cost_budget(100)
+        assert evaluate_expression("69!#") == 351
+        with pytest.raises(InvalidValueForOperatorError):
+            evaluate_expression("70!")
+        with pytest.raises(InvalidValueForOperatorError):
+            evaluate_expression("99999999999999999999!")
+    finally:
+        set_cost_budget(budget)
+
+
+def test_compiled_expression_variables():
+    """
+    Test that compiled expressions bind their variables when they are evaluated
+    """
+    compiled = compile_expression("rate * (x + 1)! - ~x", allow_names=True)
+    assert compiled.get_variables() == ("rate", "x")
+    assert compiled.evaluate(rate=2, x=2) == 14
+    assert compiled.evaluate(rate=0.5, x=3) == 15
+    with pytest.raises(UnknownVariableError):
+        compiled.evaluate(x=1)
+    with pytest.raises(InsufficientOperatorsError):
+        compile_expression("2 x", allow_names=True)
+    with pytest.raises(UnknownCharacterError):
+        compile_expression("2 * x")
+
+
+@pytest.mark.parametrize("expression, expected_result", SIMPLE_EQUATIONS + COMPLEX_EQUATIONS)
+def test_optimized_expression(expression: str, expected_result: int | float):
+    """
+    Test that optimized compiled expressions keep the results of the original expressions
+    """
+    assert compile_expression(expression, optimize=True).evaluate() == evaluate_expression(expression)
+
+
+@pytest.mark.parametrize("expression, expected_result", SIMPLE_EQUATIONS + COMPLEX_EQUATIONS)
+def test_array_evaluation(expression: str, expected_result: int | float):
+    """
+    Test that the array-backed engine gives the results of evaluate_expression
+    """
+    assert evaluate_with_arrays(expression) == expected_result
+
+
+def test_array_evaluation_operands_and_errors():
+    """
+    Test that the array-backed engine keeps big integers and integer types, and raises the errors of evaluate_expression
+    """
+    for expression in ["30! - 30! + 1", "25! / 5", "2^53 + 1", "2^60 * 0.5", "3.5 + 1.5", "(1+2)*3", "-2^3", "7"]:
+        result = evaluate_with_arrays(expression)
+        assert result == evaluate_expression(expression) and type(result) is type(evaluate_expression(expression))
+    assert evaluate_with_arrays("30!") == math.factorial(30)
+    for expression in ["", "(", "()", "1 2", "2!3", "~", "5!!!!", "1+", "(1+2", "1+2)", "5/0", "!", "3 ~4", "2 $ a"]:
+        with pytest.raises(Exception) as expected:
+            evaluate_expression(expression)
+        with pytest.raises(expected.type, match=re.escape(str(expected.value))):
+            evaluate_with_arrays(expression)
+
+
+def test_optimize_tree():
+    """
+    Test constant folding and algebraic simplification of expression trees
+    """
+    root = optimize_tree(parse_expression_tree("(3!+4)*(2^10)"))
+    assert isinstance(root, ConstantNode) and root.get_value() == 10240
+    for expression in ["--(x+1)", "(x+1)*1", "0+(x+1)", "(x+1)-0", "(x+1)$(x+1)"]:
+        compiled = compile_expression(expression, allow_names=True, optimize=True)
+        assert len(compiled.get_program()) == 3
+        assert compiled.evaluate(x=1.5) == 2.5
+    assert len(compile_expression("x*1", allow_names=True, optimize=True).get_program()) == 3
+    with pytest.raises(InvalidValueForOperatorError):
+        compile_expression("5/0+x", allow_names=True, optimize=True).evaluate(x=1)
+
+
+def test_evaluate_vectorized():
+    """
+    Test vectorized evaluation against the scalar path, including the error mask
+    """
+    numpy = pytest.importorskip("numpy")
+    x = numpy.array([1, 2, 3, 4.5, 0])
+    y = numpy.array([2, 0, -1, 2, 3])
+    result = evaluate_vectorized("(x! + x # ) / y @ 1", x=x, y=y)
+    for index in range(len(x)):
+        expression = f"({x[index]}! + {x[index]} # ) / ({y[index]}) @ 1".replace("-", "~")
+        try:
+            expected = evaluate_expression(expression)
+        except InvalidValueForOperatorError:
+            assert result.errors[index] and numpy.isnan(result.values[index])
+        else:
+            assert not result.errors[index] and result.values[index] == pytest.approx(expected)
+
+    # The floats of big factorials are rounded, so their digits are not summed
+    result = evaluate_vectorized("x!#", x=numpy.arange(15, 30))
+    for index, value in enumerate(range(15, 30)):
+        if not result.errors[index]:
+            assert result.values[index] == evaluate_expression(f"{value}!#")
+    assert result.errors[-1]
+
+
+def post_json(address: tuple[str, int], payload) -> tuple[int, dict]:
+    """
+    Sends a JSON request to the evaluation server over loopback
+    :param address: The host and the port of the server
+    :param payload: The JSON-serializable body
+    :return: The status code and the JSON body of the response
+    """
+    connection = http.client.HTTPConnection(*address, timeout=10)
+    try:
+        connection.request("POST", "/evaluate", json.dumps(payload), {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def post_with_length(address: tuple[str, int], length: str) -> int:
+    """
+    Sends a request with the given Content-Length header and no body to the evaluation server over loopback
+    :param address: The host and the port of the server
+    :param length: The value of the Content-Length header
+    :return: The status code of the response
+    """
+    connection = http.client.HTTPConnection(*address, timeout=10)
+    try:
+        connection.putrequest("POST", "/evaluate")
+        connection.putheader("Content-Length", length)
+        connection.endheaders()
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def test_magnitude_estimation():
+    """
+    Test that results predicted to be too big are rejected before they are computed, and that other results are kept
+    """
+    for expression, _ in SIMPLE_EQUATIONS + COMPLEX_EQUATIONS:
+        assert evaluate_with_magnitude_checks(expression) == evaluate_expression(expression)
+    low, high, _ = estimate_tree(parse_expression_tree("(2^10 + 3) * 7! - 1"))
+    assert low <= math.log10((2 ** 10 + 3) * 5040 - 1) <= high
+    with pytest.raises(InvalidValueForOperatorError, match="multiply operation is too big"):
+        evaluate_with_magnitude_checks("20000! * 20000!")
+    with pytest.raises(InvalidValueForOperatorError, match="power operation is too big"):
+        evaluate_with_magnitude_checks("10^400 - 3")
+    with pytest.raises(InvalidValueForOperatorError, match="Cannot raise zero to a negative power"):
+        evaluate_with_magnitude_checks("0^-2")
+
+    # Invalid expressions report the errors of the operations that come before the syntax error first
+    for expression in ["0078-829^", "1/0 +", "9^999 (", "(1000000.5*1)!", "(10^6 - 1)! +"]:
+        assert evaluate_outcome(evaluate_with_magnitude_checks, expression) == \
+               evaluate_outcome(evaluate_expression, expression), expression
+
+    assert evaluate_with_magnitude_checks("40! / 30!", 50) == evaluate_expression("40! / 30!")
+    # The subtraction hides the magnitude from the tree, so the product is rejected once its operands are known
+    with pytest.raises(InvalidValueForOperatorError, match="multiply operation is too big"):
+        evaluate_with_magnitude_checks("(10!-10!+1) * 40! * 40!", 50)
+    assert [result["output"] for result in describe_expressions(["30! * 30!", "1+2"], max_result_digits=40)] == \
+           ["InvalidValueForOperatorError: The result of the multiply operation is too big", "3"]
+    # The limit of a batch does not outlive it
+    assert evaluate_with_magnitude_checks("30! * 30!") == evaluate_expression("30! * 30!")
+
+
+def test_evaluation_server():
+    """
+    Test single, batched, concurrent, invalid and rejected requests against a loopback evaluation server
+    """
+    async def run_requests():
+        server = EvaluationServer(port=0, workers=1, max_queue_size=64)
+        await server.start()
+        address = server.get_address()
+        try:
+            assert await asyncio.to_thread(post_json, address, {"expression": "2 + 3 * 4"}) == \
+                   (200, {"result": "14", "output": "14"})
+            status, body = await asyncio.to_thread(post_json, address, {"expressions": ["1/0", "2^3", "5 +"]})
+            assert status == 200
+            assert [result["output"] for result in body["results"]] == \
+                   list(map(format_expression, ["1/0", "2^3", "5 +"]))
+            assert body["results"][0]["error"]["type"] == "InvalidValueForOperatorError"
+
+            responses = await asyncio.gather(*(asyncio.to_thread(post_json, address, {"expression": f"{n}!"})
+                                               for n in range(20)))
+            assert [body["result"] for _, body in responses] == [format_expression(f"{n}!") for n in range(20)]
+
+            assert (await asyncio.to_thread(post_json, address, {"expressions": ["1"] * 65}))[0] == 413
+            assert (await asyncio.to_thread(post_json, address, {"expression": 5}))[0] == 400
+            assert await asyncio.to_thread(post_with_length, address, "-1") == 400
+        finally:
+            await server.stop()
+        with pytest.raises(ConnectionError):
+            post_json(address, {"expression": "1"})
+
+    asyncio.run(run_requests())
+
+
+def test_evaluation_server_broken_pool():
+    """
+    Test that the evaluation server replaces its worker pool after a worker dies
+    """
+    async def run_requests():
+        server = EvaluationServer(port=0, workers=1)
+        await server.start()
+        address = server.get_address()
+        try:
+            status, body = await asyncio.to_thread(post_json, address, {"expression": "3'"})
+            assert status == 200 and body["error"]["type"] == "BrokenProcessPool"
+            for _ in range(2):
+                assert await asyncio.to_thread(post_json, address, {"expression": "1 + 2"}) == \
+                       (200, {"result": "3", "output": "3"})
+        finally:
+            await server.stop()
+
+    # The forked workers get the operator, which kills the worker that executes it
+    register_operator("'", RightUnaryOperator(6, lambda x: os._exit(1)))
+    try:
+        asyncio.run(run_requests())
+    finally:
+        unregister_operator("'")
+
+
+def test_benchmark_comparison():
+    """
+    Test that workloads are reproducible and that the benchmark comparison only fails on regressions past the threshold
+    """
+    assert generate_workloads(seed=7, size=20) == generate_workloads(seed=7, size=20)
+    baseline = {"results": {"evaluate:short": {"ops_per_second": 1000, "ns_per_token": 100, "peak_memory_bytes": 1000}}}
+    faster = {"results": {"evaluate:short": {"ops_per_second": 1500, "ns_per_token": 95, "peak_memory_bytes": 1050}}}
+    slower = {"results": {"evaluate:short": {"ops_per_second": 800, "ns_per_token": 125, "peak_memory_bytes": 1000}}}
+    assert compare_results(baseline, faster, threshold=0.1) == []
+    assert len(compare_results(baseline, slower, threshold=0.1)) == 2
+    assert compare_results(baseline, slower, threshold=0.3) == []
+
+
+def test_instrumentation():
+    """
+    Test that enabled instrumentation records phases, operators and errors without changing results
+    """
+    profiles = []
+    instrumentation = enable_instrumentation(lambda expression, phases, error: profiles.append((expression, error)))
+    try:
+        assert evaluate_expression("3! + 4 * 2") == 14
+        with pytest.raises(InvalidValueForOperatorError):
+            evaluate_expression("1 / 0")
+        with pytest.raises(InsufficientOperatorsError):
+            evaluate_expression("(2 + 3")
+        assert evaluate_expression("1 / 4", FractionBackend()) == Fraction(1, 4)
+    finally:
+        assert disable_instrumentation() is instrumentation
+
+    snapshot = instrumentation.snapshot()
+    assert snapshot["evaluations"] == 4
+    assert {symbol: counts["calls"] for symbol, counts in snapshot["operators"].items()} == \
+           {"!": 1, "+": 2, "*": 1, "/": 2}
+    assert snapshot["errors"] == {"InvalidValueForOperatorError": 1, "InsufficientOperatorsError": 1}
+    assert all(snapshot["phases"][phase] > 0 for phase in ("tokenize", "shunting_yard", "execute"))
+    assert profiles[1] == ("1 / 0", "InvalidValueForOperatorError")
+
+    evaluate_expression("1 + 1")
+    assert instrumentation.snapshot()["evaluations"] == 4
+    instrumentation.reset()
+    assert instrumentation.snapshot() == {"evaluations": 0, "phases": {"tokenize": 0, "shunting_yard": 0, "execute": 0},
+                                          "operators": {}, "errors": {}}
+
+    invalid_expressions = ["1 2 a", "1/0 + a", "5..3 a", "(2 + 3", "2 +", "3 ! !a", "((1)", "1)", "()", "$", "",
+                           "-", "2 * (3 $ 4", "4 5.6.7", "1+" * 20 + "1"]
+    expected = [evaluate_outcome(evaluate_expression, expression) for expression in invalid_expressions]
+    limits = get_expression_limits()
+    enable_instrumentation()
+    try:
+        assert [evaluate_outcome(evaluate_expression, expression) for expression in invalid_expressions] == expected
+        set_expression_limits(20, limits[1])
+        assert evaluate_outcome(evaluate_expression, "1+" * 20 + "1")[0] is ExpressionTooComplexError
+    finally:
+        set_expression_limits(*limits)
+        assert disable_instrumentation().snapshot()["errors"]["ExpressionTooComplexError"] == 1
+
+
+def test_resource_limits():
+    """
+    Test that the operation budget, the integer size limit and the deadlines stop evaluations with a dedicated error
+    """
+    resource_limits = enable_resource_limits(max_operations=5, max_bit_length=1000)
+    try:
+        assert evaluate_expression("(2^10 + 3) * 7! - 1") == (2 ** 10 + 3) * 5040 - 1
+        assert evaluate_expression("1 / 4", FractionBackend()) == Fraction(1, 4)
+        with pytest.raises(InvalidValueForOperatorError):
+            evaluate_expression("1 / 0")
+        with pytest.raises(ResourceLimitExceededError, match="more than 5 operations"):
+            evaluate_expression("1+1+1+1+1+1+1")
+        with pytest.raises(ResourceLimitExceededError, match="'!' operation would have more than 1000 bits"):
+            evaluate_expression("9999!")
+        with pytest.raises(ResourceLimitExceededError, match="more than 1000 bits"):
+            evaluate_expression("2^999 * 4")
+        assert format_expression("1" + "0" * 400) == \
+               "ResourceLimitExceededError: An intermediate result has more than 1000 bits"
+    finally:
+        assert disable_resource_limits() is resource_limits
+    assert [result["output"] for result in describe_expressions(["9999!", "1+2"], resource_limits=resource_limits)] == \
+           ["ResourceLimitExceededError: The result of the '!' operation would have more than 1000 bits", "3"]
+
+    # The instrumentation profiles the evaluations that the resource limits check
+    enable_resource_limits(max_operations=5)
+    instrumentation = enable_instrumentation()
+    try:
+        assert evaluate_expression("2 * 3 + 1") == 7
+        with pytest.raises(ResourceLimitExceededError):
+            evaluate_expression("1+1+1+1+1+1+1")
+    finally:
+        disable_resource_limits()
+        disable_instrumentation()
+    snapshot = instrumentation.snapshot()
+    assert snapshot["evaluations"] == 2 and snapshot["errors"] == {"ResourceLimitExceededError": 1}
+    assert snapshot["operators"]["+"]["calls"] == 6
+
+    register_operator("'", RightUnaryOperator(6, lambda x: time.sleep(x) or x))
+    try:
+        enable_resource_limits(timeout=0.1)
+        try:
+            with pytest.raises(ResourceLimitExceededError, match="longer than 0.1 seconds"):
+                evaluate_expression("0.2' + 0.2'")
+        finally:
+            disable_resource_limits()
+    finally:
+        unregister_operator("'")
+
+    with HardTimeoutEvaluator(0.5) as evaluator:
+        assert evaluator.evaluate("2 + 3") == 5
+        start = time.monotonic()
+        # Built-in operators only, so the worker does not depend on how processes are started
+        with pytest.raises(ResourceLimitExceededError, match="longer than 0.5 seconds"):
+            evaluator.evaluate("+".join(["20000!"] * 1000))
+        assert time.monotonic() - start < 10
+        with pytest.raises(InvalidValueForOperatorError):
+            evaluator.evaluate("1 / 0")
+        assert evaluator.evaluate("7!") == 5040
+
+
+def test_evaluator_threads():
+    """
+    Test that shared and per-thread evaluators give the results and errors of the serial path from many threads
+    """
+    expressions = [expression for expression, _ in SIMPLE_EQUATIONS + COMPLEX_EQUATIONS] + \
+                  [expression for expression, _ in SYNTAX_ERRORS] + ["1 / 0", "12! * 3!", "(2^40 + 1) % 7", "2.5.1"]
+    expected = [evaluate_outcome(evaluate_expression, expression) for expression in expressions]
+    shared = get_evaluator()
+    local = threading.local()
+    failures = []
+
+    def run(seed: int):
+        order = random.Random(seed).sample(range(len(expressions)), len(expressions))
+        if not hasattr(local, "evaluator"):
+            local.evaluator = Evaluator()
+        for _ in range(20):
+            for index in order:
+                for evaluator in (shared, local.evaluator):
+                    if evaluate_outcome(evaluator.evaluate, expressions[index]) != expected[index]:
+                        failures.append(expressions[index])
+
+    threads = [threading.Thread(target=run, args=(seed,)) for seed in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+
+    # An evaluator keeps its operators, backend and limits when the global configuration changes
+    fractions = Evaluator(backend=FractionBackend(), max_depth=2)
+    register_operator("'", RightUnaryOperator(6, lambda x: x * 2))
+    try:
+        assert get_evaluator().evaluate("3'") == 6
+        with pytest.raises(UnknownCharacterError):
+            shared.evaluate("3'")
+    finally:
+        unregister_operator("'")
+    assert fractions.evaluate("1 / 3 + 1 / 6") == Fraction(1, 2)
+    with pytest.raises(ExpressionTooComplexError):
+        fractions.evaluate("(((1)))")
+
+
+def evaluate_with_persistent_cache(directory: str, expressions: list[str]) -> list[tuple]:
+    """
+    Evaluates expressions through a persistent cache, in a worker process
+    :param directory: The directory of the cache
+    :param expressions: The expressions to evaluate
+    :return: The outcome of every expression
+    """
+    with PersistentCache(directory) as cache:
+        return [evaluate_outcome(cache.evaluate, expression) for expression in expressions]
+
+
+def test_persistent_cache(tmp_path):
+    """
+    Test that the persistent cache is shared by processes, bounded in size and invalidated by operator changes
+    """
+    directory = str(tmp_path / "cache")
+    expressions = [expression for expression, _ in SIMPLE_EQUATIONS + COMPLEX_EQUATIONS] + \
+                  [expression for expression, _ in SYNTAX_ERRORS] + ["1 / 0", "2 ^ 0.5", "30!"]
+    expected = [evaluate_outcome(evaluate_expression, expression) for expression in expressions]
+    with multiprocessing.Pool(4) as pool:
+        outcomes = pool.starmap(evaluate_with_persistent_cache, [(directory, expressions)] * 8)
+    assert all(outcome == expected for outcome in outcomes)
+
+    with PersistentCache(directory) as cache:
+        assert [evaluate_outcome(cache.evaluate, expression) for expression in expressions] == expected
+        statistics = cache.get_statistics()
+        assert statistics["hits"] == len(expressions) and statistics["misses"] == 0
+        assert cache.evaluate(" 2 *3 ") == 6 and cache.get_statistics()["misses"] == 1
+        compiled = cache.compile("x * 2 + 3!", allow_names=True)
+        assert cache.compile("x * 2 + 3!", allow_names=True).evaluate(x=4) == compiled.evaluate(x=4) == 14
+
+        assert cache.get_statistics()["misses"] == 2
+        # The entries of another operator table are not found
+        register_operator("'", RightUnaryOperator(6, lambda x: x * 2))
+        try:
+            assert cache.evaluate("2 *3") == 6 and cache.get_statistics()["misses"] == 3
+        finally:
+            unregister_operator("'")
+        assert cache.evaluate("2  *3") == 6 and cache.get_statistics()["misses"] == 3
+        # The entries of another cost budget are not found
+        budget = get_cost_budget()
+        set_cost_budget(budget + 1)
+        try:
+            assert cache.evaluate("2 * 3") == 6 and cache.get_statistics()["misses"] == 4
+        finally:
+            set_cost_budget(budget)
+
+        # The outcomes under resource limits are neither read nor stored
+        enable_resource_limits(max_operations=1)
+        try:
+            with pytest.raises(ResourceLimitExceededError):
+                cache.evaluate("2 * 3 + 1")
+            with pytest.raises(ResourceLimitExceededError):
+                cache.evaluate("2 * 3 + 1")
+            assert cache.evaluate("2 * 3") == 6
+        finally:
+            disable_resource_limits()
+        statistics = cache.get_statistics()
+        assert statistics["hits"] == len(expressions) + 2 and statistics["misses"] == 4
+        assert cache.evaluate("2 * 3 + 1") == 7 and cache.get_statistics()["misses"] == 5
+
+        # Integers past the digit limit of int and str are stored as well
+        for _ in range(2):
+            assert cache.evaluate("2000!") == math.factorial(2000)
+            assert cache.compile("2000! + x", allow_names=True, optimize=True).evaluate(x=1) == math.factorial(2000) + 1
+        assert cache.get_statistics()["misses"] == 7 and cache.get_statistics()["errors"] == 0
+
+    with PersistentCache(str(tmp_path / "small"), max_bytes=2000) as cache:
+        for number in range(100):
+            assert cache.evaluate(f"{number} * 2") == number * 2
+        statistics = cache.get_statistics()
+        assert statistics["evictions"] > 0 and statistics["bytes"] <= 2000
+        assert cache.evaluate("99 * 2") == 198 and cache.get_statistics()["hits"] == 1
+
+
+def test_expression_limits():
+    """
+    Test that expressions longer or deeper than the configured limits fail fast with a clear error
+    """
+    limits = get_expression_limits()
+    set_expression_limits(20, 3)
+    try:
+        with pytest.raises(ExpressionTooComplexError, match="longer than 20"):
+            evaluate_expression("1+" * 10 + "1")
+        with pytest.raises(ExpressionTooComplexError, match="deeper than 3"):
+            evaluate_expression("((((1))))")
+        with pytest.raises(ExpressionTooComplexError):
+            compile_expression("((((1))))")
+        assert evaluate_expression("(1)+((2))+(((3)))") == 6
+        assert format_expression("1+" * 10 + "1") == \
+               "ExpressionTooComplexError: The expression is longer than 20 characters"
+    finally:
+        set_expression_limits(*limits)
+
+
+def test_million_token_expressions():
+    """
+    Test that flat and deeply nested expressions of a million tokens are evaluated without recursion, and that the
+    memory of the evaluation is bounded by a small multiple of the expression length
+    """
+    flat = "1+" * 500000 + "1"
+    nested = "(" * 250000 + "1" + "+1)" * 250000
+    limits = get_expression_limits()
+    set_expression_limits(len(flat), 250000)
+    try:
+        assert evaluate_expression(flat) == 500001
+        assert evaluate_expression(nested) == 250001
+        assert compile_expression("(" * 50000 + "2" + "*1)" * 50000, optimize=True).evaluate() == 2
+
+        # Memory is traced on smaller inputs, since tracing slows the evaluation down
+        for expression in [flat[:100001], nested[:25000] + "1" + nested[-75000:]]:
+            tracemalloc.start()
+            try:
+                evaluate_expression(expression)
+                assert tracemalloc.get_traced_memory()[1] < 4 * len(expression)
+            finally:
+                tracemalloc.stop()
+    finally:
+        set_expression_limits(*limits)
+
+
+def evaluate_outcome(evaluate, expression: str) -> tuple:
+    """
+    Evaluates an expression and captures its result or error
+    :param evaluate: The function that evaluates the expression
+    :param expression: The expression to evaluate
+    :return: The result, or the class and the message of the raised error
+    """
+    try:
+        return evaluate(expression),
+    except Exception as e:
+        return e.__class__, str(e)
+
+
+def test_incremental_evaluation():
+    """
+    Test that incremental evaluation matches the full evaluation on random edits at the end of an expression
+    """
+    rng = random.Random(15)
+    pieces = list("0123456789..+-*/^%@$&~!#()  ") + ["12", "3.5", "(1+2)", "a"]
+    for interval in (1, 3, 8):
+        evaluator = IncrementalEvaluator(checkpoint_interval=interval)
+        expression = ""
+        for _ in range(1500):
+            if expression and rng.random() < 0.35:
+                expression = expression[:-rng.randint(1, min(3, len(expression)))]
+            elif rng.random() < 0.05 or len(expression) > 40:
+                expression = ""
+            else:
+                expression += rng.choice(pieces)
+            assert evaluate_outcome(evaluator.evaluate, expression) == \
+                   evaluate_outcome(evaluate_expression, expression), expression
+
+    evaluator = IncrementalEvaluator()
+    expression = "+".join(["(1*2)"] * 50)
+    assert evaluator.evaluate(expression) == 100
+    assert evaluator.evaluate(expression + "+5") == 105
+    assert evaluator.get_resume_position() > len(expression) - 10
+
+    # The saved states of a deeply nested expression hold the changes of the stacks, not copies of them
+    expression = "(" * 5000 + "1" + ")" * 5000
+    evaluator = IncrementalEvaluator(checkpoint_interval=1)
+    tracemalloc.start()
+    try:
+        assert evaluator.evaluate(expression) == 1
+        assert tracemalloc.get_traced_memory()[1] < 1000 * len(expression)
+    finally:
+        tracemalloc.stop()
+    assert evaluator.evaluate(expression[:-1] + "+2)") == 3
+
+    instrumentation = enable_instrumentation()
+    enable_resource_limits(max_operations=3)
+    try:
+        evaluator = IncrementalEvaluator(checkpoint_interval=1)
+        assert evaluator.evaluate("1 + 2 * 3") == 7
+        with pytest.raises(ResourceLimitExceededError):
+            evaluator.evaluate("1 + 2 * 3 - 4 / 2")
+    finally:
+        disable_resource_limits()
+        disable_instrumentation()
+    assert instrumentation.snapshot()["errors"] == {"ResourceLimitExceededError": 1}
+
+
+def test_operator_registry():
+    """
+    Test that registered operators are picked up by the tokenizer, the precedence rules and the caches, and that lazy
+    functions are loaded on first use
+    """
+    cache = ExpressionCache()
+    with pytest.raises(UnknownCharacterError):
+        cache.evaluate("3?4")
+    class NamedOperator(BasicBinaryOperator):
+        __slots__ = ('name',)
+
+        def __init__(self, name: str, function):
+            super().__init__(2, function)
+            self.name = name
+
+    register_operator("?", NamedOperator("hypot", LazyFunction("math", "hypot")), cost_hint=2.0)
+    register_operator("'", RightUnaryOperator(6, lambda x: x * 2))
+    try:
+        assert isinstance(OPERATOR_RECORDS["?"].function, LazyFunction)
+        assert cache.evaluate("3?4") == 5
+        assert evaluate_expression("1 + 3?4 * 2") == 11
+        assert evaluate_expression("3'?4'") == 10
+        assert OPERATOR_RECORDS["?"].function is math.hypot
+        # The loaded function replaces the lazy one in a copy of the registered operator
+        assert isinstance(OPERATORS["?"], NamedOperator) and OPERATORS["?"].name == "hypot"
+        assert OPERATORS["?"].get_function() is math.hypot and OPERATORS["?"].get_precedence() == 2
+        assert get_cost_hint("?") == 2.0
+        if numpy is not None:
+            with pytest.raises(InvalidUseOfOperatorError):
+                evaluate_vectorized("x?1", x=numpy.array([1.0]))
+    finally:
+        unregister_operator("?")
+        unregister_operator("'")
+    with pytest.raises(UnknownCharacterError):
+        evaluate_expression("3?4")
+    for symbol in ["a", "1", ".", "(", " ", ""]:
+        with pytest.raises(ValueError):
+            register_operator(symbol, BasicBinaryOperator(1, max))
+
+
+def test_cold_start_imports():
+    """
+    Test that the CLI starts without the lazily loaded modules, and that the old exception modules give the classes of
+    calculator_core.errors
+    """
+    assert find_lazy_modules(run_importtime("main")) == []
+
+    from calculator_core import errors
+    assert InsufficientOperandsError is errors.InsufficientOperandsError
+    assert InvalidUseOfOperatorError is errors.InvalidUseOfOperatorError
+    assert ExpressionTooComplexError is errors.ExpressionTooComplexError